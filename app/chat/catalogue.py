@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from .client import get_client
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalogue:
+    """
+    Cached view of Ollama's installed models. Readers always get the cached
+    list immediately; a background task keeps it fresh so page renders never
+    wait on /api/tags.
+    """
+
+    def __init__(self, ttl: float = 30.0, fetch_timeout: float = 2.0):
+        self.ttl = ttl
+        self.fetch_timeout = fetch_timeout
+        self._models: List[Dict] = []
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # On-demand refreshes; the loop only keeps weak references to tasks
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+
+    def get_models(self) -> List[Dict]:
+        """Return the cached models, scheduling a refresh if the cache is stale."""
+        recently_attempted = (
+            self._attempted_at is not None
+            and time.monotonic() - self._attempted_at < self.ttl
+        )
+        if self.is_stale and not recently_attempted and not self._refresh_lock.locked():
+            task = asyncio.create_task(self.refresh())
+            self._pending.add(task)
+            task.add_done_callback(self._refresh_done)
+        return self._models
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Model catalogue refresh failed: {task.exception()}")
+
+    async def refresh(self) -> List[Dict]:
+        """
+        Fetch /api/tags and replace the cache. On failure the previous list is
+        kept so a restarting Ollama does not empty the model picker.
+        """
+        async with self._refresh_lock:
+            self._attempted_at = time.monotonic()
+            try:
+                response = await get_client().get("/api/tags", timeout=self.fetch_timeout)
+                response.raise_for_status()
+                models = response.json().get("models", [])
+                # Sort models by name for better presentation
+                self._models = sorted(models, key=lambda x: x["name"])
+                self._fetched_at = time.monotonic()
+                logger.debug(f"Model catalogue refreshed: {len(self._models)} models")
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Error fetching models: {e}")
+            return self._models
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        """Start refreshing the catalogue in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._pending):
+            task.cancel()
@@ -0,0 +1,37 @@
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Keep-alive pool shared by every Ollama call; individual requests override
+# the timeout where they need to (e.g. long generations).
+OLLAMA_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", 32)),
+    max_keepalive_connections=int(os.getenv("OLLAMA_MAX_KEEPALIVE", 16)),
+    keepalive_expiry=60.0,
+)
+OLLAMA_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+
+client: httpx.AsyncClient = None
+
+async def init_ollama():
+    """Initialize the shared Ollama client"""
+    global client
+    client = httpx.AsyncClient(
+        base_url=OLLAMA_BASE_URL, limits=OLLAMA_LIMITS, timeout=OLLAMA_TIMEOUT
+    )
+    logger.info(f"Ollama client initialized for {OLLAMA_BASE_URL}")
+    return client
+
+async def close_ollama():
+    """Close the shared Ollama client"""
+    if client:
+        await client.aclose()
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared Ollama client"""
+    return client
@@ -0,0 +1,122 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from .tokens import PromptTokenizer
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens allowed for retrieved code. Prefill dominates latency on CPU,
+# and the conversation history shares the context window (OLLAMA_NUM_CTX).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1536))
+# Chunks scoring below this fraction of the best score are dropped
+CONTEXT_MIN_SCORE_RATIO = float(os.getenv("CONTEXT_MIN_SCORE_RATIO", 0.4))
+# Chunks of a file separated by at most this many lines are merged
+CONTEXT_MERGE_GAP = int(os.getenv("CONTEXT_MERGE_GAP", 1))
+
+
+@dataclass
+class ContextBlock:
+    """A contiguous line range of one file, possibly built from several chunks."""
+
+    file_path: str
+    start_line: int
+    end_line: int
+    lines: List[str]
+    score: float
+    chunk_ids: List = field(default_factory=list)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.lines)
+
+    def absorb(self, other: "ContextBlock"):
+        """Extend this block with the lines of ``other`` past its end."""
+        if other.end_line > self.end_line:
+            skip = self.end_line - other.start_line + 1
+            if skip < 0:
+                # The gap between the two is not in either chunk
+                self.lines.append("...\n")
+                skip = 0
+            self.lines.extend(other.lines[skip:])
+            self.end_line = other.end_line
+        self.score = max(self.score, other.score)
+        self.chunk_ids.extend(other.chunk_ids)
+
+
+@dataclass
+class PackedContext:
+    blocks: List[ContextBlock]
+    tokens: int
+    budget: int
+    # Chunks dropped for scoring too low and blocks that did not fit
+    dropped_low_score: int = 0
+    dropped_over_budget: int = 0
+    merged: int = 0
+
+
+def pack_context(
+    chunks: Sequence[dict],
+    tokenizer: PromptTokenizer,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    min_score_ratio: float = CONTEXT_MIN_SCORE_RATIO,
+    merge_gap: int = CONTEXT_MERGE_GAP,
+) -> PackedContext:
+    """
+    Fit ranked chunks into ``budget`` tokens. Low-scoring tails are cut,
+    overlapping or nearly adjacent chunks of the same file become one
+    block, and blocks are then added best first while they fit. Chunks
+    without a score (pinned by the symbol index) rank above all others.
+    """
+    scored = [_block(chunk, rank) for rank, chunk in enumerate(chunks)]
+    best = max((block.score for block in scored if block.score != float("inf")), default=0.0)
+    kept = [block for block in scored if block.score >= best * min_score_ratio]
+    packed = PackedContext(blocks=[], tokens=0, budget=budget, dropped_low_score=len(scored) - len(kept))
+
+    by_file: Dict[str, List[ContextBlock]] = {}
+    for block in kept:
+        by_file.setdefault(block.file_path, []).append(block)
+    merged: List[ContextBlock] = []
+    for blocks in by_file.values():
+        blocks.sort(key=lambda b: b.start_line)
+        current = blocks[0]
+        for block in blocks[1:]:
+            if block.start_line <= current.end_line + 1 + merge_gap:
+                current.absorb(block)
+                packed.merged += 1
+            else:
+                merged.append(current)
+                current = block
+        merged.append(current)
+
+    for block in sorted(merged, key=lambda b: b.score, reverse=True):
+        tokens = tokenizer.count(format_block(block))
+        if packed.tokens + tokens > budget:
+            packed.dropped_over_budget += 1
+            continue
+        packed.blocks.append(block)
+        packed.tokens += tokens
+    return packed
+
+
+def format_block(block: ContextBlock) -> str:
+    return f"### {block.file_path} (lines {block.start_line}-{block.end_line})\n{block.content}"
+
+
+def _block(chunk: dict, rank: int) -> ContextBlock:
+    score: Optional[float] = chunk.get("score")
+    # Split on newlines only, as the chunker did; splitlines() would also
+    # break on form feeds and other separators and shift the line numbers
+    lines = [line + "\n" for line in chunk["content"].split("\n")]
+    if chunk["content"].endswith("\n"):
+        lines.pop()
+    return ContextBlock(
+        file_path=chunk["file_path"],
+        start_line=chunk["start_line"],
+        end_line=chunk["end_line"],
+        lines=lines,
+        # Unscored chunks outrank everything; ties keep retrieval order
+        score=float("inf") if score is None else score - rank * 1e-9,
+        chunk_ids=[chunk.get("id")],
+    )
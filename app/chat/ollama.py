@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from ..metrics import Counter, Histogram, record_span
+from .scheduler import Priority, ollama_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Generations can sit in prefill for a long time before the first token, so
+# only the connect phase is bounded.
+GENERATE_TIMEOUT = httpx.Timeout(10.0, read=None)
+# How long Ollama keeps the model, and with it the conversation's KV cache,
+# loaded after a request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Context window requested from Ollama; prompt budgets are planned against it
+CHAT_CONTEXT_WINDOW = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+
+OLLAMA_TTFT_SECONDS = Histogram(
+    "ttlm_ollama_ttft_seconds",
+    "Time from request to first token, queue wait included",
+    ["model"],
+)
+OLLAMA_QUEUE_WAIT_SECONDS = Histogram(
+    "ttlm_ollama_queue_wait_seconds",
+    "Time a generation waited for a scheduler slot",
+    ["model"],
+)
+OLLAMA_LOAD_SECONDS = Histogram(
+    "ttlm_ollama_load_seconds",
+    "Model load time reported by Ollama per generation",
+    ["model"],
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ttlm_ollama_tokens_per_second",
+    "Decode throughput per generation",
+    ["model"],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 250),
+)
+OLLAMA_TOKENS = Counter(
+    "ttlm_ollama_tokens_total",
+    "Prompt tokens evaluated and tokens generated",
+    ["model", "kind"],
+)
+
+
+@dataclass
+class GenerationStats:
+    """Timing for a single generation, filled in while the stream is consumed."""
+
+    model: str
+    started_at: float
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    eval_count: int = 0
+    eval_duration_ns: int = 0
+    prompt_eval_count: int = 0
+    prompt_eval_duration_ns: int = 0
+    load_duration_ns: int = 0
+    # Time spent waiting for a generation slot; part of ttft_ms
+    queue_wait_ms: float = 0.0
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        """Wall-clock time from sending the request to the first token."""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    @property
+    def load_ms(self) -> float:
+        """Time Ollama spent loading the model before this generation."""
+        return self.load_duration_ns / 1e6
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """
+        Decode throughput. Prefers Ollama's own eval counters and falls back to
+        wall-clock time since the first token when they are missing.
+        """
+        if self.eval_count and self.eval_duration_ns:
+            return self.eval_count / (self.eval_duration_ns / 1e9)
+        if self.eval_count and self.first_token_at and self.finished_at:
+            elapsed = self.finished_at - self.first_token_at
+            if elapsed > 0:
+                return self.eval_count / elapsed
+        return None
+
+
+class GenerationStream:
+    """
+    Async iterator over the text pieces of an Ollama /api/generate stream.
+    Each piece is yielded as soon as its line arrives; ``stats`` is complete
+    once iteration finishes. The request waits for a slot from the scheduler
+    first, and holds it until the stream ends or the consumer stops.
+    """
+
+    endpoint = "/api/generate"
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        model: str,
+        prompt: str,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+        self.priority = priority
+        self.stats = GenerationStats(model=model, started_at=time.perf_counter())
+
+    def _payload(self) -> dict:
+        return {"model": self.model, "prompt": self.prompt, "stream": True}
+
+    def _piece(self, chunk: dict) -> str:
+        return chunk.get("response", "")
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self.stats.started_at = time.perf_counter()
+        async with ollama_scheduler.slot(self.model, self.priority) as waited:
+            self.stats.queue_wait_ms = waited * 1000
+            async with self.client.stream(
+                "POST",
+                self.endpoint,
+                json=self._payload(),
+                timeout=GENERATE_TIMEOUT,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Error parsing chunk {line!r}: {e}")
+                        continue
+
+                    if "error" in chunk:
+                        raise RuntimeError(chunk["error"])
+
+                    piece = self._piece(chunk)
+                    if piece:
+                        if self.stats.first_token_at is None:
+                            self.stats.first_token_at = time.perf_counter()
+                        yield piece
+
+                    if chunk.get("done", False):
+                        self._record_final(chunk)
+                        break
+
+        self.stats.finished_at = time.perf_counter()
+        self._observe()
+        logger.info(
+            f"Generation finished for {self.model}: "
+            f"queue={round(self.stats.queue_wait_ms)}ms "
+            f"ttft={self.stats.ttft_ms and round(self.stats.ttft_ms)}ms "
+            f"prompt_eval={self.stats.prompt_eval_count} "
+            f"tokens={self.stats.eval_count} "
+            f"tok/s={self.stats.tokens_per_second and round(self.stats.tokens_per_second, 1)}"
+        )
+
+    def _observe(self):
+        stats, model = self.stats, self.model
+        OLLAMA_QUEUE_WAIT_SECONDS.observe(stats.queue_wait_ms / 1000, model=model)
+        record_span("ollama_queue", stats.queue_wait_ms / 1000)
+        if stats.ttft_ms is not None:
+            OLLAMA_TTFT_SECONDS.observe(stats.ttft_ms / 1000, model=model)
+            record_span("ollama_ttft", stats.ttft_ms / 1000)
+        OLLAMA_LOAD_SECONDS.observe(stats.load_ms / 1000, model=model)
+        if stats.tokens_per_second is not None:
+            OLLAMA_TOKENS_PER_SECOND.observe(stats.tokens_per_second, model=model)
+        OLLAMA_TOKENS.inc(stats.prompt_eval_count, model=model, kind="prompt")
+        OLLAMA_TOKENS.inc(stats.eval_count, model=model, kind="generated")
+        record_span("ollama_generate", stats.finished_at - stats.started_at)
+
+    def _record_final(self, chunk: dict):
+        """Copy Ollama's counters from the closing ``done`` chunk."""
+        self.stats.eval_count = chunk.get("eval_count", 0)
+        self.stats.eval_duration_ns = chunk.get("eval_duration", 0)
+        self.stats.prompt_eval_count = chunk.get("prompt_eval_count", 0)
+        self.stats.prompt_eval_duration_ns = chunk.get("prompt_eval_duration", 0)
+        self.stats.load_duration_ns = chunk.get("load_duration", 0)
+
+
+class ChatStream(GenerationStream):
+    """
+    A conversation turn over /api/chat. Ollama keeps the KV cache of the
+    previous turn for ``keep_alive``, so when ``messages`` repeats the
+    earlier turns verbatim only the new message is prefilled.
+    """
+
+    endpoint = "/api/chat"
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        model: str,
+        messages: List[Dict[str, str]],
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        priority: Priority = Priority.INTERACTIVE,
+    ):
+        super().__init__(client, model, prompt="", priority=priority)
+        self.messages = messages
+        self.keep_alive = keep_alive
+
+    def _payload(self) -> dict:
+        return {
+            "model": self.model,
+            "messages": self.messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {"num_ctx": CHAT_CONTEXT_WINDOW},
+        }
+
+    def _piece(self, chunk: dict) -> str:
+        return chunk.get("message", {}).get("content", "")
+
+
+async def generate(
+    client: httpx.AsyncClient,
+    model: str,
+    prompt: str,
+    keep_alive: str = OLLAMA_KEEP_ALIVE,
+    priority: Priority = Priority.BACKGROUND,
+) -> str:
+    """A complete, non-streamed /api/generate response, for background work."""
+    async with ollama_scheduler.slot(model, priority):
+        response = await client.post(
+            "/api/generate",
+            json={
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": keep_alive,
+                "options": {"num_ctx": CHAT_CONTEXT_WINDOW},
+            },
+            timeout=GENERATE_TIMEOUT,
+        )
+    response.raise_for_status()
+    body = response.json()
+    if "error" in body:
+        raise RuntimeError(body["error"])
+    return body.get("response", "")
@@ -0,0 +1,61 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from .context import PackedContext, format_block, pack_context
+from .tokens import get_prompt_tokenizer
+
+logger = logging.getLogger(__name__)
+
+_INSTRUCTIONS = (
+    "Answer the question about this codebase using the excerpts below. "
+    "Cite file paths when you refer to code.\n\n"
+)
+
+
+@dataclass
+class Prompt:
+    text: str
+    # Estimated (or exact, with the model's tokenizer) prompt tokens
+    tokens: int
+    context: Optional[PackedContext] = None
+
+
+def build_prompt(question: str, context: Optional[PackedContext] = None) -> str:
+    """Prompt for a question about a project, grounded in the packed context."""
+    if not context or not context.blocks:
+        return question
+    return (
+        _INSTRUCTIONS
+        + "\n\n".join(format_block(block) for block in context.blocks)
+        + f"\n\nQuestion: {question}"
+    )
+
+
+async def assemble_prompt(model: str, question: str, chunks: Sequence[dict]) -> Prompt:
+    """
+    Pack retrieved chunks into the context budget with ``model``'s
+    tokenizer and build the prompt, logging its size against the budget.
+    """
+    tokenizer = await get_prompt_tokenizer(model)
+    context = pack_context(chunks, tokenizer) if chunks else None
+    text = build_prompt(question, context)
+    prompt = Prompt(text=text, tokens=tokenizer.count(text), context=context)
+    if context:
+        logger.info(
+            f"Prompt for {model}: {prompt.tokens} tokens "
+            f"({'exact' if tokenizer.exact else 'estimated'}), context {context.tokens}/{context.budget} "
+            f"in {len(context.blocks)} blocks from {len(chunks)} chunks "
+            f"(merged {context.merged}, dropped {context.dropped_low_score} low-score "
+            f"and {context.dropped_over_budget} over budget)"
+        )
+    return prompt
+
+
+async def record_prompt_usage(model: str, prompt: Prompt, prompt_eval_count: int):
+    """Compare the prompt size with what Ollama evaluated, and calibrate estimates."""
+    if not prompt_eval_count:
+        return
+    tokenizer = await get_prompt_tokenizer(model)
+    logger.info(f"Prompt for {model}: estimated {prompt.tokens} tokens, Ollama evaluated {prompt_eval_count}")
+    tokenizer.calibrate(prompt.text, prompt_eval_count)
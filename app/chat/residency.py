@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+from .client import get_client
+from .ollama import CHAT_CONTEXT_WINDOW, GENERATE_TIMEOUT, OLLAMA_KEEP_ALIVE, GenerationStats
+from .scheduler import Priority, ollama_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Ollama reports a few milliseconds of load_duration even for a resident
+# model; anything above this was a real load
+LOAD_THRESHOLD_MS = 100
+
+
+@dataclass
+class ModelUsage:
+    """Where a model's time went: loading weights versus prefill and decode."""
+
+    loads: int = 0
+    load_ms: float = 0.0
+    generations: int = 0
+    generation_ms: float = 0.0
+    evictions: int = 0
+    last_used: float = 0.0
+
+    def as_dict(self) -> dict:
+        total = self.load_ms + self.generation_ms
+        return {
+            "loads": self.loads,
+            "avg_load_ms": round(self.load_ms / self.loads) if self.loads else 0,
+            "generations": self.generations,
+            "avg_generation_ms": round(self.generation_ms / self.generations) if self.generations else 0,
+            "load_share": round(self.load_ms / total, 3) if total else 0,
+            "evictions": self.evictions,
+        }
+
+
+class ModelResidency:
+    """
+    Tracks which models Ollama has in memory (/api/ps) and keeps at most
+    ``max_resident`` of them there. Selecting a model warms it with
+    ``keep_alive`` in the background; making room unloads the least
+    recently used idle model instead of letting Ollama thrash between them.
+    """
+
+    def __init__(
+        self,
+        max_resident: int = 2,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        ps_ttl: float = 5.0,
+    ):
+        self.max_resident = max_resident
+        self.keep_alive = keep_alive
+        self.ps_ttl = ps_ttl
+        self._resident: Dict[str, dict] = {}
+        self._fetched_at: Optional[float] = None
+        self._usage: Dict[str, ModelUsage] = {}
+        self._warming: Dict[str, asyncio.Task] = {}
+        self._lock = asyncio.Lock()
+
+    def usage(self, model: str) -> ModelUsage:
+        return self._usage.setdefault(model, ModelUsage())
+
+    async def refresh(self, force: bool = False) -> Dict[str, dict]:
+        """Resident models as reported by /api/ps, cached for ``ps_ttl``."""
+        fresh = self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ps_ttl
+        if fresh and not force:
+            return self._resident
+        try:
+            response = await get_client().get("/api/ps")
+            response.raise_for_status()
+            self._resident = {m["name"]: m for m in response.json().get("models", [])}
+            self._fetched_at = time.monotonic()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Error fetching resident models: {e}")
+        return self._resident
+
+    def warm(self, model: str) -> asyncio.Task:
+        """Load ``model`` in the background unless a warm-up is already running."""
+        if model not in self._warming:
+            task = asyncio.create_task(self._warm(model))
+            self._warming[model] = task
+            task.add_done_callback(lambda _: self._warming.pop(model, None))
+        return self._warming[model]
+
+    async def _warm(self, model: str):
+        try:
+            await self.make_room(model)
+            if model in self._resident:
+                return
+            # The load takes one of the model's slots, behind any chat
+            # already waiting for it
+            async with ollama_scheduler.slot(model, Priority.BACKGROUND):
+                started = time.perf_counter()
+                # A request without a prompt only loads the model. num_ctx must
+                # match the chat requests or the first one reloads it.
+                response = await get_client().post(
+                    "/api/generate",
+                    json={
+                        "model": model,
+                        "keep_alive": self.keep_alive,
+                        "options": {"num_ctx": CHAT_CONTEXT_WINDOW},
+                    },
+                    timeout=GENERATE_TIMEOUT,
+                )
+                response.raise_for_status()
+            elapsed = (time.perf_counter() - started) * 1000
+            usage = self.usage(model)
+            usage.loads += 1
+            usage.load_ms += elapsed
+            usage.last_used = time.monotonic()
+            logger.info(f"Warmed {model} in {elapsed:.0f}ms")
+            await self.refresh(force=True)
+        except Exception as e:
+            logger.warning(f"Failed to warm {model}: {e}")
+
+    async def make_room(self, model: str):
+        """Unload least recently used idle models until ``model`` fits the limit."""
+        async with self._lock:
+            resident = await self.refresh()
+            if model in resident:
+                return
+            others = [name for name in resident if name != model]
+            idle = sorted(
+                (name for name in others if not ollama_scheduler.in_use(name)),
+                key=lambda name: self.usage(name).last_used,
+            )
+            while len(others) >= self.max_resident and idle:
+                victim = idle.pop(0)
+                await self._unload(victim)
+                others.remove(victim)
+            if len(others) >= self.max_resident:
+                logger.warning(
+                    f"Loading {model} beside {len(others)} busy models exceeds "
+                    f"the limit of {self.max_resident} resident models"
+                )
+
+    async def _unload(self, model: str):
+        # Deliberately not scheduled: only idle models are unloaded, and
+        # waiting for a slot would hold up the load that needs the memory
+        try:
+            response = await get_client().post(
+                "/api/generate", json={"model": model, "keep_alive": 0}
+            )
+            response.raise_for_status()
+            self._resident.pop(model, None)
+            self.usage(model).evictions += 1
+            logger.info(f"Unloaded {model} to make room")
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to unload {model}: {e}")
+
+    def record(self, stats: GenerationStats):
+        """Split a finished generation into load time and generation time."""
+        usage = self.usage(stats.model)
+        usage.last_used = time.monotonic()
+        if stats.load_duration_ns / 1e6 > LOAD_THRESHOLD_MS:
+            usage.loads += 1
+            usage.load_ms += stats.load_duration_ns / 1e6
+        usage.generations += 1
+        usage.generation_ms += (stats.prompt_eval_duration_ns + stats.eval_duration_ns) / 1e6
+
+    async def stats(self) -> dict:
+        resident = await self.refresh()
+        models: List[str] = sorted(set(resident) | set(self._usage))
+        return {
+            "max_resident": self.max_resident,
+            "keep_alive": self.keep_alive,
+            "models": {
+                name: {
+                    "resident": name in resident,
+                    "size": resident.get(name, {}).get("size"),
+                    "size_vram": resident.get(name, {}).get("size_vram"),
+                    "expires_at": resident.get(name, {}).get("expires_at"),
+                    **self.usage(name).as_dict(),
+                }
+                for name in models
+            },
+        }
@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List
+
+from ..metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Generations Ollama runs at once per model; match OLLAMA_NUM_PARALLEL so
+# requests wait here, where they can be prioritised and cancelled, rather
+# than inside Ollama
+OLLAMA_MODEL_CONCURRENCY = int(os.getenv("OLLAMA_MODEL_CONCURRENCY", 1))
+# Requests allowed to wait across all models before new ones are rejected
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", 16))
+
+
+OLLAMA_REJECTED = Counter(
+    "ttlm_ollama_rejected_total",
+    "Generations rejected because the wait queue was full",
+    ["model"],
+)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class SchedulerFull(Exception):
+    """Raised when a request arrives while the wait queue is full."""
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class _ModelQueue:
+    def __init__(self):
+        self.running = 0
+        self.waiting: List[_Waiter] = []
+
+
+class OllamaScheduler:
+    """
+    Admission control in front of Ollama. Each model runs at most
+    ``concurrency`` generations; further requests wait in a priority queue,
+    interactive before background, and are rejected outright once
+    ``max_queue`` requests are waiting. A request cancelled while waiting
+    leaves the queue; one cancelled while running frees its slot.
+    """
+
+    def __init__(self, concurrency: int = OLLAMA_MODEL_CONCURRENCY, max_queue: int = OLLAMA_MAX_QUEUE):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._models: Dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+        self.total_admitted = 0
+        self.total_rejected = 0
+        self.total_cancelled = 0
+        self.total_queue_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue.waiting) for queue in self._models.values())
+
+    def in_use(self, model: str) -> int:
+        """Generations running or waiting for ``model``."""
+        queue = self._models.get(model)
+        return queue.running + len(queue.waiting) if queue else 0
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[float]:
+        """Hold one of ``model``'s generation slots; yields the seconds spent waiting."""
+        waited = await self.acquire(model, priority)
+        try:
+            yield waited
+        finally:
+            self.release(model)
+
+    async def acquire(self, model: str, priority: Priority = Priority.INTERACTIVE) -> float:
+        queue = self._models.setdefault(model, _ModelQueue())
+        if queue.running < self.concurrency and not queue.waiting:
+            queue.running += 1
+            self.total_admitted += 1
+            return 0.0
+        if self.queue_depth >= self.max_queue:
+            self.total_rejected += 1
+            OLLAMA_REJECTED.inc(model=model)
+            raise SchedulerFull(f"{self.queue_depth} requests are already waiting for Ollama")
+
+        started = time.perf_counter()
+        waiter = _Waiter(int(priority), next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(queue.waiting, waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release(model)
+            elif waiter in queue.waiting:
+                queue.waiting.remove(waiter)
+                heapq.heapify(queue.waiting)
+            self.total_cancelled += 1
+            raise
+        waited = time.perf_counter() - started
+        self.total_admitted += 1
+        self.total_queue_wait += waited
+        return waited
+
+    def release(self, model: str):
+        """Hand the slot to the most urgent waiter, or free it."""
+        queue = self._models[model]
+        while queue.waiting:
+            waiter = heapq.heappop(queue.waiting)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        queue.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_per_model": self.concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            "models": {
+                model: {"running": queue.running, "waiting": len(queue.waiting)}
+                for model, queue in self._models.items()
+                if queue.running or queue.waiting
+            },
+            "total_admitted": self.total_admitted,
+            "total_rejected": self.total_rejected,
+            "total_cancelled": self.total_cancelled,
+            "avg_queue_wait_ms": (
+                round(self.total_queue_wait / self.total_admitted * 1000, 1) if self.total_admitted else 0
+            ),
+        }
+
+
+ollama_scheduler = OllamaScheduler()
+
+Gauge(
+    "ttlm_ollama_running",
+    "Generations running per model",
+    ["model"],
+    collect=lambda: {model: q.running for model, q in ollama_scheduler._models.items()},
+)
+Gauge(
+    "ttlm_ollama_waiting",
+    "Generations waiting for a slot per model",
+    ["model"],
+    collect=lambda: {model: len(q.waiting) for model, q in ollama_scheduler._models.items()},
+)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set
+from uuid import UUID
+
+import httpx
+
+from ..db.sessions import get_active_messages, get_session, set_summary
+from .ollama import CHAT_CONTEXT_WINDOW, generate
+from .tokens import PromptTokenizer, get_prompt_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Tokens of the context window kept free for the answer
+CHAT_RESPONSE_RESERVE = int(os.getenv("CHAT_RESPONSE_RESERVE", 768))
+# Older turns are summarized once the replayed history passes this share of
+# the context window. Summarizing early keeps the hard trim, which changes
+# the prompt prefix on every turn, a last resort.
+CHAT_SUMMARIZE_RATIO = float(os.getenv("CHAT_SUMMARIZE_RATIO", 0.5))
+# Most recent messages that are always replayed verbatim
+CHAT_KEEP_RECENT = int(os.getenv("CHAT_KEEP_RECENT", 4))
+# Chat template tokens around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SUMMARY_PROMPT = (
+    "Summarize this conversation about a codebase so that it can be continued "
+    "without the original messages. Keep file paths, symbol names, decisions "
+    "and open questions; drop pleasantries. Answer with the summary only.\n\n"
+)
+
+
+@dataclass
+class ChatTurn:
+    """The messages sent to Ollama for one turn, and how the history fit."""
+
+    messages: List[Dict[str, str]]
+    tokens: int
+    # Replayed history messages, and those dropped to fit the window
+    history: int
+    trimmed: int
+
+
+def message_tokens(tokenizer: PromptTokenizer, content: str) -> int:
+    return tokenizer.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def plan_turn(
+    session: dict,
+    history: Sequence[dict],
+    user_content: str,
+    tokenizer: PromptTokenizer,
+    window: int = CHAT_CONTEXT_WINDOW,
+    reserve: int = CHAT_RESPONSE_RESERVE,
+) -> ChatTurn:
+    """
+    Lay out a turn as summary, replayed history and the new message. The
+    history is replayed exactly as sent before, so Ollama finds it in its
+    KV cache; when it does not fit, whole exchanges are dropped from the
+    front until it does.
+    """
+    messages = []
+    tokens = message_tokens(tokenizer, user_content)
+    if session["summary"]:
+        messages.append({"role": "system", "content": _summary_message(session["summary"])})
+        tokens += session["summary_tokens"] + MESSAGE_OVERHEAD_TOKENS
+
+    budget = window - reserve - tokens
+    start, replayed = 0, sum(m["tokens"] for m in history)
+    while start < len(history) and (replayed > budget or history[start]["role"] != "user"):
+        replayed -= history[start]["tokens"]
+        start += 1
+    if start:
+        logger.warning(
+            f"Chat session {session['id']} exceeds the {window}-token window; "
+            f"dropped {start} of {len(history)} messages"
+        )
+
+    messages.extend({"role": m["role"], "content": m["content"]} for m in history[start:])
+    messages.append({"role": "user", "content": user_content})
+    return ChatTurn(
+        messages=messages,
+        tokens=tokens + replayed,
+        history=len(history) - start,
+        trimmed=start,
+    )
+
+
+def needs_summary(
+    session: dict,
+    history: Sequence[dict],
+    window: int = CHAT_CONTEXT_WINDOW,
+    ratio: float = CHAT_SUMMARIZE_RATIO,
+) -> bool:
+    replayed = session["summary_tokens"] + sum(m["tokens"] for m in history)
+    return len(history) > CHAT_KEEP_RECENT and replayed > window * ratio
+
+
+_summarizing: Set[UUID] = set()
+# Keeps scheduled summaries referenced until they finish
+_tasks: Set[asyncio.Task] = set()
+
+
+async def summarize_session(client: httpx.AsyncClient, session_id: UUID, model: str):
+    """
+    Fold all but the most recent exchanges of a session into its running
+    summary. Runs after a turn has been answered, so the next turn pays for
+    one cold prefill instead of every turn paying for a trimmed prefix.
+    """
+    if session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    try:
+        session = await get_session(session_id)
+        history = await get_active_messages(session_id, session["summarized_through"])
+        if not needs_summary(session, history):
+            return
+
+        # Keep the recent messages, starting at a user message
+        keep = len(history) - CHAT_KEEP_RECENT
+        while keep > 0 and history[keep]["role"] != "user":
+            keep -= 1
+        if keep <= 0:
+            return
+        folded = history[:keep]
+
+        prompt = _SUMMARY_PROMPT
+        if session["summary"]:
+            prompt += f"Summary so far:\n{session['summary']}\n\n"
+        prompt += "\n\n".join(
+            f"{m['role'].capitalize()}: {m['display'] or m['content']}" for m in folded
+        )
+        summary = (await generate(client, model, prompt)).strip()
+        tokenizer = await get_prompt_tokenizer(model)
+        stored = await set_summary(
+            session_id,
+            summary,
+            tokenizer.count(_summary_message(summary)),
+            folded[-1]["id"],
+        )
+        if stored:
+            logger.info(
+                f"Summarized {len(folded)} messages of chat session {session_id} "
+                f"({sum(m['tokens'] for m in folded)} tokens) into "
+                f"{tokenizer.count(summary)} tokens"
+            )
+    except Exception as e:
+        logger.error(f"Failed to summarize chat session {session_id}: {str(e)}")
+    finally:
+        _summarizing.discard(session_id)
+
+
+def schedule_summary(client: httpx.AsyncClient, session_id: UUID, model: str) -> Optional[asyncio.Task]:
+    """Summarize a session in the background unless that is already under way."""
+    if session_id in _summarizing:
+        return None
+    task = asyncio.create_task(summarize_session(client, session_id, model))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def _summary_message(summary: str) -> str:
+    return f"Summary of the conversation so far:\n{summary}"
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ollama model family -> Hugging Face repo with the same tokenizer. Extend
+# with CHAT_TOKENIZERS="family=org/repo,..."
+DEFAULT_TOKENIZERS = {
+    "qwen2.5-coder": "Qwen/Qwen2.5-Coder-7B-Instruct",
+    "qwen2.5": "Qwen/Qwen2.5-7B-Instruct",
+    "qwen2": "Qwen/Qwen2-7B-Instruct",
+    "deepseek-coder": "deepseek-ai/deepseek-coder-6.7b-instruct",
+    "starcoder2": "bigcode/starcoder2-7b",
+}
+# Code averages roughly this many characters per token before calibration
+DEFAULT_CHARS_PER_TOKEN = 3.5
+# Tokenizers load from the local Hugging Face cache only unless set, so an
+# offline deployment estimates at once instead of waiting on the hub
+HF_ALLOW_DOWNLOADS = os.getenv("HF_ALLOW_DOWNLOADS", "false").lower() == "true"
+
+
+def _tokenizer_map() -> Dict[str, str]:
+    mapping = dict(DEFAULT_TOKENIZERS)
+    for entry in os.getenv("CHAT_TOKENIZERS", "").split(","):
+        if "=" in entry:
+            family, repo = entry.split("=", 1)
+            mapping[family.strip()] = repo.strip()
+    return mapping
+
+
+class PromptTokenizer:
+    """
+    Counts prompt tokens for an Ollama model. Uses the model's own
+    tokenizer when one is mapped and can be loaded; otherwise estimates
+    from a characters-per-token ratio that ``calibrate`` keeps adjusting to
+    the prompt_eval_count Ollama reports after each generation.
+    """
+
+    def __init__(self, model: str, tokenizer=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.chars_per_token = DEFAULT_CHARS_PER_TOKEN
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return max(1, round(len(text) / self.chars_per_token))
+
+    def calibrate(self, text: str, prompt_eval_count: int):
+        """Move the estimate towards an observed count for ``text``."""
+        if self.tokenizer is not None or not prompt_eval_count:
+            return
+        observed = len(text) / prompt_eval_count
+        # Ollama skips prompt tokens it already has cached; such counts are
+        # too low to learn from
+        if not 1.5 <= observed <= 8:
+            return
+        self.chars_per_token += 0.3 * (observed - self.chars_per_token)
+
+
+_tokenizers: Dict[str, PromptTokenizer] = {}
+_loading: Dict[str, asyncio.Task] = {}
+
+
+async def get_prompt_tokenizer(model: str) -> PromptTokenizer:
+    """The (cached) tokenizer for an Ollama model; loading happens off the event loop."""
+    if model in _tokenizers:
+        return _tokenizers[model]
+    if model not in _loading:
+        _loading[model] = asyncio.create_task(asyncio.to_thread(_load, model))
+    try:
+        _tokenizers[model] = await _loading[model]
+    finally:
+        _loading.pop(model, None)
+    return _tokenizers[model]
+
+
+def _load(model: str) -> PromptTokenizer:
+    repo = _tokenizer_repo(model)
+    if repo:
+        try:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(repo, local_files_only=not HF_ALLOW_DOWNLOADS)
+            logger.info(f"Counting prompt tokens for {model} with {repo}")
+            return PromptTokenizer(model, tokenizer)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {repo} for {model}, estimating instead: {e}")
+    return PromptTokenizer(model)
+
+
+def _tokenizer_repo(model: str) -> Optional[str]:
+    family = model.split(":", 1)[0].rsplit("/", 1)[-1]
+    mapping = _tokenizer_map()
+    # Longest matching family wins, so qwen2.5-coder beats qwen2.5
+    for name in sorted(mapping, key=len, reverse=True):
+        if family.startswith(name):
+            return mapping[name]
+    return None
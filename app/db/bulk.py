@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from typing import List, Optional
+from uuid import UUID
+
+from asyncpg import Connection
+
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+STAGING_COLUMNS = (
+    "file_path",
+    "blob_sha",
+    "chunk_index",
+    "start_line",
+    "end_line",
+    "content",
+    "embedding",
+)
+
+_CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS project_chunks_staging (
+        file_path text NOT NULL,
+        blob_sha varchar(64) NOT NULL,
+        chunk_index integer NOT NULL,
+        start_line integer NOT NULL,
+        end_line integer NOT NULL,
+        content text NOT NULL,
+        embedding vector(384) NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Taken before any chunk is touched: a concurrent set_vector_storage waits
+# for the batch, or the batch for it, so no row keeps the old mode
+_LOCK_STORAGE_MODE = """
+    SELECT vector_storage FROM projects WHERE id = $1 FOR SHARE
+"""
+
+# Files in the batch lose chunks they no longer have, then the staged chunks
+# are upserted with the compact vector of the project's storage mode ($2)
+_MERGE_STAGING = """
+    WITH removed AS (
+        DELETE FROM project_chunks c
+        USING (SELECT DISTINCT file_path FROM project_chunks_staging) s
+        WHERE c.project_id = $1
+          AND c.file_path = s.file_path
+          AND NOT EXISTS (
+              SELECT 1 FROM project_chunks_staging n
+              WHERE n.file_path = c.file_path AND n.chunk_index = c.chunk_index
+          )
+    )
+    INSERT INTO project_chunks (
+        project_id, 
+        file_path, 
+        blob_sha, 
+        chunk_index, 
+        start_line, 
+        end_line, 
+        content, 
+        embedding,
+        embedding_half,
+        embedding_bits
+    )
+    SELECT 
+        $1, s.file_path, s.blob_sha, s.chunk_index, s.start_line, s.end_line, s.content, s.embedding,
+        CASE WHEN $2::text = 'halfvec' THEN s.embedding::halfvec(384) END,
+        CASE WHEN $2::text = 'binary' THEN binary_quantize(s.embedding)::bit(384) END
+    FROM project_chunks_staging s
+    ON CONFLICT (project_id, file_path, chunk_index) DO UPDATE
+    SET blob_sha = EXCLUDED.blob_sha,
+        start_line = EXCLUDED.start_line,
+        end_line = EXCLUDED.end_line,
+        content = EXCLUDED.content,
+        embedding = EXCLUDED.embedding,
+        embedding_half = EXCLUDED.embedding_half,
+        embedding_bits = EXCLUDED.embedding_bits
+"""
+
+
+class BulkChunkWriter:
+    """
+    Streams chunk rows for one project into ``project_chunks``. Rows are
+    buffered into batches, sent with a binary ``COPY`` into a temporary
+    staging table and merged into the live table, one transaction per batch.
+
+    ``write`` blocks once ``max_pending`` batches are waiting, so producers
+    slow down to the pace the database can absorb. Every call to ``write``
+    must contain all chunks of the files it touches, since a file's chunks
+    are replaced as a unit.
+    """
+
+    def __init__(self, project_id: UUID, batch_rows: int = 5000, max_pending: int = 4):
+        self.project_id = project_id
+        self.batch_rows = batch_rows
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.batches_written = 0
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            return False
+        await self.close()
+        return False
+
+    async def write(self, rows: List[dict]):
+        """Queue rows for writing, waiting while the writer is saturated."""
+        if not rows:
+            return
+        await self._put(rows)
+
+    async def close(self):
+        """Flush everything still queued and wait for it to be committed."""
+        await self._put(None)
+        await self._task
+        logger.info(
+            f"Bulk wrote {self.rows_written} chunks in {self.batches_written} "
+            f"batches for project {self.project_id}"
+        )
+
+    async def _put(self, item: Optional[List[dict]]):
+        """
+        Queue ``item``, raising the flush error instead if the writer dies
+        first; a full queue would otherwise never drain.
+        """
+        if self._task.done():
+            await self._task
+        put = asyncio.ensure_future(self._queue.put(item))
+        try:
+            await asyncio.wait({put, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not put.done():
+                put.cancel()
+        if not put.done() or put.cancelled():
+            # The writer finished first, so it failed or was cancelled
+            await self._task
+            raise RuntimeError(f"Bulk writer for project {self.project_id} stopped")
+        put.result()
+
+    async def _flush_loop(self):
+        pool = get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(_CREATE_STAGING)
+            buffered: List[dict] = []
+            while True:
+                rows = await self._queue.get()
+                if rows is not None:
+                    buffered.extend(rows)
+                # Keep filling the batch from whatever is already queued
+                while rows is not None and len(buffered) < self.batch_rows and not self._queue.empty():
+                    rows = self._queue.get_nowait()
+                    if rows is not None:
+                        buffered.extend(rows)
+                if buffered and (len(buffered) >= self.batch_rows or rows is None or self._queue.empty()):
+                    await self._flush(conn, buffered)
+                    buffered = []
+                if rows is None:
+                    return
+
+    async def _flush(self, conn: Connection, rows: List[dict]):
+        try:
+            async with conn.transaction():
+                storage = await conn.fetchval(_LOCK_STORAGE_MODE, self.project_id)
+                await conn.copy_records_to_table(
+                    "project_chunks_staging",
+                    records=[tuple(row[column] for column in STAGING_COLUMNS) for row in rows],
+                    columns=STAGING_COLUMNS,
+                )
+                await conn.execute(_MERGE_STAGING, self.project_id, storage)
+            self.rows_written += len(rows)
+            self.batches_written += 1
+        except Exception as e:
+            logger.error(f"Failed to bulk write chunks for project {self.project_id}: {str(e)}")
+            raise
@@ -0,0 +1,303 @@
+from typing import List, Optional, Sequence
+from uuid import UUID
+import logging
+import os
+import re
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Set to "relaxed_order" on pgvector >= 0.8 so filtered ANN scans keep going
+# until k rows from the project are found instead of returning short
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "")
+# Candidates taken from each of the vector and full-text rankings before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 50))
+# Reciprocal rank fusion constant; larger values flatten the head of each list
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# How projects keep the vectors their ANN index is built on; see
+# set_vector_storage in db/project.py
+VECTOR_STORAGE_MODES = ("full", "halfvec", "binary")
+# Candidates read from a quantized index per result wanted, before they are
+# re-scored against the full-precision vectors
+HALFVEC_OVERSAMPLE = int(os.getenv("HALFVEC_OVERSAMPLE", 2))
+BINARY_OVERSAMPLE = int(os.getenv("BINARY_OVERSAMPLE", 8))
+# pgvector's default and upper bound for hnsw.ef_search
+_DEFAULT_EF_SEARCH, _MAX_EF_SEARCH = 40, 1000
+_OVERSAMPLE = {"halfvec": HALFVEC_OVERSAMPLE, "binary": BINARY_OVERSAMPLE}
+
+# Question words that would match nearly every chunk under the 'simple' config
+_STOP_WORDS = frozenset(
+    """
+    a an and are as at be by can do does for from how i in is it its me my
+    of on or should that the this to use used uses what when where which who
+    why will with you your
+    """.split()
+)
+
+
+async def delete_file_chunks(project_id: UUID, file_paths: List[str]) -> int:
+    pool = get_pool()
+    query = """
+        DELETE FROM project_chunks 
+        WHERE project_id = $1 AND file_path = ANY($2::text[])
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, project_id, file_paths)
+            deleted = int(result.split()[-1])
+            logger.info(f"Deleted {deleted} chunks for project {project_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to delete chunks for project {project_id}: {str(e)}")
+            raise
+
+async def delete_project_chunks(project_id: UUID) -> int:
+    pool = get_pool()
+    query = """
+        DELETE FROM project_chunks 
+        WHERE project_id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, project_id)
+            deleted = int(result.split()[-1])
+            logger.info(f"Cleared {deleted} chunks for project {project_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to clear chunks for project {project_id}: {str(e)}")
+            raise
+
+async def count_project_chunks(project_id: UUID) -> int:
+    pool = get_pool()
+    query = """
+        SELECT count(*) FROM project_chunks 
+        WHERE project_id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            return await conn.fetchval(query, project_id)
+        except Exception as e:
+            logger.error(f"Failed to count chunks for project {project_id}: {str(e)}")
+            raise
+
+async def search_chunks(
+    project_id: UUID,
+    embedding: Sequence[float],
+    k: int = 10,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    storage: str = "full",
+) -> List[dict]:
+    """
+    Return the ``k`` chunks of a project closest to ``embedding`` by cosine
+    distance, best first. ``ef_search`` (HNSW) and ``probes`` (IVFFlat) trade
+    latency for recall and only apply to this query. ``storage`` is the
+    project's vector storage mode.
+    """
+    pool = get_pool()
+    query = f"""
+        SELECT 
+            c.id,
+            c.file_path,
+            c.blob_sha,
+            c.chunk_index,
+            c.start_line,
+            c.end_line,
+            c.content,
+            1 - nearest.distance AS score
+        FROM ({_nearest_query(storage, "$3")}) nearest
+        JOIN project_chunks c ON c.id = nearest.id
+        ORDER BY nearest.distance
+    """
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                await _apply_search_settings(conn, ef_search, probes, _rescore_candidates(storage, k))
+                records = await conn.fetch(query, project_id, embedding, k)
+            return [dict(record) for record in records]
+        except Exception as e:
+            logger.error(f"Failed to search chunks for project {project_id}: {str(e)}")
+            raise
+
+async def hybrid_search_chunks(
+    project_id: UUID,
+    embedding: Sequence[float],
+    text: str,
+    k: int = 10,
+    candidates: int = HYBRID_CANDIDATES,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    storage: str = "full",
+) -> List[dict]:
+    """
+    Return the ``k`` best chunks of a project for a question, fusing the
+    nearest neighbours of ``embedding`` with full-text matches on the words
+    of ``text``. Both candidate lists and their reciprocal rank fusion are
+    computed in one query. Each row carries its ``vector_rank`` and
+    ``lexical_rank`` (NULL when it was not a candidate of that list).
+    """
+    pool = get_pool()
+    query = f"""
+        WITH vector AS (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM ({_nearest_query(storage, "$4")}) nearest
+        ),
+        lexical AS (
+            SELECT id, row_number() OVER (ORDER BY relevance DESC) AS rank
+            FROM (
+                SELECT id, ts_rank_cd(search_tsv, terms) AS relevance
+                FROM project_chunks, to_tsquery('simple', $3) terms
+                WHERE project_id = $1 AND search_tsv @@ terms
+                ORDER BY relevance DESC
+                LIMIT $4
+            ) matches
+        ),
+        fused AS (
+            SELECT 
+                coalesce(vector.id, lexical.id) AS id,
+                vector.rank AS vector_rank,
+                lexical.rank AS lexical_rank,
+                coalesce(1.0 / ($5 + vector.rank), 0)
+                    + coalesce(1.0 / ($5 + lexical.rank), 0) AS score
+            FROM vector FULL OUTER JOIN lexical ON vector.id = lexical.id
+        )
+        SELECT 
+            c.id,
+            c.file_path,
+            c.blob_sha,
+            c.chunk_index,
+            c.start_line,
+            c.end_line,
+            c.content,
+            fused.score::float8 AS score,
+            fused.vector_rank,
+            fused.lexical_rank
+        FROM fused JOIN project_chunks c ON c.id = fused.id
+        ORDER BY fused.score DESC
+        LIMIT $6
+    """
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                await _apply_search_settings(
+                    conn, ef_search, probes, _rescore_candidates(storage, candidates)
+                )
+                records = await conn.fetch(
+                    query, project_id, embedding, lexical_query(text), candidates, RRF_K, k
+                )
+            return [dict(record) for record in records]
+        except Exception as e:
+            logger.error(f"Failed to run hybrid search for project {project_id}: {str(e)}")
+            raise
+
+async def get_chunks_at_lines(project_id: UUID, locations: Sequence[tuple]) -> List[dict]:
+    """Chunks of a project covering each (file_path, line), in the order given."""
+    if not locations:
+        return []
+    pool = get_pool()
+    query = """
+        SELECT DISTINCT ON (c.id)
+            c.id,
+            c.file_path,
+            c.blob_sha,
+            c.chunk_index,
+            c.start_line,
+            c.end_line,
+            c.content,
+            t.position
+        FROM unnest($2::text[], $3::int[]) WITH ORDINALITY AS t(file_path, line, position)
+        JOIN project_chunks c
+          ON c.project_id = $1
+         AND c.file_path = t.file_path
+         AND t.line BETWEEN c.start_line AND c.end_line
+        ORDER BY c.id, t.position
+    """
+    paths = [path for path, _ in locations]
+    lines = [line for _, line in locations]
+    async with pool.acquire() as conn:
+        try:
+            records = await conn.fetch(query, project_id, paths, lines)
+        except Exception as e:
+            logger.error(f"Failed to fetch chunks by line for project {project_id}: {str(e)}")
+            raise
+    return [
+        {key: value for key, value in record.items() if key != "position"}
+        for record in sorted(records, key=lambda r: r["position"])
+    ]
+
+def lexical_query(text: str) -> Optional[str]:
+    """
+    Turn a free-form question into a tsquery that matches any of its
+    identifiers and words, or None when nothing is left to match. snake_case
+    and camelCase names also contribute their parts.
+    """
+    terms = []
+    for word in re.findall(r"\w+", text):
+        parts = [word] + word.split("_") + re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", word).split()
+        for part in parts:
+            part = part.lower()
+            if len(part) > 1 and part not in _STOP_WORDS and part not in terms:
+                terms.append(part)
+    # Only word characters remain, so the terms need no tsquery escaping
+    return " | ".join(terms) or None
+
+def _nearest_query(storage: str, limit: str) -> str:
+    """
+    SQL for the ``id`` and exact cosine ``distance`` of the ``limit`` chunks
+    of project $1 nearest to $2. Quantized modes read an oversampled
+    candidate set from their compact index and re-score it against the
+    full-precision vectors.
+    """
+    if storage == "full":
+        # Matches the predicate of the partial full-precision index
+        return f"""
+            SELECT id, embedding <=> $2::vector AS distance
+            FROM project_chunks
+            WHERE project_id = $1 AND embedding_half IS NULL AND embedding_bits IS NULL
+            ORDER BY embedding <=> $2::vector
+            LIMIT {limit}
+        """
+    if storage == "halfvec":
+        column, order = "embedding_half", "embedding_half <=> $2::vector::halfvec"
+    elif storage == "binary":
+        column, order = "embedding_bits", "embedding_bits <~> binary_quantize($2::vector)"
+    else:
+        raise ValueError(f"Unknown vector storage mode {storage!r}")
+    return f"""
+        SELECT id, embedding <=> $2::vector AS distance
+        FROM (
+            SELECT id, embedding
+            FROM project_chunks
+            WHERE project_id = $1 AND {column} IS NOT NULL
+            ORDER BY {order}
+            LIMIT {limit} * {_OVERSAMPLE[storage]}
+        ) candidates
+        ORDER BY distance
+        LIMIT {limit}
+    """
+
+def _rescore_candidates(storage: str, limit: int) -> int:
+    """Rows a quantized index scan must return for ``limit`` results; 0 for full precision."""
+    return 0 if storage == "full" else limit * _OVERSAMPLE[storage]
+
+async def _apply_search_settings(
+    conn, ef_search: Optional[int], probes: Optional[int], rescore_candidates: int = 0
+):
+    """
+    Settings are transaction-local so pooled connections stay clean. An HNSW
+    scan returns at most ef_search rows, so it is raised to cover the
+    candidates a quantized search re-scores.
+    """
+    if rescore_candidates > (ef_search or _DEFAULT_EF_SEARCH):
+        ef_search = min(rescore_candidates, _MAX_EF_SEARCH)
+    if ef_search:
+        await conn.execute("SELECT set_config('hnsw.ef_search', $1, true)", str(ef_search))
+    if probes:
+        await conn.execute("SELECT set_config('ivfflat.probes', $1, true)", str(probes))
+    if VECTOR_ITERATIVE_SCAN:
+        await conn.execute(
+            "SELECT set_config('hnsw.iterative_scan', $1, true), "
+            "set_config('ivfflat.iterative_scan', $1, true)",
+            VECTOR_ITERATIVE_SCAN,
+        )
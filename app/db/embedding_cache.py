@@ -0,0 +1,97 @@
+from datetime import timedelta
+from typing import Dict, List
+import logging
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def get_cached_embeddings(blob_shas: List[str], model_id: str) -> Dict[str, List[dict]]:
+    """Return cached chunks for each blob that has an entry, ordered by chunk index."""
+    pool = get_pool()
+    query = """
+        SELECT blob_sha, chunk_index, start_line, end_line, content, embedding
+        FROM embedding_cache 
+        WHERE blob_sha = ANY($1::text[]) AND model_id = $2
+        ORDER BY blob_sha, chunk_index
+    """
+    async with pool.acquire() as conn:
+        try:
+            records = await conn.fetch(query, blob_shas, model_id)
+        except Exception as e:
+            logger.error(f"Failed to read embedding cache: {str(e)}")
+            raise
+
+    cached: Dict[str, List[dict]] = {}
+    for record in records:
+        cached.setdefault(record["blob_sha"], []).append(
+            {
+                "chunk_index": record["chunk_index"],
+                "start_line": record["start_line"],
+                "end_line": record["end_line"],
+                "content": record["content"],
+                "embedding": record["embedding"],
+            }
+        )
+    logger.info(f"Embedding cache hits: {len(cached)}/{len(blob_shas)} blobs")
+    return cached
+
+async def store_cached_embeddings(model_id: str, rows: List[dict]) -> int:
+    """
+    Add chunks to the cache. Every row needs ``blob_sha``, ``chunk_index``,
+    ``start_line``, ``end_line``, ``content`` and ``embedding``. Existing entries are left untouched since a
+    blob's content never changes.
+    """
+    pool = get_pool()
+    query = """
+        INSERT INTO embedding_cache (
+            blob_sha, model_id, chunk_index, start_line, end_line, content, embedding
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (blob_sha, model_id, chunk_index) DO NOTHING
+    """
+    async with pool.acquire() as conn:
+        try:
+            await conn.executemany(
+                query,
+                [
+                    (
+                        row["blob_sha"],
+                        model_id,
+                        row["chunk_index"],
+                        row["start_line"],
+                        row["end_line"],
+                        row["content"],
+                        row["embedding"],
+                    )
+                    for row in rows
+                ],
+            )
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to store cached embeddings: {str(e)}")
+            raise
+
+async def collect_unreferenced_embeddings(grace_period: timedelta = timedelta(hours=1)) -> int:
+    """
+    Delete cache entries that no project row references. Entries younger
+    than ``grace_period`` are kept so an index run that has cached a blob but
+    not yet written its project rows is not undercut.
+    """
+    pool = get_pool()
+    query = """
+        DELETE FROM embedding_cache c
+        WHERE c.created_at < CURRENT_TIMESTAMP - $1::interval
+          AND NOT EXISTS (
+              SELECT 1 FROM project_chunks p WHERE p.blob_sha = c.blob_sha
+          )
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, grace_period)
+            deleted = int(result.split()[-1])
+            logger.info(f"Garbage-collected {deleted} unreferenced cache entries")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to garbage-collect embedding cache: {str(e)}")
+            raise
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Dict, List
+from uuid import UUID
+import logging
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+_CREATE_STAGING = """
+    CREATE TEMP TABLE IF NOT EXISTS file_history_staging (
+        file_path text NOT NULL,
+        commit_count integer NOT NULL,
+        last_commit varchar(64) NOT NULL,
+        last_author text,
+        last_modified timestamptz NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+async def apply_file_history(
+    project_id: UUID, summary: Dict[str, Dict], history_commit: str, replace: bool = False
+) -> int:
+    """
+    Merge a history summary from ``GitManager.walk_file_history`` into the
+    index and record the commit it reaches. A delta adds to existing commit
+    counts and takes over the last-modified fields, since its commits are
+    all newer; with ``replace`` the project's history is rebuilt instead.
+    """
+    pool = get_pool()
+    merge_query = """
+        INSERT INTO file_history (
+            project_id, file_path, commit_count, last_commit, last_author, last_modified
+        )
+        SELECT $1, file_path, commit_count, last_commit, last_author, last_modified
+        FROM file_history_staging
+        ON CONFLICT (project_id, file_path) DO UPDATE
+        SET commit_count = file_history.commit_count + EXCLUDED.commit_count,
+            last_commit = EXCLUDED.last_commit,
+            last_author = EXCLUDED.last_author,
+            last_modified = EXCLUDED.last_modified
+    """
+    records = [
+        (
+            path,
+            entry["commits"],
+            entry["last_commit"],
+            entry["last_author"],
+            datetime.fromisoformat(entry["last_modified"]),
+        )
+        for path, entry in summary.items()
+    ]
+    async with pool.acquire() as conn:
+        try:
+            await conn.execute(_CREATE_STAGING)
+            async with conn.transaction():
+                if replace:
+                    await conn.execute("DELETE FROM file_history WHERE project_id = $1", project_id)
+                if records:
+                    await conn.copy_records_to_table(
+                        "file_history_staging",
+                        records=records,
+                        columns=("file_path", "commit_count", "last_commit", "last_author", "last_modified"),
+                    )
+                    await conn.execute(merge_query, project_id)
+                await conn.execute(
+                    "UPDATE projects SET history_commit = $2 WHERE id = $1", project_id, history_commit
+                )
+            logger.info(f"Applied history of {len(records)} paths to project {project_id}")
+            return len(records)
+        except Exception as e:
+            logger.error(f"Failed to apply file history for project {project_id}: {str(e)}")
+            raise
+
+async def get_history_commit(project_id: UUID):
+    pool = get_pool()
+    query = """
+        SELECT history_commit FROM projects 
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            return await conn.fetchval(query, project_id)
+        except Exception as e:
+            logger.error(f"Failed to fetch history commit for project {project_id}: {str(e)}")
+            raise
+
+async def get_file_history_summary(project_id: UUID, file_paths: List[str]) -> Dict[str, dict]:
+    """Indexed history lookups: commit count and last change for each path."""
+    pool = get_pool()
+    query = """
+        SELECT 
+            file_path, 
+            commit_count, 
+            last_commit, 
+            last_author, 
+            last_modified
+        FROM file_history 
+        WHERE project_id = $1 AND file_path = ANY($2::text[])
+    """
+    async with pool.acquire() as conn:
+        try:
+            records = await conn.fetch(query, project_id, file_paths)
+            return {record["file_path"]: dict(record) for record in records}
+        except Exception as e:
+            logger.error(f"Failed to fetch file history for project {project_id}: {str(e)}")
+            raise
@@ -1,6 +1,12 @@
 from asyncpg.pool import Pool
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import asyncpg
 import os
+import time
+
+from ..metrics import Histogram
+from .vector import register_vector_codec
 
 
 DB_CONFIG = {
@@ -13,12 +19,33 @@ DB_CONFIG = {
 
 print(DB_CONFIG)
 
+DB_ACQUIRE_SECONDS = Histogram(
+    "ttlm_db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["operation"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "ttlm_db_query_seconds",
+    "Database statement execution time",
+    ["operation"],
+)
+
+# Names the queries of an acquire() block in the query-time histogram
+_operation: ContextVar[str] = ContextVar("db_operation", default="other")
+
 pool: Pool = None
 
+async def _init_connection(conn):
+    await register_vector_codec(conn)
+    conn.add_query_logger(_log_query)
+
+def _log_query(record):
+    DB_QUERY_SECONDS.observe(record.elapsed, operation=_operation.get())
+
 async def init_db():
     """Initialize database pool"""
     global pool
-    pool = await asyncpg.create_pool(**DB_CONFIG)
+    pool = await asyncpg.create_pool(**DB_CONFIG, init=_init_connection)
     return pool
 
 async def close_db():
@@ -29,3 +56,18 @@ async def close_db():
 def get_pool() -> Pool:
     """Get database pool"""
     return pool
+
+@asynccontextmanager
+async def acquire(operation: str):
+    """
+    A pooled connection, timing the wait for it and labelling the queries
+    run on it with ``operation``.
+    """
+    with DB_ACQUIRE_SECONDS.time(operation=operation):
+        conn = await pool.acquire()
+    token = _operation.set(operation)
+    try:
+        yield conn
+    finally:
+        _operation.reset(token)
+        await pool.release(conn)
@@ -0,0 +1,164 @@
+from typing import List, Optional, Tuple
+from uuid import UUID
+import json
+import logging
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+async def submit_job(repo_source: str, commit_sha: Optional[str]) -> Tuple[UUID, bool]:
+    """
+    Create a queued analysis job, or return the active job already covering
+    the same repository and commit. The flag is True when a job was created.
+    """
+    pool = get_pool()
+    insert_query = """
+        INSERT INTO analysis_jobs (repo_source, commit_sha)
+        VALUES ($1, $2)
+        ON CONFLICT (repo_source, (coalesce(commit_sha, ''))) 
+            WHERE status IN ('queued', 'running')
+        DO NOTHING
+        RETURNING id
+    """
+    existing_query = """
+        SELECT id FROM analysis_jobs 
+        WHERE repo_source = $1 
+          AND coalesce(commit_sha, '') = coalesce($2, '')
+          AND status IN ('queued', 'running')
+    """
+    async with pool.acquire() as conn:
+        try:
+            job_id = await conn.fetchval(insert_query, repo_source, commit_sha)
+            if job_id:
+                logger.info(f"Queued analysis job {job_id} for {repo_source}@{commit_sha}")
+                return job_id, True
+            job_id = await conn.fetchval(existing_query, repo_source, commit_sha)
+            if job_id:
+                logger.info(f"Merged submission for {repo_source}@{commit_sha} into job {job_id}")
+                return job_id, False
+            # The active job finished between the two statements; try again
+            return await submit_job(repo_source, commit_sha)
+        except Exception as e:
+            logger.error(f"Failed to submit job for {repo_source}: {str(e)}")
+            raise
+
+async def get_job(job_id: UUID) -> Optional[dict]:
+    pool = get_pool()
+    query = """
+        SELECT 
+            id, 
+            project_id, 
+            repo_source, 
+            commit_sha, 
+            status, 
+            stage, 
+            progress, 
+            result, 
+            error, 
+            created_at, 
+            started_at, 
+            finished_at
+        FROM analysis_jobs 
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            record = await conn.fetchrow(query, job_id)
+            if record is None:
+                return None
+            job = dict(record)
+            job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            return job
+        except Exception as e:
+            logger.error(f"Failed to fetch job {job_id}: {str(e)}")
+            raise
+
+async def start_job(job_id: UUID) -> bool:
+    """Mark a queued job as running. Returns False if it is no longer queued."""
+    pool = get_pool()
+    query = """
+        UPDATE analysis_jobs 
+        SET status = 'running', 
+            started_at = CURRENT_TIMESTAMP, 
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1 AND status = 'queued'
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, job_id)
+            return result.split()[-1] == "1"
+        except Exception as e:
+            logger.error(f"Failed to start job {job_id}: {str(e)}")
+            raise
+
+async def update_job_progress(
+    job_id: UUID, stage: str, progress: dict, project_id: Optional[UUID] = None
+) -> bool:
+    pool = get_pool()
+    query = """
+        UPDATE analysis_jobs 
+        SET stage = $2, 
+            progress = $3::jsonb, 
+            project_id = coalesce($4, project_id),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            await conn.execute(query, job_id, stage, json.dumps(progress), project_id)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update progress of job {job_id}: {str(e)}")
+            raise
+
+async def finish_job(
+    job_id: UUID, status: str, result: Optional[dict] = None, error: Optional[str] = None
+) -> bool:
+    pool = get_pool()
+    query = """
+        UPDATE analysis_jobs 
+        SET status = $2, 
+            result = $3::jsonb, 
+            error = $4,
+            finished_at = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            await conn.execute(
+                query, job_id, status, json.dumps(result) if result is not None else None, error
+            )
+            logger.info(f"Job {job_id} finished with status {status}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to finish job {job_id}: {str(e)}")
+            raise
+
+async def recover_jobs() -> List[UUID]:
+    """
+    Called at startup. Jobs left running by a previous process are failed;
+    queued jobs are returned so they can be handed to the runner again.
+    """
+    pool = get_pool()
+    fail_query = """
+        UPDATE analysis_jobs 
+        SET status = 'failed', 
+            error = 'Interrupted by server restart',
+            finished_at = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running'
+    """
+    queued_query = """
+        SELECT id FROM analysis_jobs 
+        WHERE status = 'queued' 
+        ORDER BY created_at
+    """
+    async with pool.acquire() as conn:
+        try:
+            await conn.execute(fail_query)
+            return [record["id"] for record in await conn.fetch(queued_query)]
+        except Exception as e:
+            logger.error(f"Failed to recover jobs: {str(e)}")
+            raise
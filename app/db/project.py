@@ -1,13 +1,13 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 import logging
-from .init import get_pool
+from .chunks import VECTOR_STORAGE_MODES
+from .init import acquire
 from ..models.project import ProjectCreate
 
 logger = logging.getLogger(__name__)
 
 async def create_project(project: ProjectCreate) -> UUID:
-    pool = get_pool()
     query = """
         INSERT INTO projects (
             name, 
@@ -21,7 +21,7 @@ async def create_project(project: ProjectCreate) -> UUID:
         VALUES ($1, $2, $3, $4, $5, $6, $7)
         RETURNING id
     """
-    async with pool.acquire() as conn:
+    async with acquire("create_project") as conn:
         try:
             project_id = await conn.fetchval(
                 query,
@@ -40,7 +40,6 @@ async def create_project(project: ProjectCreate) -> UUID:
             raise
 
 async def get_project(project_id: UUID) -> Optional[dict]:
-    pool = get_pool()
     query = """
         SELECT 
             id, 
@@ -51,20 +50,68 @@ async def get_project(project_id: UUID) -> Optional[dict]:
             default_branch,
             current_branch,
             last_commit,
+            indexed_commit,
+            include_globs,
+            exclude_globs,
+            max_file_size,
+            vector_storage,
             created_at,
             updated_at
         FROM projects 
         WHERE id = $1
     """
-    async with pool.acquire() as conn:
+    async with acquire("get_project") as conn:
         try:
             return await conn.fetchrow(query, project_id)
         except Exception as e:
             logger.error(f"Failed to fetch project {project_id}: {str(e)}")
             raise
 
+async def get_project_commits(project_id: UUID) -> Optional[dict]:
+    """
+    The project's checked-out and indexed commits, for keying caches, and
+    the vector storage mode its chunks are searched with.
+    """
+    query = """
+        SELECT last_commit, indexed_commit, vector_storage
+        FROM projects 
+        WHERE id = $1
+    """
+    async with acquire("get_project_commits") as conn:
+        try:
+            return await conn.fetchrow(query, project_id)
+        except Exception as e:
+            logger.error(f"Failed to fetch commits for project {project_id}: {str(e)}")
+            raise
+
+async def get_project_by_repo_url(repo_url: str) -> Optional[dict]:
+    query = """
+        SELECT 
+            id, 
+            name, 
+            repo_url,
+            repo_path,
+            default_branch,
+            current_branch,
+            last_commit,
+            indexed_commit,
+            include_globs,
+            exclude_globs,
+            max_file_size,
+            vector_storage
+        FROM projects 
+        WHERE repo_url = $1
+        ORDER BY created_at DESC
+        LIMIT 1
+    """
+    async with acquire("get_project_by_repo_url") as conn:
+        try:
+            return await conn.fetchrow(query, repo_url)
+        except Exception as e:
+            logger.error(f"Failed to fetch project for {repo_url}: {str(e)}")
+            raise
+
 async def get_all_projects():
-    pool = get_pool()
     query = """
         SELECT 
             id, 
@@ -79,7 +126,7 @@ async def get_all_projects():
         FROM projects 
         ORDER BY created_at DESC
     """
-    async with pool.acquire() as conn:
+    async with acquire("get_all_projects") as conn:
         try:
             projects = await conn.fetch(query)
             logger.info(f"Retrieved {len(projects)} projects")
@@ -89,7 +136,6 @@ async def get_all_projects():
             raise
 
 async def update_project_branch(project_id: UUID, branch: str, commit: str) -> bool:
-    pool = get_pool()
     query = """
         UPDATE projects 
         SET current_branch = $2, 
@@ -97,7 +143,7 @@ async def update_project_branch(project_id: UUID, branch: str, commit: str) -> b
             updated_at = CURRENT_TIMESTAMP
         WHERE id = $1
     """
-    async with pool.acquire() as conn:
+    async with acquire("update_project_branch") as conn:
         try:
             result = await conn.execute(query, project_id, branch, commit)
             logger.info(f"Updated project {project_id} to branch {branch} at commit {commit}")
@@ -105,3 +151,84 @@ async def update_project_branch(project_id: UUID, branch: str, commit: str) -> b
         except Exception as e:
             logger.error(f"Failed to update project {project_id} branch: {str(e)}")
             raise
+
+async def set_indexed_commit(project_id: UUID, commit: str) -> bool:
+    query = """
+        UPDATE projects 
+        SET indexed_commit = $2,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    async with acquire("set_indexed_commit") as conn:
+        try:
+            await conn.execute(query, project_id, commit)
+            logger.info(f"Project {project_id} indexed at commit {commit}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to set indexed commit for project {project_id}: {str(e)}")
+            raise
+
+async def set_index_filters(
+    project_id: UUID,
+    include_globs: Optional[List[str]],
+    exclude_globs: Optional[List[str]],
+    max_file_size: Optional[int],
+) -> bool:
+    # Changed filters can admit files an incremental index would never look
+    # at, so the next analysis starts from scratch
+    query = """
+        UPDATE projects 
+        SET include_globs = $2,
+            exclude_globs = $3,
+            max_file_size = $4,
+            indexed_commit = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    async with acquire("set_index_filters") as conn:
+        try:
+            await conn.execute(query, project_id, include_globs, exclude_globs, max_file_size)
+            logger.info(f"Updated index filters for project {project_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update index filters for project {project_id}: {str(e)}")
+            raise
+
+async def set_vector_storage(project_id: UUID, storage: str) -> int:
+    """
+    Switch how a project's vectors are indexed, converting its existing
+    chunks in the same transaction; returns how many were converted. The
+    full-precision ``embedding`` is kept in every mode, so no re-index is
+    needed and switching back is lossless.
+    """
+    if storage not in VECTOR_STORAGE_MODES:
+        raise ValueError(f"Vector storage must be one of {', '.join(VECTOR_STORAGE_MODES)}")
+    # Locks the project row before any chunk, as the bulk writer does
+    lock_query = """
+        SELECT vector_storage FROM projects WHERE id = $1 FOR UPDATE
+    """
+    project_query = """
+        UPDATE projects 
+        SET vector_storage = $2,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    chunks_query = """
+        UPDATE project_chunks 
+        SET embedding_half = CASE WHEN $2::text = 'halfvec' THEN embedding::halfvec(384) END,
+            embedding_bits = CASE WHEN $2::text = 'binary' THEN binary_quantize(embedding)::bit(384) END
+        WHERE project_id = $1
+    """
+    async with acquire("set_vector_storage") as conn:
+        try:
+            async with conn.transaction():
+                if await conn.fetchval(lock_query, project_id) == storage:
+                    return 0
+                await conn.execute(project_query, project_id, storage)
+                result = await conn.execute(chunks_query, project_id, storage)
+            converted = int(result.split()[-1])
+            logger.info(f"Switched project {project_id} to {storage} vectors ({converted} chunks)")
+            return converted
+        except Exception as e:
+            logger.error(f"Failed to switch vector storage for project {project_id}: {str(e)}")
+            raise
@@ -0,0 +1,44 @@
+from typing import Any, Optional
+import json
+import logging
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def get_entry(key: str) -> Optional[Any]:
+    """The value stored under ``key``, or None when missing or expired."""
+    pool = get_pool()
+    query = """
+        SELECT value FROM retrieval_cache
+        WHERE key = $1 AND expires_at > CURRENT_TIMESTAMP
+    """
+    async with pool.acquire() as conn:
+        value = await conn.fetchval(query, key)
+    return json.loads(value) if value is not None else None
+
+async def put_entry(key: str, value: Any, ttl: float):
+    pool = get_pool()
+    query = """
+        INSERT INTO retrieval_cache (key, value, expires_at)
+        VALUES ($1, $2::jsonb, CURRENT_TIMESTAMP + make_interval(secs => $3))
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+    """
+    async with pool.acquire() as conn:
+        await conn.execute(query, key, json.dumps(value, default=str), ttl)
+
+async def purge_expired_entries() -> int:
+    pool = get_pool()
+    query = """
+        DELETE FROM retrieval_cache WHERE expires_at <= CURRENT_TIMESTAMP
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query)
+            deleted = int(result.split()[-1])
+            logger.info(f"Purged {deleted} expired retrieval cache entries")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to purge retrieval cache: {str(e)}")
+            raise
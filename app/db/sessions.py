@@ -0,0 +1,128 @@
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID
+import logging
+from .init import get_pool
+
+logger = logging.getLogger(__name__)
+
+async def create_session(model: str, project_id: Optional[UUID] = None) -> UUID:
+    pool = get_pool()
+    query = """
+        INSERT INTO chat_sessions (model, project_id)
+        VALUES ($1, $2)
+        RETURNING id
+    """
+    async with pool.acquire() as conn:
+        try:
+            session_id = await conn.fetchval(query, model, project_id)
+            logger.info(f"Created chat session {session_id} for {model}")
+            return session_id
+        except Exception as e:
+            logger.error(f"Failed to create chat session: {str(e)}")
+            raise
+
+async def get_session(session_id: UUID) -> Optional[dict]:
+    pool = get_pool()
+    query = """
+        SELECT
+            id,
+            project_id,
+            model,
+            summary,
+            summary_tokens,
+            summarized_through,
+            created_at,
+            updated_at
+        FROM chat_sessions
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            return await conn.fetchrow(query, session_id)
+        except Exception as e:
+            logger.error(f"Failed to fetch chat session {session_id}: {str(e)}")
+            raise
+
+async def get_active_messages(session_id: UUID, after_id: int = 0) -> List[dict]:
+    """The session's messages not yet folded into its summary, oldest first."""
+    pool = get_pool()
+    query = """
+        SELECT id, role, content, display, tokens
+        FROM chat_messages
+        WHERE session_id = $1 AND id > $2
+        ORDER BY id
+    """
+    async with pool.acquire() as conn:
+        try:
+            return [dict(record) for record in await conn.fetch(query, session_id, after_id)]
+        except Exception as e:
+            logger.error(f"Failed to fetch messages of chat session {session_id}: {str(e)}")
+            raise
+
+async def append_messages(
+    session_id: UUID,
+    messages: Sequence[Tuple[str, str, Optional[str], int]],
+):
+    """Add (role, content, display, tokens) messages to a session, in order."""
+    pool = get_pool()
+    insert_query = """
+        INSERT INTO chat_messages (session_id, role, content, display, tokens)
+        SELECT $1, m.role, m.content, m.display, m.tokens
+        FROM unnest($2::text[], $3::text[], $4::text[], $5::int[])
+            WITH ORDINALITY AS m(role, content, display, tokens, position)
+        ORDER BY m.position
+    """
+    touch_query = """
+        UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                await conn.execute(
+                    insert_query,
+                    session_id,
+                    [m[0] for m in messages],
+                    [m[1] for m in messages],
+                    [m[2] for m in messages],
+                    [m[3] for m in messages],
+                )
+                await conn.execute(touch_query, session_id)
+        except Exception as e:
+            logger.error(f"Failed to store messages of chat session {session_id}: {str(e)}")
+            raise
+
+async def set_summary(session_id: UUID, summary: str, tokens: int, through_id: int) -> bool:
+    """
+    Replace the session's summary with one covering messages up to
+    ``through_id``. A summary older than the stored one is discarded.
+    """
+    pool = get_pool()
+    query = """
+        UPDATE chat_sessions
+        SET summary = $2,
+            summary_tokens = $3,
+            summarized_through = $4,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1 AND summarized_through < $4
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, session_id, summary, tokens, through_id)
+            return result.split()[-1] == "1"
+        except Exception as e:
+            logger.error(f"Failed to store summary of chat session {session_id}: {str(e)}")
+            raise
+
+async def set_session_model(session_id: UUID, model: str):
+    pool = get_pool()
+    query = """
+        UPDATE chat_sessions
+        SET model = $2, updated_at = CURRENT_TIMESTAMP
+        WHERE id = $1
+    """
+    async with pool.acquire() as conn:
+        try:
+            await conn.execute(query, session_id, model)
+        except Exception as e:
+            logger.error(f"Failed to set model of chat session {session_id}: {str(e)}")
+            raise
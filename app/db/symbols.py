@@ -0,0 +1,154 @@
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+import logging
+from .init import get_pool
+from ..indexing.symbols import Symbol
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_COLUMNS = ("blob_sha", "name", "kind", "role", "line", "container")
+
+# The project's current files, taken from its chunk rows
+_PROJECT_FILES = """
+    files AS (
+        SELECT DISTINCT file_path, blob_sha FROM project_chunks WHERE project_id = $1
+    )
+"""
+
+
+async def get_extracted_blobs(blob_shas: List[str]) -> Set[str]:
+    """The subset of ``blob_shas`` whose symbols are already in the index."""
+    pool = get_pool()
+    query = """
+        SELECT blob_sha FROM symbol_blobs
+        WHERE blob_sha = ANY($1::text[])
+    """
+    async with pool.acquire() as conn:
+        try:
+            return {record["blob_sha"] for record in await conn.fetch(query, blob_shas)}
+        except Exception as e:
+            logger.error(f"Failed to read symbol blobs: {str(e)}")
+            raise
+
+async def store_symbols(blobs: Dict[str, Tuple[Optional[str], List[Symbol]]]) -> int:
+    """
+    Record the symbols of each blob, given as blob SHA -> (language,
+    symbols). Blobs another index run stored first are left alone, so
+    concurrent runs never duplicate rows.
+    """
+    if not blobs:
+        return 0
+    pool = get_pool()
+    claim_query = """
+        INSERT INTO symbol_blobs (blob_sha, language)
+        SELECT * FROM unnest($1::text[], $2::text[])
+        ON CONFLICT (blob_sha) DO NOTHING
+        RETURNING blob_sha
+    """
+    shas = list(blobs)
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                claimed = await conn.fetch(claim_query, shas, [blobs[sha][0] for sha in shas])
+                records = [
+                    (record["blob_sha"], s.name, s.kind, s.role, s.line, s.container)
+                    for record in claimed
+                    for s in blobs[record["blob_sha"]][1]
+                ]
+                if records:
+                    await conn.copy_records_to_table(
+                        "symbols", records=records, columns=SYMBOL_COLUMNS
+                    )
+            return len(records)
+        except Exception as e:
+            logger.error(f"Failed to store symbols: {str(e)}")
+            raise
+
+async def find_symbols(
+    project_id: UUID,
+    name: str,
+    role: Optional[str] = None,
+    fuzzy: bool = False,
+    limit: int = 20,
+) -> List[dict]:
+    """
+    Symbols named ``name`` in a project's current files, definitions first.
+    With ``fuzzy`` the name is matched by trigram similarity or as a
+    substring instead, best match first; both use the trigram index.
+    """
+    pool = get_pool()
+    if fuzzy:
+        match = "(s.name % $2 OR s.name ILIKE $5)"
+        order = "similarity DESC, s.role, f.file_path, s.line"
+    else:
+        match = "s.name = $2"
+        order = "s.role, f.file_path, s.line"
+    query = f"""
+        WITH {_PROJECT_FILES}
+        SELECT
+            f.file_path,
+            s.name,
+            s.kind,
+            s.role,
+            s.line,
+            s.container,
+            similarity(s.name, $2) AS similarity
+        FROM symbols s JOIN files f ON f.blob_sha = s.blob_sha
+        WHERE {match} AND ($3::text IS NULL OR s.role = $3)
+        ORDER BY {order}
+        LIMIT $4
+    """
+    args = [project_id, name, role, limit]
+    if fuzzy:
+        args.append(f"%{_escape_like(name)}%")
+    async with pool.acquire() as conn:
+        try:
+            return [dict(record) for record in await conn.fetch(query, *args)]
+        except Exception as e:
+            logger.error(f"Failed to look up symbol {name!r} in project {project_id}: {str(e)}")
+            raise
+
+async def find_definitions(project_id: UUID, names: Sequence[str], limit: int = 20) -> List[dict]:
+    """Exact definitions of any of ``names`` in a project."""
+    pool = get_pool()
+    query = f"""
+        WITH {_PROJECT_FILES}
+        SELECT f.file_path, s.name, s.kind, s.role, s.line, s.container
+        FROM symbols s JOIN files f ON f.blob_sha = s.blob_sha
+        WHERE s.name = ANY($2::text[]) AND s.role = 'definition'
+        ORDER BY f.file_path, s.line
+        LIMIT $3
+    """
+    async with pool.acquire() as conn:
+        try:
+            return [dict(record) for record in await conn.fetch(query, project_id, list(names), limit)]
+        except Exception as e:
+            logger.error(f"Failed to look up definitions in project {project_id}: {str(e)}")
+            raise
+
+async def collect_unreferenced_symbols(grace_period: timedelta = timedelta(hours=1)) -> int:
+    """
+    Delete the symbols of blobs no project row references, with the same
+    grace period as the embedding cache.
+    """
+    pool = get_pool()
+    query = """
+        DELETE FROM symbol_blobs b
+        WHERE b.created_at < CURRENT_TIMESTAMP - $1::interval
+          AND NOT EXISTS (
+              SELECT 1 FROM project_chunks p WHERE p.blob_sha = b.blob_sha
+          )
+    """
+    async with pool.acquire() as conn:
+        try:
+            result = await conn.execute(query, grace_period)
+            deleted = int(result.split()[-1])
+            logger.info(f"Garbage-collected symbols of {deleted} unreferenced blobs")
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to garbage-collect symbols: {str(e)}")
+            raise
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,37 @@
+import logging
+import struct
+from typing import List, Sequence
+
+from asyncpg import Connection
+
+logger = logging.getLogger(__name__)
+
+# pgvector's binary format: uint16 dimensions, uint16 unused, then float32s,
+# all big-endian
+_HEADER = struct.Struct(">HH")
+
+
+def encode_vector(embedding: Sequence[float]) -> bytes:
+    dim = len(embedding)
+    return _HEADER.pack(dim, 0) + struct.pack(f">{dim}f", *embedding)
+
+def decode_vector(data: bytes) -> List[float]:
+    dim, _ = _HEADER.unpack_from(data)
+    return list(struct.unpack_from(f">{dim}f", data, _HEADER.size))
+
+async def register_vector_codec(conn: Connection):
+    """
+    Teach a connection to send and receive ``vector`` values as Python
+    sequences in binary form. Binary COPY requires this; it also avoids
+    formatting and parsing text literals for every query.
+    """
+    try:
+        await conn.set_type_codec(
+            "vector",
+            schema="public",
+            encoder=encode_vector,
+            decoder=decode_vector,
+            format="binary",
+        )
+    except ValueError:
+        logger.warning("pgvector extension not installed; vector codec not registered")
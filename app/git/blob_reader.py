@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional, Tuple, Union
+
+from .exceptions import RepositoryValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class BlobReader:
+    """
+    A long-running ``git cat-file --batch`` process for one repository.
+
+    ``read_blobs`` pipes object ids to git from one task while another reads
+    the replies, so many blobs stream through a single process instead of
+    one ``git show`` per file. At most ``max_in_flight`` requests are written
+    ahead of the replies being consumed, which bounds buffered memory.
+    """
+
+    def __init__(self, git_dir: Union[str, Path], max_in_flight: int = 64):
+        self.git_dir = str(git_dir)
+        self.max_in_flight = max_in_flight
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._closing: Optional[asyncio.subprocess.Process] = None
+        # Replies come back in request order, so one batch at a time
+        self._lock = asyncio.Lock()
+
+    async def _ensure_process(self) -> asyncio.subprocess.Process:
+        if self._process is None or self._process.returncode is not None:
+            self._process = await asyncio.create_subprocess_exec(
+                "git",
+                "--git-dir",
+                self.git_dir,
+                "cat-file",
+                "--batch",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            logger.info(f"Started cat-file reader for {self.git_dir}")
+        return self._process
+
+    async def read_blobs(self, shas: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[memoryview]]]:
+        """
+        Yield ``(sha, content)`` for each requested object, in request order.
+        Content is a memoryview over the bytes read from the pipe, so it is
+        handed on without another copy; missing objects yield ``None``.
+        """
+        async with self._lock:
+            process = await self._ensure_process()
+            # Requests written but not yet answered; bounded so git cannot
+            # run arbitrarily far ahead of the consumer
+            in_flight: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+            written = 0
+            read = 0
+
+            async def feed():
+                nonlocal written
+                try:
+                    for sha in shas:
+                        await in_flight.put(sha)
+                        process.stdin.write(f"{sha}\n".encode())
+                        written += 1
+                        await process.stdin.drain()
+                except Exception:
+                    # Wake the reader; the error is raised from ``await feeder``
+                    await in_flight.put(None)
+                    raise
+                await in_flight.put(None)
+
+            feeder = asyncio.create_task(feed())
+            try:
+                while True:
+                    if await in_flight.get() is None:
+                        break
+                    sha, content = await self._read_reply(process)
+                    read += 1
+                    yield sha, content
+                # Surface errors raised while writing requests
+                await feeder
+            finally:
+                if not feeder.done():
+                    feeder.cancel()
+                    try:
+                        await feeder
+                    except (asyncio.CancelledError, Exception):
+                        pass
+                # Keep the pipe in sync if the consumer stopped early
+                while read < written:
+                    await self._read_reply(process)
+                    read += 1
+
+    async def _read_reply(self, process) -> Tuple[str, Optional[memoryview]]:
+        header = await process.stdout.readline()
+        if not header:
+            raise RepositoryValidationError("cat-file reader exited unexpectedly")
+        fields = header.decode().split()
+        if len(fields) == 2 and fields[1] == "missing":
+            return fields[0], None
+        sha, _, size = fields
+        size = int(size)
+        # Content is followed by a newline separator
+        data = await process.stdout.readexactly(size + 1)
+        return sha, memoryview(data)[:size]
+
+    def close(self):
+        """Close the request pipe; git exits once it sees EOF."""
+        if self._process and self._process.returncode is None:
+            self._process.stdin.close()
+            self._closing = self._process
+        self._process = None
+
+    async def wait_closed(self):
+        if self._closing:
+            await self._closing.wait()
+            self._closing = None
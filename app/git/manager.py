@@ -1,34 +1,62 @@
+import asyncio
+import hashlib
 import logging
 import os
 import re
+import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 
-from git import Repo
+from git import Git, Repo
+from git.exc import GitCommandError
+from gitdb import GitDB
+from gitdb.exc import BadName
 
+from ..metrics import Histogram
+from .blob_reader import BlobReader
 from .exceptions import RepositoryValidationError
-from .models import RepositoryInfo
+from .metadata import metadata_service
+from .models import CloneOptions, RepositoryInfo
+from .pool import run_git
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+GIT_OPERATION_SECONDS = Histogram(
+    "ttlm_git_operation_seconds",
+    "Duration of git operations, including the wait for a git worker",
+    ["operation"],
+)
+
 
 class GitManager:
-    def __init__(self, workspace_dir: Union[str, Path] = None):
+    def __init__(
+        self,
+        workspace_dir: Union[str, Path] = None,
+        clone_options: Optional[CloneOptions] = None,
+    ):
         """
         Initialize GitManager with a persistent workspace directory for repositories.
 
 
             Args:
             workspace_dir: Directory to store repositories. Creates 'repositories' subdirectory.
+            clone_options: Depth, partial-clone filter and single-branch settings
+                for remote clones. Defaults to the GIT_CLONE_* environment.
         """
+        self.clone_options = clone_options or CloneOptions.from_env()
         base_dir = Path(workspace_dir) if workspace_dir else Path.home() / ".ttlm"
         self.repos_dir = base_dir / "repositories"
         self.repos_dir.mkdir(parents=True, exist_ok=True)
         self.repo = None
         self.repo_info = None
+        # GitPython's persistent cat-file helpers are not thread-safe, so calls
+        # on one repository are serialized while different repositories run
+        # in parallel on the git pool
+        self._lock = asyncio.Lock()
+        self._blob_reader: Optional[BlobReader] = None
 
         self.logger = logging.getLogger("GitManager")
         self.logger.setLevel(logging.INFO)
@@ -36,6 +64,27 @@ class GitManager:
             f"GitManager initialized with repos directory: {self.repos_dir}"
         )
 
+    async def _run(self, func, *args):
+        async with self._lock:
+            with GIT_OPERATION_SECONDS.time(operation=func.__name__.lstrip("_")):
+                return await run_git(func, *args)
+
+    def close(self):
+        """Release the repository's open files and git helper processes."""
+        if self._blob_reader:
+            self._blob_reader.close()
+            self._blob_reader = None
+        if self.repo:
+            self.repo.close()
+            self.repo = None
+
+    async def aclose(self):
+        """Like ``close``, but also waits for the blob reader to exit."""
+        reader = self._blob_reader
+        self.close()
+        if reader:
+            await reader.wait_closed()
+
     def is_git_url(self, repo_source: str) -> bool:
         git_url_patterns = [
             r"^git@[a-zA-Z0-9.-]+:[a-zA-Z0-9/._-]+\.git$",  # SSH URL
@@ -55,11 +104,40 @@ class GitManager:
         self.logger.debug(f"Extracted repo name: {name} from source: {repo_source}")
         return name
 
+    def clone_dir_name(self, repo_url: str) -> str:
+        """
+        Workspace directory for a remote clone: the repository name plus a
+        hash of the URL, so same-named repositories of different owners
+        never share a clone.
+        """
+        normalized = repo_url.strip().rstrip("/").removesuffix(".git")
+        digest = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+        return f"{self.get_repo_name(repo_url)}-{digest}"
+
+    def resolve_head(self, repo_source: str) -> Optional[str]:
+        """
+        Best-effort lookup of the commit HEAD points at, without cloning.
+        Uses ls-remote for URLs. Returns None when it cannot be determined.
+        """
+        try:
+            if self.is_git_url(repo_source):
+                output = Git().ls_remote(repo_source, "HEAD")
+                return output.split()[0] if output else None
+            # Closing releases the cat-file helpers and handles the Repo opens
+            with Repo(Path(repo_source).resolve()) as repo:
+                return repo.head.commit.hexsha
+        except Exception as e:
+            self.logger.warning(f"Could not resolve HEAD of {repo_source}: {e}")
+            return None
+
     async def initialize_repository(self, repo_source: str) -> RepositoryInfo:
         """
         Initialize or update a repository. For remote repos, maintains a persistent clone.
         For local repos, uses the original location.
         """
+        return await self._run(self._initialize_repository, repo_source)
+
+    def _initialize_repository(self, repo_source: str) -> RepositoryInfo:
         try:
             self.logger.info(f"Starting repository initialization from: {repo_source}")
             repo_name = self.get_repo_name(repo_source)
@@ -78,31 +156,48 @@ class GitManager:
                     self.logger.info(f"Creating symlink at: {workspace_path}")
                     os.symlink(repo_path, workspace_path)
 
-                self.repo = Repo(repo_path)
+                # Re-initializing an open handle keeps its Repo and helper processes
+                if self.repo is None or Path(self.repo.working_dir) != repo_path:
+                    self.close()
+                    self.repo = Repo(repo_path)
             else:
-                self.logger.info(f"Cloning new repository to: {repo_path}")
-                try:
-                    self.repo = Repo.clone_from(repo_source, repo_path)
-                    self.logger.info("Clone completed successfully")
-                except Exception as e:
-                    self.logger.error(f"Clone failed: {str(e)}")
-                    raise
+                repo_path = self.repos_dir / self.clone_dir_name(repo_source)
+                if (repo_path / ".git").exists():
+                    if self.repo is None or Path(self.repo.working_dir) != repo_path:
+                        self.close()
+                        self.repo = Repo(repo_path)
+                    with GIT_OPERATION_SECONDS.time(operation="fetch"):
+                        self._fetch_in_place()
+                else:
+                    self.logger.info(f"Cloning new repository to: {repo_path}")
+                    try:
+                        self.close()
+                        with GIT_OPERATION_SECONDS.time(operation="clone"):
+                            self.repo = Repo.clone_from(
+                                repo_source,
+                                repo_path,
+                                multi_options=self.clone_options.clone_args(),
+                            )
+                        self.logger.info("Clone completed successfully")
+                    except Exception as e:
+                        self.logger.error(f"Clone failed: {str(e)}")
+                        raise
 
             if self.repo.bare:
                 raise RepositoryValidationError("Invalid repository: bare repository")
 
-            # Get repository information using Git internals
-            default_branch = self.repo.active_branch.name
-            head_commit = self.repo.head.commit
+            # rev-list counts cached by ref tips, backed by a commit-graph in
+            # our own clones only
+            metadata = metadata_service.get(self.repo, write_commit_graph=not is_local)
 
             self.repo_info = RepositoryInfo(
                 name=repo_name,
                 path=repo_path,
                 is_local=is_local,
-                default_branch=default_branch,
-                last_commit=head_commit.hexsha,
-                commit_count=sum(1 for _ in self.repo.iter_commits()),
-                branch_count=len([b for b in self.repo.branches]),
+                default_branch=metadata.head_branch or "HEAD",
+                last_commit=metadata.head_commit,
+                commit_count=metadata.commit_count,
+                branch_count=metadata.branch_count,
             )
 
             self.logger.info(f"Repository initialized successfully: {repo_name}")
@@ -114,39 +209,234 @@ class GitManager:
             self.logger.error(error_msg)
             raise RepositoryValidationError(error_msg)
 
+    def _fetch_in_place(self):
+        """
+        Update an existing clone from its remote and move the checked-out
+        branch to the fetched tip. Only new objects are transferred, and a
+        partial clone keeps skipping blobs until they are read.
+        """
+        branch = None if self.repo.head.is_detached else self.repo.active_branch.name
+        self.logger.info(f"Fetching updates into {self.repo.working_dir}")
+        self.repo.git.fetch("origin", *self.clone_options.fetch_args())
+        if branch and f"origin/{branch}" in [ref.name for ref in self.repo.remotes.origin.refs]:
+            # The clone is ours, so the branch can simply follow the remote.
+            # Partial clones have no checkout to update.
+            mode = "--soft" if self.is_partial_clone else "--hard"
+            self.repo.git.reset(mode, f"origin/{branch}")
+
+    @property
+    def is_partial_clone(self) -> bool:
+        if not self.repo:
+            return False
+        with self.repo.config_reader() as config:
+            return config.get_value('remote "origin"', "promisor", False) is True
+
+    async def prefetch_blobs(self, blob_hashes: Iterable[str]) -> int:
+        """
+        In a partial clone, fetch the given blobs that are not yet local in a
+        single request, instead of letting each read fault them in one by
+        one. Returns the number of blobs requested; a no-op for full clones.
+        """
+        return await self._run(self._prefetch_blobs, list(blob_hashes))
+
+    def _prefetch_blobs(self, blob_hashes: List[str]) -> int:
+        if not self.is_partial_clone:
+            return 0
+        # gitdb reads the object store directly, so checking for a blob here
+        # does not trigger git's own lazy fetch
+        odb = GitDB(str(Path(self.repo.git_dir) / "objects"))
+        missing = [sha for sha in blob_hashes if not odb.has_object(bytes.fromhex(sha))]
+        if not missing:
+            return 0
+
+        self.logger.info(f"Prefetching {len(missing)} blobs from origin")
+        subprocess.run(
+            [
+                "git",
+                "-c",
+                "fetch.negotiationAlgorithm=noop",
+                "fetch",
+                "origin",
+                "--no-tags",
+                "--no-write-fetch-head",
+                "--recurse-submodules=no",
+                f"--filter={self.clone_options.blob_filter or 'blob:none'}",
+                "--stdin",
+            ],
+            cwd=self.repo.working_dir,
+            input="\n".join(missing) + "\n",
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return len(missing)
+
     async def get_file_tree(self, commit_hash: Optional[str] = None) -> List[Dict]:
         """
         Get the repository file tree structure at a specific commit.
         If no commit_hash is provided, uses HEAD.
         """
+        return await self._run(self._get_file_tree, commit_hash)
+
+    def _get_file_tree(self, commit_hash: Optional[str] = None) -> List[Dict]:
         if not self.repo:
             raise RepositoryValidationError("Repository not initialized")
 
         self.logger.info(f"Getting file tree for commit: {commit_hash or 'HEAD'}")
         commit = self.repo.commit(commit_hash) if commit_hash else self.repo.head.commit
 
+        # ls-tree -l reads every blob header for its size, which in a partial
+        # clone would fetch each missing blob; there sizes stay unknown (None)
+        # until the content is read
+        with_sizes = not self.is_partial_clone
+        args = ["-r", "-z", "--full-tree"] + (["-l"] if with_sizes else [])
+        output = self.repo.git.ls_tree(*args, commit.hexsha)
+
         files = []
-        for item in commit.tree.traverse():
-            # Skip if it's a tree (directory)
-            if item.type != "blob":
+        # Each entry is "<mode> <type> <sha>[ <size>]\t<path>"
+        for entry in output.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            fields = meta.split()
+            # Skip trees and submodule commits
+            if fields[1] != "blob":
                 continue
 
             files.append(
                 {
-                    "path": item.path,
-                    "size": item.size,
-                    "mode": item.mode,
-                    "hash": item.hexsha,
+                    "path": path,
+                    "size": int(fields[3]) if with_sizes else None,
+                    "mode": int(fields[0], 8),
+                    "hash": fields[2],
                 }
             )
 
         self.logger.info(f"Found {len(files)} files in tree")
         return sorted(files, key=lambda x: x["path"])
 
+    async def read_attributes_files(self, commit_hash: str) -> Dict[str, str]:
+        """
+        Contents of every .gitattributes file in a commit's tree, keyed by
+        the directory it applies to ("" for the root).
+        """
+        found = await self._run(self._find_attributes_files, commit_hash)
+        await self.prefetch_blobs(found.values())
+
+        by_hash: Dict[str, List[str]] = {}
+        for directory, blob_hash in found.items():
+            by_hash.setdefault(blob_hash, []).append(directory)
+        files = {}
+        async for blob_hash, data in self.read_blobs(by_hash.keys()):
+            if data is not None:
+                for directory in by_hash[blob_hash]:
+                    files[directory] = str(data, "utf-8", "replace")
+        return files
+
+    def _find_attributes_files(self, commit_hash: str) -> Dict[str, str]:
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+
+        output = self.repo.git.ls_tree("-r", "-z", "--full-tree", commit_hash)
+        found = {}
+        for entry in output.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            if path == ".gitattributes" or path.endswith("/.gitattributes"):
+                found[path.rpartition("/")[0]] = meta.split()[2]
+        return found
+
+    async def diff_trees(self, old_commit: str, new_commit: str) -> List[Dict]:
+        """
+        List blob changes between two commits using git's raw tree diff.
+        Renames are reported as a delete plus an add so callers only have to
+        handle "A", "M" and "D".
+        """
+        return await self._run(self._diff_trees, old_commit, new_commit)
+
+    def _diff_trees(self, old_commit: str, new_commit: str) -> List[Dict]:
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+
+        self.logger.info(f"Diffing trees {old_commit[:12]}..{new_commit[:12]}")
+        output = self.repo.git.diff_tree(
+            "-r", "-z", "--no-renames", "--no-commit-id", old_commit, new_commit
+        )
+
+        changes = []
+        fields = output.split("\0")
+        # With -z each entry is ":<old mode> <new mode> <old sha> <new sha> <status>" then the path
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            if not meta.startswith(":"):
+                continue
+            _, new_mode, old_sha, new_sha, status = meta[1:].split(" ")
+            if status not in ("A", "M", "D"):
+                # Type changes (T) are re-indexed like modifications
+                status = "M"
+            changes.append(
+                {
+                    "path": path,
+                    "status": status,
+                    "mode": int(new_mode, 8),
+                    "hash": old_sha if status == "D" else new_sha,
+                }
+            )
+
+        self.logger.info(f"Found {len(changes)} changed files")
+        return changes
+
+    async def has_commit(self, commit_hash: str) -> bool:
+        """Check whether a commit is present in the object database."""
+        return await self._run(self._has_commit, commit_hash)
+
+    def _has_commit(self, commit_hash: str) -> bool:
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+        try:
+            self.repo.commit(commit_hash)
+            return True
+        except (BadName, ValueError):
+            return False
+
+    async def is_ancestor(self, ancestor: str, commit: str) -> bool:
+        """Check whether ``ancestor`` is reachable from ``commit``."""
+        return await self._run(self._is_ancestor, ancestor, commit)
+
+    def _is_ancestor(self, ancestor: str, commit: str) -> bool:
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+        try:
+            self.repo.git.merge_base("--is-ancestor", ancestor, commit)
+            return True
+        except GitCommandError:
+            return False
+
+    async def read_blobs(
+        self, blob_hashes: Iterable[str]
+    ) -> AsyncIterator[Tuple[str, Optional[memoryview]]]:
+        """
+        Stream the contents of many blobs, e.g. the ``hash`` values from
+        ``get_file_tree``, through one persistent cat-file process. Yields
+        ``(hash, content)`` in request order; use ``contextlib.aclosing`` when
+        the loop may exit early.
+        """
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+        if self._blob_reader is None:
+            self._blob_reader = BlobReader(self.repo.git_dir)
+        async for item in self._blob_reader.read_blobs(blob_hashes):
+            yield item
+
     async def get_file_content(
         self, file_path: str, commit_hash: Optional[str] = None
     ) -> str:
         """Get file content at specific commit."""
+        return await self._run(self._get_file_content, file_path, commit_hash)
+
+    def _get_file_content(
+        self, file_path: str, commit_hash: Optional[str] = None
+    ) -> str:
         if not self.repo:
             raise RepositoryValidationError("Repository not initialized")
 
@@ -156,6 +446,9 @@ class GitManager:
 
     async def get_file_history(self, file_path: str) -> List[Dict]:
         """Get commit history for specific file."""
+        return await self._run(self._get_file_history, file_path)
+
+    def _get_file_history(self, file_path: str) -> List[Dict]:
         if not self.repo:
             raise RepositoryValidationError("Repository not initialized")
 
@@ -173,8 +466,70 @@ class GitManager:
         self.logger.info(f"Found {len(history)} commits for {file_path}")
         return history
 
+    async def walk_file_history(
+        self, since_commit: Optional[str] = None, until_commit: str = "HEAD"
+    ) -> Dict[str, Dict]:
+        """
+        Walk the log once and summarize every path it touches: number of
+        commits, plus hash, date and author of the newest one. With
+        ``since_commit`` only commits in ``since_commit..until_commit`` are
+        walked, which gives the delta to apply to an earlier summary.
+        """
+        return await self._run(self._walk_file_history, since_commit, until_commit)
+
+    def _walk_file_history(
+        self, since_commit: Optional[str] = None, until_commit: str = "HEAD"
+    ) -> Dict[str, Dict]:
+        if not self.repo:
+            raise RepositoryValidationError("Repository not initialized")
+
+        rev_range = f"{since_commit}..{until_commit}" if since_commit else until_commit
+        self.logger.info(f"Walking file history for {rev_range}")
+        process = self.repo.git.log(
+            "--format=%x1e%H%x1f%an%x1f%aI",
+            "--name-only",
+            "-z",
+            "--no-renames",
+            rev_range,
+            as_process=True,
+        )
+
+        summary: Dict[str, Dict] = {}
+        commit = None
+        pending = b""
+        # Output is "\x1e<header>\0" per commit followed by "\n<path>\0<path>\0..."
+        for block in iter(lambda: process.stdout.read(1 << 16), b""):
+            pending += block
+            *tokens, pending = pending.split(b"\0")
+            for token in tokens:
+                if token.startswith(b"\x1e"):
+                    hexsha, author, date = token[1:].decode("utf-8", "replace").split("\x1f")
+                    commit = {"hash": hexsha, "author": author, "date": date}
+                    continue
+                path = token.lstrip(b"\n").decode("utf-8", "surrogateescape")
+                if not path or commit is None:
+                    continue
+                entry = summary.get(path)
+                if entry is None:
+                    # Log order is newest first, so the first commit seen is the latest
+                    summary[path] = {
+                        "commits": 1,
+                        "last_commit": commit["hash"],
+                        "last_author": commit["author"],
+                        "last_modified": commit["date"],
+                    }
+                else:
+                    entry["commits"] += 1
+        process.wait()
+
+        self.logger.info(f"Summarized history of {len(summary)} paths")
+        return summary
+
     async def switch_branch(self, branch_name: str):
         """Switch to a different branch."""
+        return await self._run(self._switch_branch, branch_name)
+
+    def _switch_branch(self, branch_name: str):
         if not self.repo:
             raise RepositoryValidationError("Repository not initialized")
 
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from git import Repo
+from git.exc import GitCommandError
+
+logger = logging.getLogger(__name__)
+
+# Write a commit-graph the first time a managed clone is seen so rev-list
+# walks use the graph instead of parsing commit objects. Never done for
+# local repositories, which the app does not own.
+GIT_WRITE_COMMIT_GRAPH = os.getenv("GIT_WRITE_COMMIT_GRAPH", "true").lower() == "true"
+
+
+@dataclass
+class RepositoryMetadata:
+    head_commit: str
+    head_branch: Optional[str]
+    commit_count: int
+    branch_count: int
+    refs_fingerprint: str
+
+
+class RepositoryMetadataService:
+    """
+    Cheap repository statistics. Results are cached per repository and keyed
+    by the tips of HEAD and all local branches, so repeated calls cost one
+    ``for-each-ref`` until a ref moves. When HEAD only moves forward, the
+    commit count is updated by counting the new commits instead of the whole
+    history.
+    """
+
+    def __init__(self, max_repos: int = 256):
+        self.max_repos = max_repos
+        self._cache: "OrderedDict[str, RepositoryMetadata]" = OrderedDict()
+        self._graphs_checked = set()
+        self._lock = threading.Lock()
+
+    def get(self, repo: Repo, write_commit_graph: bool = False) -> RepositoryMetadata:
+        """
+        Statistics for ``repo``. ``write_commit_graph`` allows writing a
+        commit-graph into its .git, so only pass it for clones the app owns.
+        """
+        key = str(Path(repo.git_dir).resolve())
+        head_commit = repo.git.rev_parse("HEAD")
+        branch_refs = repo.git.for_each_ref("--format=%(objectname) %(refname)", "refs/heads")
+        fingerprint = f"{head_commit}\n{branch_refs}"
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached.refs_fingerprint == fingerprint:
+                self._cache.move_to_end(key)
+                return cached
+
+        if write_commit_graph:
+            self._ensure_commit_graph(repo, key)
+        commit_count = self._count_commits(repo, head_commit, cached)
+        head_branch = None if repo.head.is_detached else repo.active_branch.name
+
+        metadata = RepositoryMetadata(
+            head_commit=head_commit,
+            head_branch=head_branch,
+            commit_count=commit_count,
+            branch_count=len(branch_refs.splitlines()),
+            refs_fingerprint=fingerprint,
+        )
+        with self._lock:
+            self._cache[key] = metadata
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_repos:
+                self._cache.popitem(last=False)
+        return metadata
+
+    def _count_commits(
+        self, repo: Repo, head_commit: str, cached: Optional[RepositoryMetadata]
+    ) -> int:
+        if cached and cached.head_commit != head_commit:
+            try:
+                # Fast-forward: only count what is new since the cached HEAD
+                repo.git.merge_base("--is-ancestor", cached.head_commit, head_commit)
+                added = int(repo.git.rev_list("--count", f"{cached.head_commit}..{head_commit}"))
+                return cached.commit_count + added
+            except GitCommandError:
+                pass
+        elif cached:
+            return cached.commit_count
+        return int(repo.git.rev_list("--count", head_commit))
+
+    def _ensure_commit_graph(self, repo: Repo, key: str):
+        if not GIT_WRITE_COMMIT_GRAPH or key in self._graphs_checked:
+            return
+        self._graphs_checked.add(key)
+        objects_info = Path(repo.git_dir) / "objects" / "info"
+        if (objects_info / "commit-graph").exists() or (objects_info / "commit-graphs").exists():
+            return
+        try:
+            logger.info(f"Writing commit-graph for {repo.working_dir}")
+            repo.git.commit_graph("write", "--reachable")
+        except GitCommandError as e:
+            logger.warning(f"Could not write commit-graph for {repo.working_dir}: {e}")
+
+
+metadata_service = RepositoryMetadataService()
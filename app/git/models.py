@@ -1,5 +1,7 @@
+import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional
 
 @dataclass
 class RepositoryInfo:
@@ -10,3 +12,41 @@ class RepositoryInfo:
     last_commit: str
     commit_count: int
     branch_count: int
+
+@dataclass
+class CloneOptions:
+    """How remote repositories are cloned into the workspace."""
+    # Shallow clone with this many commits of history
+    depth: Optional[int] = None
+    # Partial clone filter, e.g. "blob:none" to fetch blobs lazily
+    blob_filter: Optional[str] = None
+    # Only fetch the branch being analyzed
+    single_branch: bool = False
+
+    @classmethod
+    def from_env(cls) -> "CloneOptions":
+        depth = os.getenv("GIT_CLONE_DEPTH")
+        return cls(
+            depth=int(depth) if depth else None,
+            blob_filter=os.getenv("GIT_CLONE_FILTER") or None,
+            single_branch=os.getenv("GIT_CLONE_SINGLE_BRANCH", "false").lower() == "true",
+        )
+
+    def clone_args(self) -> List[str]:
+        args = ["--no-tags"] if self.single_branch else []
+        if self.depth:
+            args.append(f"--depth={self.depth}")
+        if self.blob_filter:
+            # Nothing reads the working tree of a remote clone, and checking
+            # it out would fault in every blob the filter just skipped
+            args += [f"--filter={self.blob_filter}", "--no-checkout"]
+        if self.single_branch:
+            args.append("--single-branch")
+        return args
+
+    def fetch_args(self) -> List[str]:
+        # A partial clone remembers its filter, so fetches only need the depth
+        args = ["--prune"]
+        if self.depth:
+            args.append(f"--depth={self.depth}")
+        return args
@@ -0,0 +1,30 @@
+import asyncio
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Git work is mostly waiting on git subprocesses and disk, so a thread pool
+# is enough to keep it off the event loop; the bound caps concurrent git
+# processes across all repositories
+GIT_WORKERS = int(os.getenv("GIT_WORKERS", min(8, (os.cpu_count() or 1) + 4)))
+
+_executor = ThreadPoolExecutor(max_workers=GIT_WORKERS, thread_name_prefix="git")
+
+
+async def run_git(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking git call on the shared git thread pool, in the caller's
+    context so spans recorded by the call join the caller's trace.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_git_pool():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Union
+
+from .manager import GIT_OPERATION_SECONDS, GitManager
+from .pool import run_git
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = Path(os.getenv("TTLM_WORKSPACE", "./workspace"))
+# Each open repository can hold a few git helper processes and pack files,
+# so this also bounds the file descriptors spent on repositories
+GIT_MAX_OPEN_REPOS = int(os.getenv("GIT_MAX_OPEN_REPOS", 16))
+
+
+class _Handle:
+    def __init__(self, manager: GitManager):
+        self.manager = manager
+        self.leases = 0
+        self.ready = asyncio.Event()
+        self.error: Optional[Exception] = None
+
+
+class RepositoryRegistry:
+    """
+    Per-repository ``GitManager`` handles, keyed by repository source.
+
+    Handles are leased with ``async with registry.lease(source)``; a handle is
+    opened on first use and stays open for later requests. When more than
+    ``max_open`` handles are open, the least recently used idle ones are
+    closed. Handles that are currently leased are never evicted, so the cap
+    can be exceeded briefly under load.
+    """
+
+    def __init__(self, workspace_dir: Union[str, Path] = WORKSPACE_DIR, max_open: int = GIT_MAX_OPEN_REPOS):
+        self.workspace_dir = Path(workspace_dir)
+        self.max_open = max_open
+        self._handles: "OrderedDict[str, _Handle]" = OrderedDict()
+        # Repo-less manager used for URL checks and ls-remote lookups
+        self._probe = GitManager(self.workspace_dir)
+
+    @asynccontextmanager
+    async def lease(self, repo_source: str, refresh: bool = True) -> AsyncIterator[GitManager]:
+        """
+        Lease an initialized handle for ``repo_source``. With ``refresh`` an
+        already open handle is re-initialized so it reflects the current HEAD.
+        """
+        handle = self._handles.get(repo_source)
+        if handle is None:
+            handle = _Handle(GitManager(self.workspace_dir))
+            self._handles[repo_source] = handle
+            handle.leases += 1
+            try:
+                await handle.manager.initialize_repository(repo_source)
+            except Exception as e:
+                handle.error = e
+                self._handles.pop(repo_source, None)
+                raise
+            finally:
+                handle.ready.set()
+        else:
+            handle.leases += 1
+            await handle.ready.wait()
+            if handle.error:
+                handle.leases -= 1
+                raise handle.error
+            if refresh:
+                try:
+                    await handle.manager.initialize_repository(repo_source)
+                except Exception:
+                    handle.leases -= 1
+                    raise
+
+        self._handles.move_to_end(repo_source)
+        self._evict()
+        try:
+            yield handle.manager
+        finally:
+            handle.leases -= 1
+            self._evict()
+
+    def _evict(self):
+        excess = len(self._handles) - self.max_open
+        if excess <= 0:
+            return
+        for source, handle in list(self._handles.items()):
+            if excess <= 0:
+                break
+            if handle.leases == 0 and handle.ready.is_set():
+                del self._handles[source]
+                handle.manager.close()
+                excess -= 1
+                logger.info(f"Closed idle repository handle for {source}")
+
+    async def resolve_head(self, repo_source: str) -> Optional[str]:
+        """Commit HEAD points at, resolved on the git pool without cloning."""
+        with GIT_OPERATION_SECONDS.time(operation="resolve_head"):
+            return await run_git(self._probe.resolve_head, repo_source)
+
+    def stats(self) -> Dict:
+        return {
+            "open": len(self._handles),
+            "leased": sum(1 for handle in self._handles.values() if handle.leases),
+            "max_open": self.max_open,
+        }
+
+    async def close(self):
+        for handle in self._handles.values():
+            await handle.manager.aclose()
+        self._handles.clear()
+
+
+repository_registry = RepositoryRegistry()
@@ -0,0 +1,254 @@
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Files above this size are skipped before they are read; projects can override it
+INDEX_MAX_FILE_SIZE = int(os.getenv("INDEX_MAX_FILE_SIZE", str(512 * 1024)))
+# How much of a blob the binary sniff looks at
+BINARY_SNIFF_BYTES = 8000
+
+# Reasons reported for skipped files
+EXCLUDED = "excluded"
+NOT_INCLUDED = "not-included"
+SYMLINK = "symlink"
+SUBMODULE = "submodule"
+EMPTY = "empty"
+TOO_LARGE = "too-large"
+BINARY = "binary"
+VENDORED = "vendored"
+GENERATED = "generated"
+MISSING = "missing"
+
+SYMLINK_MODE = 0o120000
+GITLINK_MODE = 0o160000
+
+# A small subset of linguist's vendor.yml and generated.rb, applied unless
+# .gitattributes says otherwise
+DEFAULT_VENDORED = (
+    "node_modules/",
+    "bower_components/",
+    "vendor/",
+    "third_party/",
+    "third-party/",
+    "Pods/",
+    ".yarn/",
+    "venv/",
+    ".venv/",
+    "site-packages/",
+)
+DEFAULT_GENERATED = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "uv.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.js.map",
+    "*.css.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.pb.cc",
+    "*.pb.h",
+)
+BINARY_EXTENSIONS = frozenset(
+    """
+    png jpg jpeg gif bmp ico icns webp tif tiff psd
+    woff woff2 ttf otf eot
+    zip gz tgz bz2 xz zst 7z rar tar jar war whl egg
+    mp3 mp4 m4a wav ogg flac mov avi mkv webm
+    pdf doc docx xls xlsx ppt pptx
+    exe dll so dylib a o obj lib class pyc pyo wasm bin dat
+    db sqlite sqlite3 parquet npy npz pkl pickle pt pth onnx h5
+    """.split()
+)
+
+
+@lru_cache(maxsize=1024)
+def _glob_regex(pattern: str) -> "re.Pattern":
+    """
+    Compile a gitignore-style glob: ``*`` and ``?`` stay within one path
+    component, ``**`` spans directories, a pattern without a slash matches
+    the file name at any depth, a leading slash anchors it to the root and a
+    trailing slash matches everything under a directory.
+    """
+    directory = pattern.endswith("/")
+    pattern = pattern.strip("/") if directory else pattern
+    anchored = pattern.startswith("/") or "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    # A directory pattern matches the files below it; any other pattern can
+    # still name a directory, which covers its contents too
+    suffix = "/.*" if directory else "(?:/.*)?"
+    return re.compile(prefix + regex + suffix + r"\Z", re.DOTALL)
+
+
+def glob_match(pattern: str, path: str) -> bool:
+    return _glob_regex(pattern).match(path) is not None
+
+
+def looks_binary(data) -> bool:
+    """Git's own heuristic: a NUL byte near the start means binary."""
+    # bytes() so this also works on memoryviews, whose ``in`` compares ints
+    return b"\0" in bytes(data[:BINARY_SNIFF_BYTES])
+
+
+class GitAttributes:
+    """
+    The linguist-vendored, linguist-generated and binary attributes from a
+    tree's .gitattributes files. As in git, deeper files take precedence
+    over shallower ones and later lines over earlier ones.
+    """
+
+    TRACKED = {"linguist-vendored": VENDORED, "linguist-generated": GENERATED}
+
+    def __init__(self, files: Mapping[str, str]):
+        # (directory, pattern, {reason: bool}) in increasing precedence
+        self.rules: List[Tuple[str, str, Dict[str, bool]]] = []
+        for directory in sorted(files, key=lambda d: (d.count("/"), d) if d else (-1, d)):
+            for line in files[directory].splitlines():
+                rule = self._parse_line(line)
+                if rule:
+                    self.rules.append((directory, *rule))
+
+    @classmethod
+    def _parse_line(cls, line: str) -> Optional[Tuple[str, Dict[str, bool]]]:
+        fields = line.split()
+        if not fields or fields[0].startswith("#"):
+            return None
+        pattern, attrs = fields[0], {}
+        for attr in fields[1:]:
+            # binary is the -diff -merge -text macro. -text alone only turns
+            # off line-ending normalisation, so it says nothing about content.
+            if attr in ("binary", "-diff", "diff"):
+                attrs[BINARY] = attr != "diff"
+                continue
+            value = True
+            if attr.startswith("-"):
+                attr, value = attr[1:], False
+            elif "=" in attr:
+                attr, raw = attr.split("=", 1)
+                value = raw.lower() not in ("false", "0")
+            if attr in cls.TRACKED:
+                attrs[cls.TRACKED[attr]] = value
+        return (pattern, attrs) if attrs else None
+
+    def lookup(self, path: str) -> Dict[str, bool]:
+        """Attributes explicitly set or unset for ``path``."""
+        result: Dict[str, bool] = {}
+        for directory, pattern, attrs in self.rules:
+            if directory:
+                if not path.startswith(directory + "/"):
+                    continue
+                relative = path[len(directory) + 1 :]
+            else:
+                relative = path
+            if glob_match(pattern, relative):
+                result.update(attrs)
+        return result
+
+
+@dataclass
+class AdmissionPolicy:
+    max_file_size: int = INDEX_MAX_FILE_SIZE
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+
+    @classmethod
+    def for_project(cls, project: Optional[Mapping]) -> "AdmissionPolicy":
+        if not project:
+            return cls()
+        return cls(
+            max_file_size=project.get("max_file_size") or INDEX_MAX_FILE_SIZE,
+            include=tuple(project.get("include_globs") or ()),
+            exclude=tuple(project.get("exclude_globs") or ()),
+        )
+
+
+@dataclass
+class AdmissionFilter:
+    """
+    Decides from tree metadata and paths alone whether a file is worth
+    reading and embedding. ``check`` returns the reason a file is skipped,
+    or None to admit it.
+
+    Exclude globs always win. Include globs restrict indexing to matching
+    paths and also lift the built-in vendored/generated defaults for them;
+    explicit .gitattributes markers still apply.
+    """
+
+    policy: AdmissionPolicy = field(default_factory=AdmissionPolicy)
+    attributes: GitAttributes = field(default_factory=lambda: GitAttributes({}))
+
+    def check(self, path: str, mode: Optional[int] = None, size: Optional[int] = None) -> Optional[str]:
+        policy = self.policy
+        if any(glob_match(pattern, path) for pattern in policy.exclude):
+            return EXCLUDED
+        included = any(glob_match(pattern, path) for pattern in policy.include)
+        if policy.include and not included:
+            return NOT_INCLUDED
+
+        if mode == SYMLINK_MODE:
+            return SYMLINK
+        if mode == GITLINK_MODE:
+            return SUBMODULE
+        # Sizes are unknown (None) in partial clones until the blob is read
+        if size is not None:
+            reason = self.check_size(size)
+            if reason:
+                return reason
+
+        attrs = self.attributes.lookup(path)
+        extension = path.rsplit(".", 1)[-1].lower() if "." in path.rsplit("/", 1)[-1] else ""
+        if attrs.get(BINARY, extension in BINARY_EXTENSIONS):
+            return BINARY
+        defaults = {
+            VENDORED: not included and any(glob_match(p, path) for p in DEFAULT_VENDORED),
+            GENERATED: not included and any(glob_match(p, path) for p in DEFAULT_GENERATED),
+        }
+        for reason, default in defaults.items():
+            if attrs.get(reason, default):
+                return reason
+        return None
+
+    def check_size(self, size: int) -> Optional[str]:
+        if size == 0:
+            return EMPTY
+        if size > self.policy.max_file_size:
+            return TOO_LARGE
+        return None
+
+    def check_content(self, data) -> Optional[str]:
+        """Checks that need the blob itself: missing objects, size when the tree had none, binary sniff."""
+        if data is None:
+            return MISSING
+        return self.check_size(len(data)) or (BINARY if looks_binary(data) else None)
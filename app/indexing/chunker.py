@@ -0,0 +1,226 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# all-MiniLM-L6-v2 truncates its input at 256 word pieces
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 256))
+# Tokens of trailing context repeated at the start of the next window when a
+# unit is too large for one chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 32))
+# Bump when the splitting rules change so cached chunks are rebuilt
+CHUNKER_VERSION = 1
+
+# Counts tokens for each of a list of lines
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+def model_token_counter() -> TokenCounter:
+    """
+    Count with the embedding model's own tokenizer, so bounds match what it
+    sees. Loading it follows HF_ALLOW_DOWNLOADS, like the model itself.
+    """
+    from .embedder import get_model
+
+    tokenizer = get_model().tokenizer
+
+    def count(lines: List[str]) -> List[int]:
+        if not lines:
+            return []
+        encoded = tokenizer(lines, add_special_tokens=False, truncation=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    return count
+
+
+def whitespace_token_counter(lines: List[str]) -> List[int]:
+    """Rough stand-in for a tokenizer: words plus punctuation runs."""
+    return [len(re.findall(r"\w+|[^\w\s]+", line)) for line in lines]
+
+
+@dataclass
+class ChunkerConfig:
+    max_tokens: int = CHUNK_MAX_TOKENS
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+
+    @property
+    def signature(self) -> str:
+        """Identifies the chunk layout, for keying cached chunks."""
+        return f"v{CHUNKER_VERSION}:{self.max_tokens}/{self.overlap_tokens}"
+
+
+@dataclass
+class Chunk:
+    index: int
+    start_line: int
+    end_line: int
+    content: str
+    tokens: int
+
+
+# A line matching the language's pattern starts a new syntactic unit
+_PYTHON = re.compile(r"(async\s+def|def|class)\s|@")
+_JS = re.compile(
+    r"(export\s+)?(default\s+)?(async\s+)?(function\*?|class|interface|type|enum|namespace)\s"
+    r"|(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s*)?(\(|function)"
+)
+_GO = re.compile(r"(func|type)\s")
+_RUST = re.compile(r"(pub(\([^)]*\))?\s+)?(async\s+)?(unsafe\s+)?(fn|struct|enum|impl|trait|mod|macro_rules!)\b|#\[")
+_RUBY = re.compile(r"\s*(def|class|module)\s")
+_MARKDOWN = re.compile(r"#{1,6}\s")
+# Top-level declarations in C-like languages start at column 0 with a word
+_C_LIKE = re.compile(r"[A-Za-z_@\[]")
+
+_BOUNDARIES = {
+    "py": _PYTHON,
+    "pyi": _PYTHON,
+    "js": _JS,
+    "jsx": _JS,
+    "mjs": _JS,
+    "cjs": _JS,
+    "ts": _JS,
+    "tsx": _JS,
+    "go": _GO,
+    "rs": _RUST,
+    "rb": _RUBY,
+    "md": _MARKDOWN,
+    "markdown": _MARKDOWN,
+    "mdx": _MARKDOWN,
+    "rst": None,
+    "txt": None,
+}
+_C_LIKE_EXTENSIONS = {"c", "h", "cc", "cpp", "hpp", "cs", "java", "kt", "scala", "swift", "php"}
+# Lines that belong to the unit below them (comments, decorators, attributes)
+_LEADING = re.compile(r"\s*(#|//|/\*|\*|@|--|\[)")
+
+
+def boundary_pattern(path: str) -> Optional[Pattern]:
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path.rsplit("/", 1)[-1] else ""
+    if extension in _C_LIKE_EXTENSIONS:
+        return _C_LIKE
+    return _BOUNDARIES.get(extension)
+
+
+def _units(lines: Iterable[str], pattern: Optional[Pattern]) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Group lines into syntactic units: a unit starts at an unindented line
+    matching ``pattern`` and takes any comment or decorator lines directly
+    above it along. Without a pattern, blank-line separated paragraphs are
+    the units. Yields (first line number, lines).
+    """
+    start, current = 1, []
+    for line in lines:
+        if pattern is None:
+            is_boundary = bool(current) and not current[-1].strip() and line.strip()
+        else:
+            is_boundary = bool(line[:1].strip()) and pattern.match(line) is not None
+
+        if is_boundary and current:
+            # Carry the comments/decorators that introduce this unit with it
+            split = len(current)
+            while split > 0 and current[split - 1].strip() and _LEADING.match(current[split - 1]):
+                split -= 1
+            if split > 0:
+                yield start, current[:split]
+                start, current = start + split, current[split:]
+        current.append(line)
+    if current:
+        yield start, current
+
+
+def chunk_lines(
+    lines: Iterable[str],
+    path: str,
+    count_tokens: TokenCounter,
+    config: Optional[ChunkerConfig] = None,
+) -> Iterator[Chunk]:
+    """
+    Lazily split a file, given as an iterable of lines with their line
+    endings, into chunks of at most ``max_tokens``. Consecutive units are
+    packed together while they fit; a unit that does not fit on its own is
+    cut into line windows that repeat up to ``overlap_tokens`` of the
+    previous window. A single line longer than the bound becomes its own
+    chunk and is left for the model to truncate.
+    """
+    config = config or ChunkerConfig()
+    index = 0
+    # The chunk being packed: its first line number, lines and their token counts
+    start, buffer, counts = 1, [], []
+
+    def emit(first: int, body: List[str], body_counts: List[int]) -> Chunk:
+        nonlocal index
+        chunk = Chunk(
+            index=index,
+            start_line=first,
+            end_line=first + len(body) - 1,
+            content="".join(body),
+            tokens=sum(body_counts),
+        )
+        index += 1
+        return chunk
+
+    for unit_start, unit in _units(lines, boundary_pattern(path)):
+        unit_counts = count_tokens(unit)
+        unit_tokens = sum(unit_counts)
+
+        if buffer and sum(counts) + unit_tokens > config.max_tokens:
+            yield emit(start, buffer, counts)
+            buffer, counts = [], []
+
+        if unit_tokens <= config.max_tokens:
+            if not buffer:
+                start = unit_start
+            buffer.extend(unit)
+            counts.extend(unit_counts)
+            continue
+
+        # Oversized unit: slide a window over its lines
+        window_start, window, window_counts = unit_start, [], []
+        for offset, (line, tokens) in enumerate(zip(unit, unit_counts)):
+            if window and sum(window_counts) + tokens > config.max_tokens:
+                yield emit(window_start, window, window_counts)
+                keep = _overlap(window_counts, config.overlap_tokens, config.max_tokens - tokens)
+                window, window_counts = window[len(window) - keep :], window_counts[len(window_counts) - keep :]
+                window_start = unit_start + offset - keep
+            window.append(line)
+            window_counts.append(tokens)
+        # The last window stays open so following small units can join it
+        start, buffer, counts = window_start, window, window_counts
+
+    if buffer and any(line.strip() for line in buffer):
+        yield emit(start, buffer, counts)
+
+
+def _overlap(counts: List[int], overlap_tokens: int, room: int) -> int:
+    """How many trailing lines fit in the overlap budget and the remaining room."""
+    budget = min(overlap_tokens, room)
+    keep, used = 0, 0
+    for tokens in reversed(counts):
+        if used + tokens > budget:
+            break
+        used += tokens
+        keep += 1
+    # Never repeat a whole window, or the split would not advance
+    return min(keep, len(counts) - 1)
+
+
+def chunk_text(
+    text: str,
+    path: str,
+    count_tokens: TokenCounter,
+    config: Optional[ChunkerConfig] = None,
+) -> Iterator[Chunk]:
+    """``chunk_lines`` over a decoded file, without materialising its line list."""
+    return chunk_lines(_iter_lines(text), path, count_tokens, config)
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    position = 0
+    while position < len(text):
+        end = text.find("\n", position)
+        end = len(text) if end == -1 else end + 1
+        yield text[position:end]
+        position = end
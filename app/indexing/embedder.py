@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import List, Optional
+
+from ..metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Models and tokenizers load from the local Hugging Face cache only, so an
+# offline deployment never stalls on hub requests. Set to fetch missing ones.
+HF_ALLOW_DOWNLOADS = os.getenv("HF_ALLOW_DOWNLOADS", "false").lower() == "true"
+# Must match the vector(384), halfvec(384) and bit(384) columns in project_chunks
+EMBEDDING_DIM = 384
+
+CPU_COUNT = os.cpu_count() or 1
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", max(1, CPU_COUNT // 4)))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 64))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 10))
+
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "ttlm_embedding_batch_seconds",
+    "Time to encode one micro-batch",
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "ttlm_embedding_batch_size",
+    "Texts per encoded micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the sentence-transformers model once, on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                # Split the cores between the workers instead of letting every
+                # batch fight over all of them
+                torch.set_num_threads(max(1, CPU_COUNT // EMBEDDING_WORKERS))
+                logger.info(f"Loading embedding model {EMBEDDING_MODEL}")
+                try:
+                    _model = SentenceTransformer(
+                        EMBEDDING_MODEL, device="cpu", local_files_only=not HF_ALLOW_DOWNLOADS
+                    )
+                except Exception as e:
+                    if not HF_ALLOW_DOWNLOADS:
+                        logger.error(
+                            f"Embedding model {EMBEDDING_MODEL} is not in the local Hugging Face "
+                            f"cache; set HF_ALLOW_DOWNLOADS=true to download it: {e}"
+                        )
+                    raise
+    return _model
+
+
+def encode(texts: List[str]) -> List[List[float]]:
+    """
+    Embed a batch of texts. This is CPU-bound and blocking; call it from a
+    worker thread, not the event loop.
+    """
+    if not texts:
+        return []
+    embeddings = get_model().encode(
+        texts,
+        batch_size=len(texts),
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return embeddings.tolist()
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    INDEXING = 1
+
+
+@dataclass(order=True)
+class _PendingText:
+    priority: int
+    seq: int
+    text: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class EmbeddingService:
+    """
+    Collects texts from concurrent callers into micro-batches and runs them on
+    a dedicated thread pool. A batch is dispatched once it reaches
+    ``max_batch_size`` or its oldest text has waited ``max_wait_ms``, and only
+    when a worker is free, so interactive queries queued behind a long
+    indexing run still go into the next batch.
+    """
+
+    def __init__(
+        self,
+        workers: int = EMBEDDING_WORKERS,
+        max_batch_size: int = EMBEDDING_MAX_BATCH,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        rate_window: float = 60.0,
+    ):
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.rate_window = rate_window
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._slots = asyncio.Semaphore(workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight = set()
+        # (finished_at, chunk count) per batch, for the chunks/sec window
+        self._completed = deque()
+        self.total_chunks = 0
+        self.total_batches = 0
+
+    def start(self):
+        if self._dispatcher is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="embedder"
+            )
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+            logger.info(
+                f"Embedding service started: workers={self.workers} "
+                f"max_batch={self.max_batch_size} max_wait={self.max_wait * 1000:.0f}ms"
+            )
+
+    async def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def embed(self, texts: List[str], priority: Priority = Priority.INTERACTIVE) -> List[List[float]]:
+        """Embed ``texts``, returning one vector per text in the same order."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait(_PendingText(int(priority), next(self._seq), text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+
+            # Drop texts whose caller gave up while they were queued
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._run_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run_batch(self, batch: List[_PendingText]):
+        loop = asyncio.get_running_loop()
+        try:
+            with EMBEDDING_BATCH_SECONDS.time():
+                vectors = await loop.run_in_executor(
+                    self._executor, encode, [item.text for item in batch]
+                )
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for item, vector in zip(batch, vectors):
+            if not item.future.done():
+                item.future.set_result(vector)
+        self._record(len(batch))
+
+    def _record(self, count: int):
+        now = time.monotonic()
+        EMBEDDING_BATCH_SIZE.observe(count)
+        self.total_chunks += count
+        self.total_batches += 1
+        self._completed.append((now, count))
+        while self._completed and now - self._completed[0][0] > self.rate_window:
+            self._completed.popleft()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Throughput over the last ``rate_window`` seconds."""
+        now = time.monotonic()
+        recent = sum(count for finished, count in self._completed if now - finished <= self.rate_window)
+        return recent / self.rate_window
+
+    def stats(self) -> dict:
+        return {
+            "model": EMBEDDING_MODEL,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "busy_workers": len(self._in_flight),
+            "chunks_per_second": round(self.chunks_per_second, 2),
+            "total_chunks": self.total_chunks,
+            "total_batches": self.total_batches,
+            "avg_batch_size": round(self.total_chunks / self.total_batches, 1) if self.total_batches else 0,
+        }
+
+
+service: EmbeddingService = None
+
+async def init_embedding_service():
+    """Start the shared embedding service"""
+    global service
+    service = EmbeddingService()
+    service.start()
+    return service
+
+async def close_embedding_service():
+    """Stop the shared embedding service"""
+    if service:
+        await service.stop()
+
+def get_embedding_service() -> EmbeddingService:
+    """Get the shared embedding service"""
+    return service
+
+
+Gauge(
+    "ttlm_embedding_queue_depth",
+    "Texts waiting to be embedded",
+    collect=lambda: service.queue_depth if service else 0,
+)
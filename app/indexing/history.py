@@ -0,0 +1,34 @@
+import logging
+from typing import Optional
+from uuid import UUID
+
+from ..db.file_history import apply_file_history, get_history_commit
+from ..git.manager import GitManager
+
+logger = logging.getLogger(__name__)
+
+
+async def update_file_history(
+    git_manager: GitManager, project_id: UUID, head_commit: str
+) -> Optional[int]:
+    """
+    Bring a project's file history index up to ``head_commit``. Only commits
+    since the last indexed commit are walked when that commit is an ancestor
+    of the new head; otherwise (first run, rewritten history) the whole log
+    is walked once and the index rebuilt. Returns the number of paths
+    updated, or None when the index was already current.
+    """
+    base_commit = await get_history_commit(project_id)
+    if base_commit == head_commit:
+        return None
+
+    incremental = bool(base_commit) and await git_manager.is_ancestor(base_commit, head_commit)
+    summary = await git_manager.walk_file_history(
+        base_commit if incremental else None, head_commit
+    )
+    updated = await apply_file_history(project_id, summary, head_commit, replace=not incremental)
+    logger.info(
+        f"{'Updated' if incremental else 'Rebuilt'} file history of project {project_id}: "
+        f"{updated} paths"
+    )
+    return updated
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from ..db.embedding_cache import (
+    collect_unreferenced_embeddings,
+    get_cached_embeddings,
+    store_cached_embeddings,
+)
+from ..db.bulk import BulkChunkWriter
+from ..db.chunks import delete_file_chunks, delete_project_chunks
+from ..db.project import set_indexed_commit
+from ..db.symbols import collect_unreferenced_symbols, get_extracted_blobs, store_symbols
+from ..git.manager import GitManager
+from . import embedder
+from .admission import EMPTY, AdmissionFilter, AdmissionPolicy, GitAttributes
+from .chunker import ChunkerConfig, TokenCounter, chunk_text, model_token_counter
+from .symbols import extract_symbols, language_for
+
+logger = logging.getLogger(__name__)
+
+# Called with (stage, done, total) as indexing moves through its stages
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
+
+@dataclass
+class IndexResult:
+    project_id: UUID
+    base_commit: Optional[str]
+    head_commit: str
+    full: bool
+    added: int = 0
+    modified: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    cache_hits: int = 0
+    symbols: int = 0
+    duration: float = 0.0
+    # (path, reason) for every file that was not indexed
+    skipped_files: List[Tuple[str, str]] = field(default_factory=list)
+    # (path, chunks, tokens) for every file chunked in this run; files served
+    # from the embedding cache are not re-tokenized
+    chunked_files: List[Tuple[str, int, int]] = field(default_factory=list)
+
+    @property
+    def chunk_tokens(self) -> int:
+        return sum(tokens for _, _, tokens in self.chunked_files)
+
+    def skip(self, path: str, reason: str):
+        self.skipped += 1
+        self.skipped_files.append((path, reason))
+
+    @property
+    def skip_reasons(self) -> Dict[str, int]:
+        return dict(Counter(reason for _, reason in self.skipped_files))
+
+
+class ProjectIndexer:
+    """
+    Brings a project's chunks in line with a commit. When the project
+    already has an indexed commit that is still in the repository, only the
+    blobs changed between the two commits are read and embedded; otherwise
+    the whole tree is indexed from scratch.
+    """
+
+    def __init__(
+        self,
+        git_manager: GitManager,
+        project_id: UUID,
+        batch_size: int = 32,
+        on_progress: Optional[ProgressCallback] = None,
+        policy: Optional[AdmissionPolicy] = None,
+        chunker: Optional[ChunkerConfig] = None,
+        count_tokens: Optional[TokenCounter] = None,
+    ):
+        self.git_manager = git_manager
+        self.project_id = project_id
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.policy = policy or AdmissionPolicy()
+        self.admission = AdmissionFilter(self.policy)
+        self.chunker = chunker or ChunkerConfig()
+        self._count_tokens = count_tokens
+        # Cached chunks are only reusable under the same model and chunk layout
+        self.cache_key = f"{embedder.EMBEDDING_MODEL}@{self.chunker.signature}"
+
+    async def _report(self, stage: str, done: int, total: int):
+        if self.on_progress:
+            await self.on_progress(stage, done, total)
+
+    async def index(self, base_commit: Optional[str], head_commit: str) -> IndexResult:
+        started = time.perf_counter()
+        full = not base_commit or not await self.git_manager.has_commit(base_commit)
+        result = IndexResult(self.project_id, base_commit, head_commit, full=full)
+
+        if full:
+            logger.info(f"Full index of project {self.project_id} at {head_commit[:12]}")
+            await delete_project_chunks(self.project_id)
+            changes = [
+                {**item, "status": "A"}
+                for item in await self.git_manager.get_file_tree(head_commit)
+            ]
+        elif base_commit == head_commit:
+            changes = []
+        else:
+            logger.info(
+                f"Incremental index of project {self.project_id}: "
+                f"{base_commit[:12]}..{head_commit[:12]}"
+            )
+            changes = await self.git_manager.diff_trees(base_commit, head_commit)
+
+        await self._report("tree", len(changes), len(changes))
+
+        removed = [c["path"] for c in changes if c["status"] == "D"]
+        result.deleted = len(removed)
+        candidates = [c for c in changes if c["status"] != "D"]
+        result.added = sum(1 for c in candidates if c["status"] == "A")
+        result.modified = len(candidates) - result.added
+
+        # Decide from paths and tree metadata what is worth reading at all
+        self.admission = AdmissionFilter(
+            self.policy,
+            GitAttributes(await self.git_manager.read_attributes_files(head_commit)),
+        )
+        pending = []
+        for change in candidates:
+            reason = self.admission.check(change["path"], change.get("mode"), change.get("size"))
+            if reason:
+                result.skip(change["path"], reason)
+                # A modified file that is no longer admitted must not keep its old rows
+                if not full:
+                    removed.append(change["path"])
+            else:
+                pending.append(change)
+
+        async with BulkChunkWriter(self.project_id) as writer:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start : start + self.batch_size]
+                files_done = start + len(batch)
+                rows, unindexable = await self._embed_batch(
+                    batch, result, files_done, len(pending)
+                )
+                for path, reason in unindexable:
+                    result.skip(path, reason)
+                    if not full:
+                        removed.append(path)
+                await self._report("embed", files_done, len(pending))
+
+                await writer.write(rows)
+                result.chunks += len(rows)
+                await self._report("write", writer.rows_written, result.chunks)
+        await self._report("write", result.chunks, result.chunks)
+
+        if removed:
+            await delete_file_chunks(self.project_id, removed)
+
+        if full or result.modified or result.deleted:
+            # Blobs this project no longer points at may now be orphaned
+            await collect_unreferenced_embeddings()
+            await collect_unreferenced_symbols()
+
+        await set_indexed_commit(self.project_id, head_commit)
+        result.duration = time.perf_counter() - started
+        logger.info(
+            f"Indexed project {self.project_id} in {result.duration:.2f}s: "
+            f"+{result.added} ~{result.modified} -{result.deleted} "
+            f"skipped={result.skipped} {result.skip_reasons} chunks={result.chunks} "
+            f"chunked_files={len(result.chunked_files)} chunk_tokens={result.chunk_tokens} "
+            f"embedded={result.embedded} "
+            f"cache_hits={result.cache_hits} symbols={result.symbols}"
+        )
+        return result
+
+    async def _embed_batch(
+        self, batch: List[Dict], result: IndexResult, files_done: int, files_total: int
+    ):
+        """
+        Build chunk rows for a batch of changed files. Blobs already in the
+        embedding cache are reused as-is; only the misses are read from git,
+        chunked and run through the model, and their chunks are added to the
+        cache. Symbols are extracted from every blob not yet in the symbol
+        index, which means reading cached blobs only when they lack symbols.
+        """
+        hashes = list({c["hash"] for c in batch})
+        cached = await get_cached_embeddings(hashes, self.cache_key)
+        extracted = await get_extracted_blobs(hashes)
+        rows = []
+        misses = []
+        symbols_only = []
+        for change in batch:
+            hit = cached.get(change["hash"])
+            if hit:
+                rows.extend(
+                    {"file_path": change["path"], "blob_sha": change["hash"], **chunk}
+                    for chunk in hit
+                )
+                result.cache_hits += 1
+                if change["hash"] not in extracted:
+                    symbols_only.append(change)
+            else:
+                misses.append(change)
+
+        files, unindexable = await self._read_batch(misses + symbols_only)
+        result.symbols += await self._index_symbols(
+            [file for file in files if file["blob_sha"] not in extracted]
+        )
+        if symbols_only:
+            # Cached files keep their rows; they were only read for symbols
+            miss_hashes = {change["hash"] for change in misses}
+            miss_paths = {change["path"] for change in misses}
+            files = [file for file in files if file["blob_sha"] in miss_hashes]
+            unindexable = [(path, reason) for path, reason in unindexable if path in miss_paths]
+        # The same blob can appear under several paths; chunk and embed it once
+        blobs = {}
+        for file in files:
+            blobs.setdefault(file["blob_sha"], file)
+        # Tokenizing is CPU-bound, so keep it off the event loop
+        new_chunks = await asyncio.to_thread(self._chunk_blobs, list(blobs.values()))
+        by_sha: Dict[str, List[dict]] = {}
+        for chunk in new_chunks:
+            by_sha.setdefault(chunk["blob_sha"], []).append(chunk)
+        for file in files:
+            file_chunks = by_sha.get(file["blob_sha"], [])
+            if not file_chunks:
+                # e.g. whitespace only: skipped, so an older version's rows are removed
+                unindexable.append((file["file_path"], EMPTY))
+                continue
+            result.chunked_files.append(
+                (file["file_path"], len(file_chunks), sum(c["tokens"] for c in file_chunks))
+            )
+        await self._report("chunk", files_done, files_total)
+
+        if new_chunks:
+            vectors = await embedder.get_embedding_service().embed(
+                [chunk["content"] for chunk in new_chunks], embedder.Priority.INDEXING
+            )
+            for chunk, vector in zip(new_chunks, vectors):
+                chunk["embedding"] = vector
+            await store_cached_embeddings(self.cache_key, new_chunks)
+            result.embedded += len(new_chunks)
+
+            for file in files:
+                rows.extend(
+                    {**chunk, "file_path": file["file_path"]}
+                    for chunk in by_sha.get(file["blob_sha"], [])
+                )
+
+        return rows, unindexable
+
+    async def _index_symbols(self, files: List[dict]) -> int:
+        """Extract and store the symbols of each distinct blob in ``files``."""
+        blobs = {}
+        for file in files:
+            blobs.setdefault(file["blob_sha"], file)
+        if not blobs:
+            return 0
+
+        def extract():
+            return {
+                sha: (
+                    language_for(file["file_path"]),
+                    extract_symbols(file["file_path"], file["content"]),
+                )
+                for sha, file in blobs.items()
+            }
+
+        return await store_symbols(await asyncio.to_thread(extract))
+
+    def _chunk_blobs(self, files: List[dict]) -> List[dict]:
+        """Chunk each blob, using the path it was read under to pick the language."""
+        if self._count_tokens is None:
+            self._count_tokens = model_token_counter()
+        return [
+            {
+                "blob_sha": file["blob_sha"],
+                "chunk_index": chunk.index,
+                "start_line": chunk.start_line,
+                "end_line": chunk.end_line,
+                "content": chunk.content,
+                "tokens": chunk.tokens,
+            }
+            for file in files
+            for chunk in chunk_text(
+                file["content"], file["file_path"], self._count_tokens, self.chunker
+            )
+        ]
+
+    async def _read_batch(self, batch: List[Dict]):
+        """
+        Read blob contents, separating text files from ones we cannot index.
+        Unindexable files come back as (path, reason).
+        """
+        by_hash: Dict[str, List[str]] = {}
+        for change in batch:
+            by_hash.setdefault(change["hash"], []).append(change["path"])
+
+        # In a partial clone only these blobs are ever downloaded, in one
+        # round trip rather than one lazy fetch per read
+        await self.git_manager.prefetch_blobs(by_hash.keys())
+
+        rows, unindexable = [], []
+        async with aclosing(self.git_manager.read_blobs(by_hash.keys())) as blobs:
+            async for blob_hash, data in blobs:
+                paths = by_hash[blob_hash]
+                # Missing, empty, oversized and binary blobs carry nothing worth embedding
+                reason = self.admission.check_content(data)
+                if reason:
+                    unindexable.extend((path, reason) for path in paths)
+                    continue
+                content = str(data, "utf-8", "replace")
+                rows.extend(
+                    {"file_path": path, "blob_sha": blob_hash, "content": content}
+                    for path in paths
+                )
+        return rows, unindexable
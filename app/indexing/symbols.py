@@ -0,0 +1,246 @@
+import ast
+import keyword
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# Roles
+DEFINITION = "definition"
+REFERENCE = "reference"
+
+
+@dataclass(frozen=True)
+class Symbol:
+    name: str
+    kind: str
+    role: str
+    line: int
+    # Enclosing class or function for definitions and references, if known
+    container: Optional[str] = None
+
+
+def language_for(path: str) -> Optional[str]:
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path.rsplit("/", 1)[-1] else ""
+    return _LANGUAGES.get(extension)
+
+
+def extract_symbols(path: str, text: str) -> List[Symbol]:
+    """
+    Definitions and references in a file. Python is parsed with ``ast``;
+    other languages use per-language definition patterns and treat call
+    sites as references. Unknown languages yield nothing.
+    """
+    language = language_for(path)
+    if language == "python":
+        try:
+            return _PythonExtractor().extract(text)
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    if language in _DEFINITIONS:
+        return _extract_with_patterns(text, _DEFINITIONS[language])
+    return []
+
+
+class _PythonExtractor(ast.NodeVisitor):
+    def __init__(self):
+        self.symbols: List[Symbol] = []
+        # (name, kind) of the enclosing classes and functions
+        self.scope: List[Tuple[str, str]] = []
+        self._seen = set()
+
+    def extract(self, text: str) -> List[Symbol]:
+        self.visit(ast.parse(text))
+        return self.symbols
+
+    @property
+    def container(self) -> Optional[str]:
+        return ".".join(name for name, _ in self.scope) or None
+
+    def _add(self, name: str, kind: str, role: str, node: ast.AST):
+        # One reference per name and line is enough to find the call site
+        key = (name, role, node.lineno)
+        if role == REFERENCE and (key in self._seen or name in ("self", "cls")):
+            return
+        self._seen.add(key)
+        self.symbols.append(Symbol(name, kind, role, node.lineno, self.container))
+
+    def _visit_scope(self, node, kind: str):
+        # Decorated definitions report the line of the def/class keyword
+        self._add(node.name, kind, DEFINITION, node)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        if isinstance(node, ast.ClassDef):
+            for base in node.bases:
+                self.visit(base)
+        else:
+            self.visit(node.args)
+            if node.returns:
+                self.visit(node.returns)
+        self.scope.append((node.name, kind))
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self._visit_scope(node, "class")
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self.scope) and self.scope[-1][1] == "class"
+        self._visit_scope(node, "method" if in_class else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Assign(self, node: ast.Assign):
+        # Module and class level names are definitions worth finding
+        if len(self.scope) <= 1:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self._add(target.id, "variable", DEFINITION, target)
+        self.visit(node.value)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if len(self.scope) <= 1 and isinstance(node.target, ast.Name):
+            self._add(node.target.id, "variable", DEFINITION, node.target)
+        if node.value:
+            self.visit(node.value)
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self._add(func.id, "call", REFERENCE, func)
+        elif isinstance(func, ast.Attribute):
+            self._add(func.attr, "call", REFERENCE, func)
+            self.visit(func.value)
+        else:
+            self.visit(func)
+        for arg in node.args:
+            self.visit(arg)
+        for kw in node.keywords:
+            self.visit(kw.value)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self._add(alias.name.rsplit(".", 1)[-1], "import", REFERENCE, node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            if alias.name != "*":
+                self._add(alias.name, "import", REFERENCE, node)
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self._add(node.id, "name", REFERENCE, node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.ctx, ast.Load):
+            self._add(node.attr, "attribute", REFERENCE, node)
+        self.visit(node.value)
+
+
+_LANGUAGES = {
+    "py": "python",
+    "pyi": "python",
+    "js": "javascript",
+    "jsx": "javascript",
+    "mjs": "javascript",
+    "cjs": "javascript",
+    "ts": "javascript",
+    "tsx": "javascript",
+    "go": "go",
+    "rs": "rust",
+    "rb": "ruby",
+    "java": "java",
+    "kt": "java",
+    "cs": "java",
+    "c": "c",
+    "h": "c",
+    "cc": "c",
+    "cpp": "c",
+    "hpp": "c",
+}
+
+# Each pattern names its kind through the group that captures the symbol
+_DEFINITIONS: Dict[str, List[Pattern]] = {
+    # Only used when a Python file does not parse
+    "python": [
+        re.compile(r"^\s*(?:async\s+)?def\s+(?P<function>\w+)", re.M),
+        re.compile(r"^\s*class\s+(?P<class>\w+)", re.M),
+    ],
+    "javascript": [
+        re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\*?\s+(?P<function>[A-Za-z_$][\w$]*)", re.M),
+        re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<class>[A-Za-z_$][\w$]*)", re.M),
+        re.compile(r"^\s*(?:export\s+)?(?:interface|type|enum)\s+(?P<type>[A-Za-z_$][\w$]*)", re.M),
+        re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<variable>[A-Za-z_$][\w$]*)\s*=", re.M),
+        re.compile(r"^\s+(?:static\s+|async\s+|get\s+|set\s+|public\s+|private\s+|protected\s+)*(?P<method>[A-Za-z_$][\w$]*)\s*\([^)]*\)\s*(?::[^{]+)?\{", re.M),
+    ],
+    "go": [
+        re.compile(r"^func\s+(?:\([^)]*\)\s*)?(?P<function>\w+)", re.M),
+        re.compile(r"^type\s+(?P<type>\w+)", re.M),
+        re.compile(r"^(?:var|const)\s+(?P<variable>\w+)", re.M),
+    ],
+    "rust": [
+        re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?:const\s+)?fn\s+(?P<function>\w+)", re.M),
+        re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type|union)\s+(?P<type>\w+)", re.M),
+        re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(?P<module>\w+)", re.M),
+        re.compile(r"^\s*macro_rules!\s*(?P<macro>\w+)", re.M),
+    ],
+    "ruby": [
+        re.compile(r"^\s*def\s+(?:self\.)?(?P<method>[\w?!=]+)", re.M),
+        re.compile(r"^\s*class\s+(?P<class>[\w:]+)", re.M),
+        re.compile(r"^\s*module\s+(?P<module>[\w:]+)", re.M),
+    ],
+    "java": [
+        re.compile(r"^\s*(?:[\w@]+\s+)*(?:class|interface|enum|record|struct|object)\s+(?P<class>\w+)", re.M),
+        re.compile(r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|suspend|async|virtual|synchronized)\s+)+[\w<>\[\],.? ]*?\b(?P<method>\w+)\s*\(", re.M),
+        re.compile(r"^\s*fun\s+(?:<[^>]*>\s*)?(?:\w+\.)?(?P<function>\w+)\s*\(", re.M),
+    ],
+    "c": [
+        re.compile(r"^(?:[\w*&:<>]+\s+)+\**(?P<function>[A-Za-z_][\w:~]*)\s*\([^;]*$", re.M),
+        re.compile(r"^\s*(?:typedef\s+)?(?:struct|class|enum|union)\s+(?P<type>\w+)", re.M),
+        re.compile(r"^\s*#\s*define\s+(?P<macro>\w+)", re.M),
+    ],
+}
+
+_CALL = re.compile(r"(?<![\w$.])(?:[\w$]+\.)*(?P<name>[A-Za-z_$][\w$]*)\s*(?:!\s*)?\(")
+_NOT_CALLS = frozenset(
+    set(keyword.kwlist)
+    | {
+        "if", "for", "while", "switch", "catch", "return", "function", "sizeof",
+        "typeof", "new", "fn", "func", "match", "super", "this", "self",
+    }
+)
+
+
+def _extract_with_patterns(text: str, patterns: List[Pattern]) -> List[Symbol]:
+    line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+
+    def line_of(offset: int) -> int:
+        # Binary search for the line containing offset
+        low, high = 0, len(line_starts) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if line_starts[mid] <= offset:
+                low = mid
+            else:
+                high = mid - 1
+        return low + 1
+
+    symbols = []
+    defined = set()
+    for pattern in patterns:
+        for match in pattern.finditer(text):
+            kind = match.lastgroup
+            name = match.group(kind)
+            if name in _NOT_CALLS:
+                continue
+            line = line_of(match.start(kind))
+            if (name, line) not in defined:
+                defined.add((name, line))
+                symbols.append(Symbol(name, kind, DEFINITION, line))
+
+    for match in _CALL.finditer(text):
+        name = match.group("name")
+        line = line_of(match.start("name"))
+        if name not in _NOT_CALLS and (name, line) not in defined:
+            symbols.append(Symbol(name, "call", REFERENCE, line))
+    return sorted(symbols, key=lambda s: s.line)
@@ -0,0 +1,121 @@
+import logging
+
+from ..db.chunks import count_project_chunks
+from ..db.file_history import get_file_history_summary
+from ..db.project import create_project, get_project, get_project_by_repo_url, update_project_branch
+from ..git.manager import GitManager
+from ..git.registry import repository_registry
+from ..indexing.admission import AdmissionPolicy
+from ..indexing.history import update_file_history
+from ..indexing.indexer import ProjectIndexer
+from ..models.project import ProjectCreate
+from .runner import JobProgress
+
+logger = logging.getLogger(__name__)
+
+# How many skipped files are listed by path in the job result
+SKIPPED_SAMPLE_SIZE = 50
+# How many of the files with the most tokens are listed
+LARGEST_FILES_SIZE = 10
+
+
+async def run_analysis(job: dict, progress: JobProgress) -> dict:
+    """
+    Clone or open the repository, register the project and bring its index
+    up to date. Projects analyzed before are re-indexed incrementally.
+    """
+    repo_source = job["repo_source"]
+
+    await progress.update("clone", 0, 1, force=True)
+    async with repository_registry.lease(repo_source) as git_manager:
+        await progress.update("clone", 1, 1)
+        return await _analyze(git_manager, repo_source, progress)
+
+
+async def _analyze(git_manager: GitManager, repo_source: str, progress: JobProgress) -> dict:
+    repo_info = git_manager.repo_info
+
+    project = await get_project_by_repo_url(repo_source)
+    if project:
+        project_id = project["id"]
+        base_commit = project["indexed_commit"]
+        await update_project_branch(project_id, repo_info.default_branch, repo_info.last_commit)
+    else:
+        project_id = await create_project(
+            ProjectCreate(
+                name=repo_info.name,
+                repo_url=repo_source,
+                repo_path=str(repo_info.path),  # Store the actual path where git data lives
+                default_branch=repo_info.default_branch,
+                current_branch=repo_info.default_branch,
+                last_commit=repo_info.last_commit,
+                description=None,
+            )
+        )
+        base_commit = None
+    await progress.set_project(project_id)
+
+    files = await git_manager.get_file_tree(repo_info.last_commit)
+
+    await progress.update("history", 0, 1, force=True)
+    await update_file_history(git_manager, project_id, repo_info.last_commit)
+    await progress.update("history", 1, 1)
+
+    # Sample of per-file history, read from the history index
+    sample_paths = [file["path"] for file in files[:3]]
+    history = await get_file_history_summary(project_id, sample_paths)
+    file_history_sample = [
+        {
+            "path": path,
+            "commits": history[path]["commit_count"] if path in history else 0,
+            "last_modified": history[path]["last_modified"].isoformat() if path in history else None,
+        }
+        for path in sample_paths
+    ]
+
+    policy = AdmissionPolicy.for_project(project)
+    index_result = await ProjectIndexer(
+        git_manager, project_id, on_progress=progress.update, policy=policy
+    ).index(base_commit, repo_info.last_commit)
+
+    return {
+        "name": repo_info.name,
+        "id": str(project_id),
+        "repo_path": str(repo_info.path),
+        "default_branch": repo_info.default_branch,
+        "current_commit": repo_info.last_commit,
+        "commit_count": repo_info.commit_count,
+        "branch_count": repo_info.branch_count,
+        "file_count": len(files),
+        "total_chunks": await count_project_chunks(project_id),
+        "vector_storage": (await get_project(project_id))["vector_storage"],
+        "incremental": not index_result.full,
+        "changed_files": index_result.added + index_result.modified + index_result.deleted,
+        "index_seconds": round(index_result.duration, 2),
+        "file_samples": file_history_sample,
+        "symbols": index_result.symbols,
+        "chunked_files": len(index_result.chunked_files),
+        "chunk_tokens": index_result.chunk_tokens,
+        "chunks_per_file": _mean(chunks for _, chunks, _ in index_result.chunked_files),
+        "tokens_per_file": _mean(tokens for _, _, tokens in index_result.chunked_files),
+        "largest_files": [
+            {"path": path, "chunks": chunks, "tokens": tokens}
+            for path, chunks, tokens in sorted(
+                index_result.chunked_files, key=lambda f: f[2], reverse=True
+            )[:LARGEST_FILES_SIZE]
+        ],
+        "skipped_files": index_result.skipped,
+        "skip_reasons": index_result.skip_reasons,
+        "skipped_sample": [
+            {"path": path, "reason": reason}
+            for path, reason in index_result.skipped_files[:SKIPPED_SAMPLE_SIZE]
+        ],
+        "include_globs": list(policy.include),
+        "exclude_globs": list(policy.exclude),
+        "max_file_size": policy.max_file_size,
+    }
+
+
+def _mean(values) -> float:
+    values = list(values)
+    return round(sum(values) / len(values), 1) if values else 0.0
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import UUID
+
+from ..db.jobs import finish_job, recover_jobs, start_job, update_job_progress
+from ..metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 2))
+
+STAGES = ("clone", "history", "tree", "chunk", "embed", "write")
+
+INDEX_STAGE_SECONDS = Histogram(
+    "ttlm_index_stage_seconds",
+    "Wall-clock time of each analysis stage",
+    ["stage"],
+)
+INDEX_STAGE_ITEMS = Counter(
+    "ttlm_index_stage_items_total",
+    "Units of work (files, blobs, chunks) completed per analysis stage",
+    ["stage"],
+)
+
+
+class JobProgress:
+    """
+    Per-stage progress of a running job. Updates are kept in memory and
+    written to the job row at most every ``min_interval`` seconds so a
+    fast-moving stage does not turn into a write per file.
+    """
+
+    def __init__(self, job_id: UUID, min_interval: float = 0.5):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.stage: Optional[str] = None
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.project_id: Optional[UUID] = None
+        self._last_write = 0.0
+        self._started: Dict[str, float] = {}
+
+    async def update(self, stage: str, done: int, total: int, force: bool = False):
+        self._record(stage, done, total)
+        self.stage = stage
+        self.stages[stage] = {"done": done, "total": total}
+        now = time.monotonic()
+        if force or done >= total or now - self._last_write >= self.min_interval:
+            self._last_write = now
+            await update_job_progress(self.job_id, stage, self.stages, self.project_id)
+
+    def _record(self, stage: str, done: int, total: int):
+        """Feed the stage metrics: items as they complete, and the stage's duration."""
+        now = time.perf_counter()
+        previous = self.stages.get(stage)
+        started = self._started.setdefault(stage, now)
+        if done > (previous["done"] if previous else 0):
+            INDEX_STAGE_ITEMS.inc(done - (previous["done"] if previous else 0), stage=stage)
+        finished = previous is not None and previous["done"] >= previous["total"]
+        if done >= total and not finished:
+            elapsed = now - started
+            INDEX_STAGE_SECONDS.observe(elapsed, stage=stage)
+            if elapsed > 0 and done:
+                logger.info(f"Job {self.job_id} stage {stage}: {done} in {elapsed:.2f}s ({done / elapsed:.1f}/s)")
+
+    async def set_project(self, project_id: UUID):
+        self.project_id = project_id
+        await update_job_progress(self.job_id, self.stage or STAGES[0], self.stages, project_id)
+
+
+# Runs one job and returns the result stored on the job row
+JobHandler = Callable[[dict, JobProgress], Awaitable[dict]]
+
+
+class JobRunner:
+    """
+    Bounded pool of workers executing queued jobs. The jobs table is the
+    source of truth; this only holds the ids of jobs waiting for a worker.
+    """
+
+    def __init__(self, handler: JobHandler, load_job: Callable, workers: int = ANALYSIS_WORKERS):
+        self.handler = handler
+        self.load_job = load_job
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks = []
+
+    async def start(self):
+        for job_id in await recover_jobs():
+            self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.create_task(self._worker(n)) for n in range(self.workers)
+        ]
+        logger.info(f"Job runner started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, job_id: UUID):
+        self._queue.put_nowait(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _worker(self, n: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {n} crashed on job {job_id}: {e}")
+
+    async def _run(self, job_id: UUID):
+        if not await start_job(job_id):
+            # Already picked up or finished elsewhere
+            return
+        job = await self.load_job(job_id)
+        progress = JobProgress(job_id)
+        started = time.perf_counter()
+        try:
+            result = await self.handler(job, progress)
+            await finish_job(job_id, "complete", result=result)
+            logger.info(f"Job {job_id} completed in {time.perf_counter() - started:.1f}s")
+        except asyncio.CancelledError:
+            await finish_job(job_id, "failed", error="Cancelled during shutdown")
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await finish_job(job_id, "failed", error=str(e))
@@ -1,39 +1,100 @@
+import asyncio
 from contextlib import asynccontextmanager
-import json
+import html
 import logging
+import os
 from pathlib import Path
-from typing import Dict, List
+import time
+from typing import Dict
+from uuid import UUID, uuid4
 
-import httpx
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from .models.project import ProjectCreate
-
 load_dotenv()
 
 
+from .chat.catalogue import ModelCatalogue
+from .chat.client import close_ollama, get_client, init_ollama
+from .chat.ollama import ChatStream
+from .chat.prompt import assemble_prompt, record_prompt_usage
+from .chat.residency import ModelResidency
+from .chat.scheduler import SchedulerFull, ollama_scheduler
+from .chat.sessions import message_tokens, needs_summary, plan_turn, schedule_summary
+from .chat.tokens import get_prompt_tokenizer
 from .db.init import close_db, init_db
-from .git.exceptions import RepositoryValidationError
-from .git.manager import GitManager
-from .models.project import ProjectCreate
-from .db.project import create_project, get_all_projects
+from .git.pool import shutdown_git_pool
+from .git.registry import repository_registry
+from .db.jobs import get_job, submit_job
+from .db.project import get_all_projects, get_project, set_index_filters, set_vector_storage
+from .db.sessions import (
+    append_messages,
+    create_session,
+    get_active_messages,
+    get_session,
+    set_session_model,
+)
+from .db.symbols import find_symbols
+from .indexing.embedder import (
+    close_embedding_service,
+    get_embedding_service,
+    init_embedding_service,
+)
+from .jobs.analysis import run_analysis
+from .metrics import METRICS_TRACE, REGISTRY, Histogram, current_trace, start_trace
+from .jobs.runner import STAGES, JobRunner
+from .retrieval.cache import cache_stats
+from .retrieval.search import retrieve
+from .retrieval.symbols import answer_symbol_question, lookup
 
 logger = logging.getLogger(__name__)
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-OLLAMA_BASE_URL = "http://localhost:11434"
-ACTIVE_MODEL = "qwen2.5-coder:7b-instruct-q8_0"
+# Model for pages that have not picked one; each page then carries its own
+DEFAULT_MODEL = os.getenv("OLLAMA_DEFAULT_MODEL", "qwen2.5-coder:7b-instruct-q8_0")
+
+# Messages posted to /chat wait here until the browser opens their SSE stream
+PENDING_CHATS: Dict[str, Dict] = {}
+PENDING_CHAT_TTL = 60
+# How often a streaming chat checks whether its browser is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+CHAT_STAGE_SECONDS = Histogram(
+    "ttlm_chat_stage_seconds",
+    "Time spent in each stage of answering a chat message",
+    ["stage"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "ttlm_http_request_seconds",
+    "Time to the response headers, per route",
+    ["method", "route", "status"],
+)
+
+
+model_catalogue = ModelCatalogue(ttl=float(os.getenv("OLLAMA_MODELS_TTL", 30)))
+model_residency = ModelResidency(max_resident=int(os.getenv("OLLAMA_MAX_RESIDENT", 2)))
 
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
     await init_db()
+    await init_ollama()
+    await init_embedding_service()
+    await model_catalogue.refresh()
+    model_catalogue.start()
+    await job_runner.start()
     yield
+    await job_runner.stop()
+    await repository_registry.close()
+    shutdown_git_pool()
+    await model_catalogue.stop()
+    await close_embedding_service()
+    await close_ollama()
     await close_db()
 
 app = FastAPI(lifespan=lifespan)
@@ -44,53 +105,66 @@ app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="stat
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
 
-async def get_ollama_models() -> List[Dict]:
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
     """
-    Fetches available models from Ollama's API. This function makes an HTTP request
-    to Ollama's local API endpoint and processes the response to get model information.
+    Time each request by route. With METRICS_TRACE, or when the client sends
+    an X-Trace-Id, the request also gets a trace whose stage timings are
+    logged under that ID.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get("http://localhost:11434/api/tags")
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                # Sort models by name for better presentation
-                return sorted(models, key=lambda x: x["name"])
-            return []
-        except Exception as e:
-            print(f"Error fetching models: {e}")
-            return []
+    trace = None
+    if METRICS_TRACE or "x-trace-id" in request.headers:
+        trace = start_trace(request.headers.get("x-trace-id"))
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        # The route template, so IDs in paths do not become label values
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    if trace:
+        response.headers["X-Trace-Id"] = trace.id
+        if trace.spans:
+            logger.info(trace.summary())
+    return response
 
 
 @app.get("/")
 async def root(request: Request):
     """
-    Renders the main page. We fetch available models and pass them to the template
-    so users can see and select from installed models immediately upon loading.
+    Renders the main page. Available models come from the cached catalogue so the
+    page never waits on Ollama; users can select from installed models immediately.
     """
-    models = await get_ollama_models()
+    models = model_catalogue.get_models()
     projects= await get_all_projects()
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "models": models, "active_model": ACTIVE_MODEL, "projects": projects},
+        {"request": request, "models": models, "active_model": DEFAULT_MODEL, "projects": projects},
     )
 
 
 @app.post("/set-model")
 async def set_model(request: Request):
     """
-    Updates the active model based on user selection. Returns a response that
-    HTMX will use to update the UI, confirming the model change.
+    Selects the model for this page's conversation and starts loading it
+    in the background, so the first question does not wait for the weights.
+    Other users keep their own models. Returns the status partial plus the
+    chat form's model field.
     """
     try:
         form = await request.form()
         model_name = form.get("model")
         if model_name:
-            global ACTIVE_MODEL
-            ACTIVE_MODEL = model_name
+            session_id = form.get("session_id")
+            if session_id:
+                await set_session_model(UUID(session_id), model_name)
+            model_residency.warm(model_name)
             return templates.TemplateResponse(
                 "partials/model_status.html",
-                {"request": request, "active_model": ACTIVE_MODEL},
+                {"request": request, "active_model": model_name, "selected": True},
             )
     except Exception as e:
         return HTMLResponse(f"Error setting model: {str(e)}", status_code=500)
@@ -99,13 +173,18 @@ async def set_model(request: Request):
 @app.post("/chat")
 async def chat(request: Request):
     """
-    Handles chat messages by sending them to Ollama and processing the streamed response.
-    The function now properly handles Ollama's streaming response format.
+    Accepts a chat message and returns a placeholder message bubble. The bubble
+    opens an SSE connection to /chat/stream/{stream_id}, which forwards tokens
+    from Ollama as soon as they are generated. Messages belong to a session
+    that is created on the first message and carried by the form afterwards.
     """
     try:
         # Get the message from form data
         form = await request.form()
         message = form.get("message", "")
+        project_id = form.get("project_id")
+        project_id = UUID(project_id) if project_id else None
+        model = form.get("model") or DEFAULT_MODEL
 
         if not message or message.isspace():
             return templates.TemplateResponse(
@@ -114,49 +193,36 @@ async def chat(request: Request):
                 status_code=400,
             )
 
-        # Initialize response accumulator
-        full_response = ""
-
-        # Make request to Ollama
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json={
-                    "model": ACTIVE_MODEL,
-                    "prompt": message,
-                    "stream": True,  # Enable streaming
-                },
-            ) as response:
-                # Process the streaming response
-                async for line in response.aiter_lines():
-                    if not line.strip():
-                        continue
-
-                    try:
-                        # Parse each line as a separate JSON object
-                        chunk = json.loads(line)
-
-                        # Extract the response text from the chunk
-                        if "response" in chunk:
-                            full_response += chunk["response"]
-
-                        # Check if this is the final message
-                        if chunk.get("done", False):
-                            break
-
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing chunk: {line}")
-                        print(f"Error details: {str(e)}")
-                        continue
-
-        # Return the complete response
+        session_id = form.get("session_id")
+        session = await get_session(UUID(session_id)) if session_id else None
+        # Switching projects starts a new conversation
+        new_session = session is None or session["project_id"] != project_id
+        if new_session:
+            session_id = await create_session(model, project_id)
+        else:
+            session_id = session["id"]
+            if session["model"] != model:
+                await set_session_model(session_id, model)
+
+        _prune_pending_chats()
+        stream_id = uuid4().hex
+        PENDING_CHATS[stream_id] = {
+            "message": message,
+            "model": model,
+            "project_id": project_id,
+            "session_id": session_id,
+            "created_at": time.monotonic(),
+            # The stream request continues this request's trace
+            "trace_id": current_trace().id if current_trace() else None,
+        }
+
         return templates.TemplateResponse(
-            "partials/message.html",
+            "partials/message_stream.html",
             {
                 "request": request,
-                "message": full_response.strip(),
-                "model": ACTIVE_MODEL,
+                "stream_id": stream_id,
+                "model": model,
+                "session_id": session_id if new_session else None,
             },
         )
 
@@ -169,6 +235,212 @@ async def chat(request: Request):
         )
 
 
+@app.post("/chat/new")
+async def new_chat(request: Request):
+    """Clears the conversation; the next message starts a new session."""
+    form = await request.form()
+    return templates.TemplateResponse(
+        "partials/chat_reset.html",
+        {"request": request, "active_model": form.get("model") or DEFAULT_MODEL},
+    )
+
+
+@app.get("/chat/stream/{stream_id}")
+async def chat_stream(request: Request, stream_id: str):
+    """
+    Streams a pending chat as server-sent events. Each token is sent as a
+    ``token`` event; the final ``done`` event carries the fully rendered message
+    with time-to-first-token and tokens/sec, replacing the streaming bubble.
+    Earlier turns of the session are replayed verbatim through /api/chat so
+    Ollama only prefills the new message. Closing the page cancels the
+    generation, whether it is still queued or already running.
+    """
+    pending = PENDING_CHATS.pop(stream_id, None)
+    if pending is None:
+        # 204 tells EventSource not to reconnect to a finished stream
+        return Response(status_code=204)
+
+    if pending["trace_id"]:
+        # Continue the trace of the /chat request that queued this message
+        trace = current_trace() or start_trace()
+        trace.id = pending["trace_id"]
+
+    async def event_source():
+        async with _cancel_on_disconnect(request):
+            full_response = ""
+            sources = []
+            model = pending["model"]
+            try:
+                session = await get_session(pending["session_id"])
+                history = await get_active_messages(session["id"], session["summarized_through"])
+                tokenizer = await get_prompt_tokenizer(model)
+
+                # Ground the answer in the selected project's code, when there is one
+                if pending["project_id"]:
+                    # "Where is X defined" and "who calls X" need no model at all
+                    with CHAT_STAGE_SECONDS.time(stage="symbol_lookup"):
+                        answer = await answer_symbol_question(pending["project_id"], pending["message"])
+                    if answer:
+                        rendered = answer.render()
+                        await append_messages(session["id"], [
+                            ("user", pending["message"], pending["message"], message_tokens(tokenizer, pending["message"])),
+                            ("assistant", rendered, None, message_tokens(tokenizer, rendered)),
+                        ])
+                        yield _sse_event(
+                            "done",
+                            templates.get_template("partials/message.html").render(
+                                message=rendered, lookup_ms=answer.elapsed_ms
+                            ),
+                        )
+                        return
+                    with CHAT_STAGE_SECONDS.time(stage="retrieve"):
+                        sources = await retrieve(pending["project_id"], pending["message"])
+                with CHAT_STAGE_SECONDS.time(stage="assemble_prompt"):
+                    prompt = await assemble_prompt(model, pending["message"], sources)
+                if prompt.context:
+                    # Only cite what actually made it into the prompt
+                    sources = [
+                        {"file_path": b.file_path, "start_line": b.start_line, "end_line": b.end_line}
+                        for b in prompt.context.blocks
+                    ]
+                turn = plan_turn(session, history, prompt.text, tokenizer)
+                with CHAT_STAGE_SECONDS.time(stage="make_room"):
+                    await model_residency.make_room(model)
+                generation = ChatStream(get_client(), model, turn.messages)
+                async for piece in generation:
+                    full_response += piece
+                    yield _sse_event("token", html.escape(piece))
+                model_residency.record(generation.stats)
+
+                exchange = [
+                    ("user", prompt.text, pending["message"], message_tokens(tokenizer, prompt.text)),
+                    ("assistant", full_response, None, message_tokens(tokenizer, full_response)),
+                ]
+                with CHAT_STAGE_SECONDS.time(stage="store_messages"):
+                    await append_messages(session["id"], exchange)
+                if turn.history or session["summary"]:
+                    logger.info(
+                        f"Chat session {session['id']}: {turn.tokens} prompt tokens, Ollama evaluated "
+                        f"{generation.stats.prompt_eval_count} after replaying {turn.history} messages"
+                    )
+                else:
+                    await record_prompt_usage(model, prompt, generation.stats.prompt_eval_count)
+                history += [{"role": role, "tokens": tokens} for role, _, _, tokens in exchange]
+                if needs_summary(session, history):
+                    schedule_summary(get_client(), session["id"], model)
+
+                final = templates.get_template("partials/message.html").render(
+                    message=full_response.strip(),
+                    model=model,
+                    stats=generation.stats,
+                    sources=sources,
+                )
+            except SchedulerFull as e:
+                logger.warning(f"Rejected chat for {model}: {str(e)}")
+                final = templates.get_template("partials/error.html").render(
+                    error="Too many requests are waiting for the model; please try again shortly"
+                )
+            except Exception as e:
+                logger.error(f"Error streaming chat: {str(e)}")
+                final = templates.get_template("partials/error.html").render(
+                    error=f"Failed to process message: {str(e)}"
+                )
+            yield _sse_event("done", final)
+            trace = current_trace()
+            if trace:
+                logger.info(trace.summary())
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event: str, data: str) -> str:
+    """Format a server-sent event; multi-line data becomes one data field per line."""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+
+@asynccontextmanager
+async def _cancel_on_disconnect(request: Request, interval: float = DISCONNECT_POLL_INTERVAL):
+    """
+    Cancel the current task once the client has gone away, so a generation
+    nobody will read stops using Ollama and gives up its scheduler slot.
+    """
+    task = asyncio.current_task()
+
+    async def watch():
+        while not await request.is_disconnected():
+            await asyncio.sleep(interval)
+        logger.info(f"Client disconnected from {request.url.path}; cancelling")
+        task.cancel()
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+
+
+def _prune_pending_chats():
+    """Drop chats whose stream was never opened by the browser."""
+    cutoff = time.monotonic() - PENDING_CHAT_TTL
+    for stream_id, pending in list(PENDING_CHATS.items()):
+        if pending["created_at"] < cutoff:
+            PENDING_CHATS.pop(stream_id, None)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Counters and histograms in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/embedding-stats")
+async def embedding_stats():
+    """Throughput and queue depth of the embedding service."""
+    return JSONResponse(get_embedding_service().stats())
+
+
+@app.get("/ollama-stats")
+async def ollama_stats():
+    """Running and waiting generations per model, rejections and queue wait."""
+    return JSONResponse(ollama_scheduler.stats())
+
+
+@app.get("/model-residency")
+async def model_residency_stats():
+    """Models Ollama has loaded, and load time versus generation time per model."""
+    return JSONResponse(await model_residency.stats())
+
+
+@app.get("/retrieval-cache-stats")
+async def retrieval_cache_stats():
+    """Hit rate, size and evictions of the query embedding and retrieval caches."""
+    return JSONResponse(cache_stats())
+
+
+@app.get("/repository-stats")
+async def repository_stats():
+    """Open repository handles in the registry."""
+    return JSONResponse(repository_registry.stats())
+
+
+@app.get("/projects/{project_id}/symbols")
+async def project_symbols(project_id: UUID, name: str, role: str = None, fuzzy: bool = False):
+    """
+    Definitions and references of a symbol in a project. Exact by default;
+    ``fuzzy`` falls back to trigram matches when nothing has that exact name.
+    """
+    if fuzzy:
+        matches, used_fuzzy = await lookup(project_id, name, role=role)
+    else:
+        matches, used_fuzzy = await find_symbols(project_id, name, role=role), False
+    return JSONResponse({"name": name, "fuzzy": used_fuzzy, "matches": matches})
+
+
 @app.get("/select-project")
 async def select_project(request: Request):
     """
@@ -193,11 +465,79 @@ async def select_project(request: Request):
         )
 
 
-git_manager = GitManager("./workspace")
+job_runner = JobRunner(run_analysis, get_job)
+
+
+async def _submit_analysis(request: Request, repo_source: str):
+    """
+    Queue an analysis job for ``repo_source`` at its current HEAD and render
+    the polling status partial. A submission matching an active job for the
+    same commit attaches to that job instead of starting another.
+    """
+    commit_sha = await repository_registry.resolve_head(repo_source)
+    job_id, created = await submit_job(repo_source, commit_sha)
+    if created:
+        job_runner.enqueue(job_id)
+    return await _render_job_status(request, await get_job(job_id))
+
+
+async def _render_job_status(request: Request, job: dict):
+    if job["status"] == "complete":
+        details = job["result"]
+        if details["incremental"]:
+            message = (
+                f"Re-indexed {details['name']}: {details['changed_files']} changed files "
+                f"in {details['index_seconds']}s"
+            )
+        else:
+            message = f"Repository initialized successfully: {details['name']}"
+        return templates.TemplateResponse(
+            "partials/project_status.html",
+            {
+                "request": request,
+                "repo_path": details["repo_path"],
+                "status": "complete",
+                "message": message,
+                "details": details,
+            },
+        )
+
+    if job["status"] == "failed":
+        return templates.TemplateResponse(
+            "partials/project_status.html",
+            {
+                "request": request,
+                "repo_path": job["repo_source"],
+                "status": "error",
+                "message": job["error"] or "Analysis failed",
+            },
+        )
+
+    stage = job["stage"]
+    message = f"Analyzing: {stage}" if stage else "Queued for analysis"
+    return templates.TemplateResponse(
+        "partials/project_status.html",
+        {
+            "request": request,
+            "repo_path": job["repo_source"],
+            "status": "initializing",
+            "message": message,
+            "job_id": job["id"],
+            "stages": [
+                {"name": name, **job["progress"][name]}
+                for name in STAGES
+                if name in job["progress"]
+            ],
+        },
+    )
 
 
 @app.post("/analyze-project")
 async def analyze_project(request: Request):
+    """
+    Queues the repository for background analysis and returns immediately with
+    a status partial that polls /jobs/{job_id} until the job finishes.
+    """
     try:
         form = await request.form()
         repo_path = form.get("repo_path")
@@ -209,58 +549,131 @@ async def analyze_project(request: Request):
                 status_code=400,
             )
 
-        # Initialize repository - now persistent
-        repo_info = await git_manager.initialize_repository(repo_path)
-        
-        # Create project in database with git-specific info
-        project_data = ProjectCreate(
-            name=repo_info.name,
-            repo_url=repo_path,
-            repo_path=str(repo_info.path),  # Store the actual path where git data lives
-            default_branch=repo_info.default_branch,
-            current_branch=repo_info.default_branch,
-            last_commit=repo_info.last_commit,
-            description=None,
+        return await _submit_analysis(request, repo_path)
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {
+                "request": request,
+                "error": "An unexpected error occurred while analyzing the repository",
+            },
+            status_code=500,
         )
-        project_id = await create_project(project_data)
-        
-        # Get initial file tree using Git's internal structure
-        files = await git_manager.get_file_tree()
-        
-        # Get additional git metadata
-        file_history_sample = []
-        try:
-            # Get history of first 3 files as a sample
-            for file in files[:3]:
-                history = await git_manager.get_file_history(file['path'])
-                file_history_sample.append({
-                    'path': file['path'],
-                    'commits': len(history),
-                    'last_modified': history[0]['date'] if history else None
-                })
-        except Exception as e:
-            logger.warning(f"Could not fetch file history: {e}")
-        
+
+
+@app.post("/reanalyze-project")
+async def reanalyze_project(request: Request):
+    """
+    Queues a re-index of an existing project. The job only re-embeds files
+    changed since the project's indexed commit.
+    """
+    try:
+        form = await request.form()
+        project_id = form.get("project_id")
+        project = await get_project(UUID(project_id)) if project_id else None
+
+        if not project:
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "error": "Project not found"},
+                status_code=404,
+            )
+
+        return await _submit_analysis(request, project["repo_url"])
+    except ValueError as e:
         return templates.TemplateResponse(
-            "partials/project_status.html",
+            "partials/error.html",
+            {"request": request, "error": str(e)},
+            status_code=400,
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {
+                "request": request,
+                "error": "An unexpected error occurred while re-analyzing the repository",
+            },
+            status_code=500,
+        )
+
+
+@app.post("/project-filters")
+async def update_project_filters(request: Request):
+    """
+    Saves a project's include/exclude globs and size cap, then queues a full
+    re-index so the new filters apply to every file.
+    """
+    try:
+        form = await request.form()
+        project_id = form.get("project_id")
+        project = await get_project(UUID(project_id)) if project_id else None
+
+        if not project:
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "error": "Project not found"},
+                status_code=404,
+            )
+
+        max_file_kb = form.get("max_file_kb", "").strip()
+        await set_index_filters(
+            project["id"],
+            _parse_globs(form.get("include_globs", "")),
+            _parse_globs(form.get("exclude_globs", "")),
+            int(max_file_kb) * 1024 if max_file_kb else None,
+        )
+        return await _submit_analysis(request, project["repo_url"])
+    except ValueError as e:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "error": str(e)},
+            status_code=400,
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {
+                "request": request,
+                "error": "An unexpected error occurred while updating the project filters",
+            },
+            status_code=500,
+        )
+
+
+@app.post("/project-storage")
+async def update_project_storage(request: Request):
+    """
+    Switches how a project's vectors are indexed: full precision, or a
+    halfvec or binary index whose candidates are re-scored exactly. Existing
+    chunks are converted in place, so no re-index is needed.
+    """
+    try:
+        form = await request.form()
+        project_id = form.get("project_id")
+        project = await get_project(UUID(project_id)) if project_id else None
+
+        if not project:
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "error": "Project not found"},
+                status_code=404,
+            )
+
+        storage = form.get("vector_storage", "")
+        converted = await set_vector_storage(project["id"], storage)
+        return templates.TemplateResponse(
+            "partials/vector_storage.html",
             {
                 "request": request,
-                "repo_path": str(repo_info.path),
-                "status": "initialized",
-                "message": f"Repository initialized successfully: {repo_info.name}",
-                "details": {
-                    "name": repo_info.name,
-                    "id": project_id,
-                    "default_branch": repo_info.default_branch,
-                    "current_commit": repo_info.last_commit,
-                    "commit_count": repo_info.commit_count,
-                    "branch_count": repo_info.branch_count,
-                    "file_count": len(files),
-                    "file_samples": file_history_sample
-                },
+                "project_id": project["id"],
+                "storage": storage,
+                "message": f"Converted {converted} chunks" if converted else "Unchanged",
             },
         )
-    except RepositoryValidationError as e:
+    except ValueError as e:
         return templates.TemplateResponse(
             "partials/error.html",
             {"request": request, "error": str(e)},
@@ -272,7 +685,26 @@ async def analyze_project(request: Request):
             "partials/error.html",
             {
                 "request": request,
-                "error": "An unexpected error occurred while analyzing the repository",
+                "error": "An unexpected error occurred while switching the vector storage",
             },
             status_code=500,
         )
+
+
+def _parse_globs(value: str):
+    """One glob per line or comma-separated; None when empty."""
+    globs = [g.strip() for line in value.splitlines() for g in line.split(",") if g.strip()]
+    return globs or None
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(request: Request, job_id: UUID):
+    """Current state of an analysis job, rendered for the status panel to poll."""
+    job = await get_job(job_id)
+    if not job:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "error": "Job not found"},
+            status_code=404,
+        )
+    return await _render_job_status(request, job)
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from ..db import retrieval_cache as shared_store
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 512))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", 600))
+# Also keep entries in Postgres so other workers and restarts share them
+RETRIEVAL_SHARED_CACHE = os.getenv("RETRIEVAL_SHARED_CACHE", "false").lower() == "true"
+
+
+def normalize_query(text: str) -> str:
+    """Case and whitespace differences should not defeat the cache."""
+    return " ".join(text.split()).casefold()
+
+
+class LRUCache:
+    """
+    Bounded in-process cache: least recently used entries are evicted past
+    ``max_entries`` and entries older than ``ttl`` seconds are dropped on
+    access. Not thread-safe; it is only touched from the event loop.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TieredCache:
+    """
+    An ``LRUCache`` in front of an optional shared Postgres tier. Values
+    must be JSON-serializable to reach the shared tier; a shared hit is
+    copied into the local tier. Failures of the shared tier are logged and
+    treated as misses so retrieval never depends on it.
+    """
+
+    def __init__(self, local: LRUCache, shared: bool = False):
+        self.local = local
+        self.shared = shared
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self._last_purge = time.monotonic()
+
+    def _shared_key(self, key: tuple) -> str:
+        raw = json.dumps([self.local.name, *key], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: tuple) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or not self.shared:
+            return value
+        try:
+            value = await shared_store.get_entry(self._shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared {self.local.name} cache unavailable: {e}")
+            return None
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.local.put(key, value)
+        return value
+
+    async def put(self, key: tuple, value: Any):
+        self.local.put(key, value)
+        if self.shared:
+            try:
+                await shared_store.put_entry(self._shared_key(key), value, self.local.ttl)
+                # Expired rows are never read again; clear them out once per TTL
+                if time.monotonic() - self._last_purge > self.local.ttl:
+                    self._last_purge = time.monotonic()
+                    await shared_store.purge_expired_entries()
+            except Exception as e:
+                logger.warning(f"Could not write shared {self.local.name} cache: {e}")
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        if self.shared:
+            stats["shared_hits"] = self.shared_hits
+            stats["shared_misses"] = self.shared_misses
+        return stats
+
+
+query_embedding_cache = TieredCache(
+    LRUCache("query_embeddings", QUERY_CACHE_SIZE, QUERY_CACHE_TTL), shared=RETRIEVAL_SHARED_CACHE
+)
+retrieval_cache = TieredCache(
+    LRUCache("retrieval", RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL), shared=RETRIEVAL_SHARED_CACHE
+)
+
+
+def cache_stats() -> dict:
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+    }
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List
+from uuid import UUID
+
+from ..db.chunks import HYBRID_CANDIDATES, RRF_K, get_chunks_at_lines, hybrid_search_chunks
+from ..db.project import get_project_commits
+from ..indexing import embedder
+from .cache import normalize_query, query_embedding_cache, retrieval_cache
+from .symbols import definitions_for
+
+logger = logging.getLogger(__name__)
+
+# Chunks retrieved per question
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 8))
+# At most this many of them are chosen by the symbol index
+RETRIEVAL_PINNED = int(os.getenv("RETRIEVAL_PINNED", 3))
+
+
+async def retrieve(project_id: UUID, question: str, k: int = RETRIEVAL_K) -> List[dict]:
+    """
+    Chunks of a project most relevant to ``question``, ranked by hybrid
+    vector and full-text search. The question is embedded ahead of any
+    indexing work queued on the embedding service. Chunks defining an
+    identifier the question names come first.
+    """
+    started = time.perf_counter()
+    # Results are only valid for the commits the project was at when they
+    # were computed; moving either commit retires every entry for it
+    commits = await get_project_commits(project_id)
+    storage = commits["vector_storage"] if commits else "full"
+    key = None
+    if commits and commits["indexed_commit"]:
+        key = (
+            str(project_id),
+            commits["last_commit"],
+            commits["indexed_commit"],
+            storage,
+            k,
+            RETRIEVAL_PINNED,
+            HYBRID_CANDIDATES,
+            RRF_K,
+            normalize_query(question),
+        )
+        cached = await retrieval_cache.get(key)
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for project {project_id}")
+            return list(cached)
+
+    pinned, chunks = await asyncio.gather(
+        _defining_chunks(project_id, question), _search(project_id, question, k, storage)
+    )
+    pinned_ids = {chunk["id"] for chunk in pinned}
+    chunks = (pinned + [chunk for chunk in chunks if chunk["id"] not in pinned_ids])[:k]
+    logger.info(
+        f"Retrieved {len(chunks)} chunks ({len(pinned)} from symbols) for project {project_id} "
+        f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+    )
+    if key:
+        await retrieval_cache.put(key, chunks)
+    return list(chunks)
+
+
+async def embed_query(question: str) -> List[float]:
+    """Embed a question ahead of queued indexing work, reusing recent embeddings."""
+    key = (embedder.EMBEDDING_MODEL, normalize_query(question))
+    embedding = await query_embedding_cache.get(key)
+    if embedding is None:
+        [embedding] = await embedder.get_embedding_service().embed(
+            [question], embedder.Priority.INTERACTIVE
+        )
+        await query_embedding_cache.put(key, list(embedding))
+    return embedding
+
+
+async def _search(project_id: UUID, question: str, k: int, storage: str) -> List[dict]:
+    embedding = await embed_query(question)
+    return await hybrid_search_chunks(project_id, embedding, question, k=k, storage=storage)
+
+
+async def _defining_chunks(project_id: UUID, question: str) -> List[dict]:
+    definitions = await definitions_for(project_id, question, limit=RETRIEVAL_PINNED)
+    return await get_chunks_at_lines(
+        project_id, [(d["file_path"], d["line"]) for d in definitions]
+    )
@@ -0,0 +1,143 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from ..db.symbols import find_definitions, find_symbols
+from ..indexing.symbols import DEFINITION, REFERENCE
+
+logger = logging.getLogger(__name__)
+
+_DEFINITION_INTENT = re.compile(
+    r"\bwhere\b.*\b(defined|declared|implemented)\b|\bdefinition of\b|\bwhere(\s+is|'s)\b",
+    re.I,
+)
+_REFERENCE_INTENT = re.compile(
+    r"\bwho calls\b|\bcallers of\b|\bwhat calls\b|\busages? of\b|\breferences to\b"
+    r"|\bwhere\b.*\b(used|called|referenced|invoked)\b",
+    re.I,
+)
+# The word right after "where is", "who calls" and the like; it only counts
+# when capitalized, like a class name, or shaped like code
+_NAMED = re.compile(
+    r"\b(?:where is|where's|definition of|who calls|what calls|callers of|usages? of|references to)\s+"
+    r"(?:the\s+)?(?:class\s+|function\s+|method\s+|type\s+)?`?([A-Za-z_$][\w$.]*)",
+    re.I,
+)
+# `quoted` names, and words shaped like code: camelCase and CamelCase,
+# snake_case, dotted paths and calls like foo()
+_BACKTICKED = re.compile(r"`([A-Za-z_$][\w$.]*)(?:\(\))?`")
+_IDENTIFIER = re.compile(
+    r"(?<![\w$.])("
+    r"[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)+"
+    r"|[\w$]*[a-z0-9][A-Z][\w$]*|[A-Z]{2,}[a-z]{2,}[\w$]*"
+    r"|[A-Za-z$][\w$]*_[\w$]+|_+[A-Za-z$][\w$]*"
+    r"|[A-Za-z_$][\w$]*(?=\(\))"
+    r")(?![\w$])"
+)
+# Never symbol names worth answering for, even when quoted or capitalized
+_STOP_WORDS = frozenset(
+    """
+    a an and are as at be by can class code do does file for from function
+    how i if in is it its me method my not of on or that the them then there
+    these this those to type what when where which who why with you your
+    """.split()
+)
+# Last segments of dotted words that are file names rather than attributes
+_FILE_EXTENSIONS = frozenset(
+    "c cfg cpp css go h html ini java js json jsx md py rb rs sh sql toml ts tsx txt yaml yml".split()
+)
+# Names tried against the symbol index before the question goes to retrieval
+MAX_SYMBOL_LOOKUPS = 3
+
+
+@dataclass
+class SymbolQuestion:
+    # DEFINITION or REFERENCE when the question asks for locations, else None
+    intent: Optional[str]
+    names: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SymbolAnswer:
+    name: str
+    intent: str
+    matches: List[dict]
+    elapsed_ms: float
+
+    def render(self) -> str:
+        what = "defined" if self.intent == DEFINITION else "referenced"
+        lines = [f"`{self.name}` is {what} in:"]
+        for match in self.matches:
+            where = f"{match['file_path']}:{match['line']}"
+            inside = f" in {match['container']}" if match["container"] else ""
+            lines.append(f"  {where} ({match['kind']}{inside})")
+        return "\n".join(lines)
+
+
+def parse_symbol_question(question: str) -> SymbolQuestion:
+    """
+    The identifiers a question names and whether it asks where they live.
+    Plain English words are never names, so "who calls the function that
+    reads the config?" names nothing.
+    """
+    named = [
+        name for name in _NAMED.findall(question)
+        if name[0].isupper() or _IDENTIFIER.fullmatch(name)
+    ]
+    names = []
+    for name in _BACKTICKED.findall(question) + _IDENTIFIER.findall(question) + named:
+        if "." in name and name.rsplit(".", 1)[-1].lower() in _FILE_EXTENSIONS:
+            continue
+        name = name.rsplit(".", 1)[-1]
+        if len(name) > 1 and name.lower() not in _STOP_WORDS and name not in names:
+            names.append(name)
+
+    if _REFERENCE_INTENT.search(question):
+        intent = REFERENCE
+    elif _DEFINITION_INTENT.search(question):
+        intent = DEFINITION
+    else:
+        intent = None
+    return SymbolQuestion(intent, names)
+
+
+async def lookup(
+    project_id: UUID, name: str, role: Optional[str] = None, limit: int = 20
+) -> Tuple[List[dict], bool]:
+    """Exact matches for ``name``, or fuzzy ones when there are none. Returns (matches, fuzzy)."""
+    matches = await find_symbols(project_id, name, role=role, limit=limit)
+    if matches:
+        return matches, False
+    return await find_symbols(project_id, name, role=role, fuzzy=True, limit=limit), True
+
+
+async def answer_symbol_question(project_id: UUID, question: str) -> Optional[SymbolAnswer]:
+    """
+    Answer "where is X defined" and "who calls X" straight from the symbol
+    index. Returns None, so the question goes through retrieval, when it is
+    not of that form or no symbol has exactly a name it mentions.
+    """
+    parsed = parse_symbol_question(question)
+    if not parsed.intent or not parsed.names:
+        return None
+
+    started = time.perf_counter()
+    for name in parsed.names[:MAX_SYMBOL_LOOKUPS]:
+        matches = await find_symbols(project_id, name, role=parsed.intent)
+        if matches:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"Symbol lookup for {name!r} ({parsed.intent}): {len(matches)} matches in {elapsed_ms:.0f}ms")
+            return SymbolAnswer(name, parsed.intent, matches, elapsed_ms)
+    logger.info(f"No symbol named any of {parsed.names[:MAX_SYMBOL_LOOKUPS]} ({parsed.intent})")
+    return None
+
+
+async def definitions_for(project_id: UUID, question: str, limit: int = 10) -> List[dict]:
+    """Where the identifiers a question mentions are defined, to narrow retrieval."""
+    names = parse_symbol_question(question).names
+    if not names:
+        return []
+    return await find_definitions(project_id, names, limit=limit)
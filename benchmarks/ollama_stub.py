@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+@dataclass
+class StubConfig:
+    """Timing of the fake model. Prefill scales with the prompt length."""
+
+    models: List[str] = field(default_factory=lambda: ["qwen2.5-coder:7b-instruct-q8_0"])
+    # Decode speed and the fixed latency before the first token
+    token_rate: float = 30.0
+    latency_ms: float = 50.0
+    # Prompt tokens prefilled per second; a prompt is counted as chars / 4
+    prefill_rate: float = 2000.0
+    response_tokens: int = 64
+    # Paid by the first request to a model that is not loaded
+    load_ms: float = 0.0
+    # Generations served at once; more wait, like OLLAMA_NUM_PARALLEL
+    parallel: int = 1
+
+
+class OllamaStub:
+    """
+    Just enough of Ollama's API for the app: /api/tags, /api/ps, and
+    /api/generate and /api/chat, streamed or not, with configurable
+    latency, prefill and decode rates.
+    """
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.loaded: Dict[str, float] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.app = Starlette(
+            routes=[
+                Route("/api/tags", self.tags),
+                Route("/api/ps", self.ps),
+                Route("/api/generate", self.generate, methods=["POST"]),
+                Route("/api/chat", self.chat, methods=["POST"]),
+            ]
+        )
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.config.parallel)
+        return self._slots
+
+    async def tags(self, request: Request):
+        return JSONResponse(
+            {"models": [{"name": name, "model": name, "size": 4_000_000_000} for name in self.config.models]}
+        )
+
+    async def ps(self, request: Request):
+        expires = (datetime.now(timezone.utc) + timedelta(minutes=30)).isoformat()
+        return JSONResponse(
+            {"models": [{"name": name, "size": 4_000_000_000, "size_vram": 0, "expires_at": expires} for name in self.loaded]}
+        )
+
+    async def generate(self, request: Request):
+        body = await request.json()
+        if body.get("keep_alive") == 0 and not body.get("prompt"):
+            self.loaded.pop(body["model"], None)
+            return JSONResponse({"model": body["model"], "response": "", "done": True, "done_reason": "unload"})
+        if not body.get("prompt"):
+            load_ns = await self._load(body["model"])
+            return JSONResponse(
+                {"model": body["model"], "response": "", "done": True, "done_reason": "load", "load_duration": load_ns}
+            )
+        return await self._respond(body, len(body["prompt"]), lambda text: {"response": text})
+
+    async def chat(self, request: Request):
+        body = await request.json()
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        return await self._respond(
+            body, prompt_chars, lambda text: {"message": {"role": "assistant", "content": text}}
+        )
+
+    async def _load(self, model: str) -> int:
+        if model in self.loaded:
+            return 0
+        await asyncio.sleep(self.config.load_ms / 1000)
+        self.loaded[model] = time.time()
+        return int(self.config.load_ms * 1e6)
+
+    async def _respond(self, body: dict, prompt_chars: int, piece):
+        model = body["model"]
+        prompt_tokens = max(1, prompt_chars // 4)
+        stream = body.get("stream", True)
+        self.requests += 1
+
+        async def tokens():
+            async with self.slots:
+                load_ns = await self._load(model)
+                prefill = prompt_tokens / self.config.prefill_rate
+                await asyncio.sleep(self.config.latency_ms / 1000 + prefill)
+                started = time.perf_counter()
+                for n in range(self.config.response_tokens):
+                    if n:
+                        await asyncio.sleep(1 / self.config.token_rate)
+                    yield f"tok{n} "
+                final = {
+                    "model": model,
+                    "done": True,
+                    "done_reason": "stop",
+                    "load_duration": load_ns,
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prefill * 1e9),
+                    "eval_count": self.config.response_tokens,
+                    "eval_duration": int((time.perf_counter() - started) * 1e9),
+                }
+                yield final
+
+        if not stream:
+            *pieces, final = [item async for item in tokens()]
+            return JSONResponse({**final, **piece("".join(pieces))})
+
+        async def lines():
+            async for item in tokens():
+                if isinstance(item, dict):
+                    yield json.dumps({**item, **piece("")}) + "\n"
+                else:
+                    yield json.dumps({"model": model, "done": False, **piece(item)}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", dest="models", help="Model to advertise; repeatable")
+    parser.add_argument("--token-rate", type=float, default=StubConfig.token_rate)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--prefill-rate", type=float, default=StubConfig.prefill_rate)
+    parser.add_argument("--response-tokens", type=int, default=StubConfig.response_tokens)
+    parser.add_argument("--load-ms", type=float, default=StubConfig.load_ms)
+    parser.add_argument("--parallel", type=int, default=StubConfig.parallel)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        token_rate=args.token_rate,
+        latency_ms=args.latency_ms,
+        prefill_rate=args.prefill_rate,
+        response_tokens=args.response_tokens,
+        load_ms=args.load_ms,
+        parallel=args.parallel,
+    )
+    if args.models:
+        config.models = args.models
+    uvicorn.run(OllamaStub(config).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .ollama_stub import OllamaStub, StubConfig
+from .synthetic_repo import DEFAULT_SIZE_MIX, RepoSpec, add_commit, generate_repo
+
+logger = logging.getLogger("benchmarks")
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+_JOB_POLL = re.compile(r'hx-get="/jobs/([0-9a-f-]+)"')
+_PROJECT_ID = re.compile(r'id="chat-project-id" name="project_id" value="([0-9a-f-]+)"')
+_STREAM_ID = re.compile(r'sse-connect="/chat/stream/([0-9a-f]+)"')
+_SESSION_ID = re.compile(r'id="chat-session-id" name="session_id" value="([0-9a-f-]+)"')
+# The message in partials/error.html or a failed project_status.html
+_ERROR = re.compile(r'text-red-(?:600|700)">\s*([^<]+?)\s*<')
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Count, mean and p50/p95/p99/max, with linear interpolation between ranks."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        rank = (len(ordered) - 1) * p
+        low, high = math.floor(rank), math.ceil(rank)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 4),
+        "p50": round(percentile(0.50), 4),
+        "p95": round(percentile(0.95), 4),
+        "p99": round(percentile(0.99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _serve_stub(config: StubConfig, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(OllamaStub(config).app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def _start_app(port: int, ollama_url: str, workspace: Path, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, "OLLAMA_BASE_URL": ollama_url, "TTLM_WORKSPACE": str(workspace), **env},
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, app: subprocess.Popen, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if app.poll() is not None:
+            raise RuntimeError(f"App exited with status {app.returncode} during startup")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("App did not become ready")
+
+
+async def _wait_for_job(client: httpx.AsyncClient, html: str, poll: float = 0.25) -> str:
+    """Follow a job's status partial until it stops polling; returns the final HTML."""
+    while True:
+        error = _ERROR.search(html)
+        if error:
+            raise RuntimeError(f"Analysis failed: {error.group(1).strip()}")
+        job = _JOB_POLL.search(html)
+        if not job:
+            return html
+        await asyncio.sleep(poll)
+        html = (await client.get(f"/jobs/{job.group(1)}")).text
+
+
+async def scenario_index(client: httpx.AsyncClient, repo: Path, spec: RepoSpec) -> Tuple[dict, str]:
+    """Cold index of the synthetic repo, then an incremental re-index after one commit."""
+    started = time.perf_counter()
+    html = await _wait_for_job(client, (await client.post("/analyze-project", data={"repo_path": str(repo)})).text)
+    cold = time.perf_counter() - started
+    project_id = _PROJECT_ID.search(html).group(1)
+
+    add_commit(repo, files=spec.files_per_commit, seed=spec.seed + 1)
+    started = time.perf_counter()
+    await _wait_for_job(client, (await client.post("/reanalyze-project", data={"project_id": project_id})).text)
+    incremental = time.perf_counter() - started
+
+    return {
+        "files": spec.files,
+        "commits": spec.commits + 1,
+        "cold_seconds": round(cold, 3),
+        "cold_files_per_second": round(spec.files / cold, 2),
+        "incremental_seconds": round(incremental, 3),
+        "incremental_files_changed": spec.files_per_commit,
+    }, project_id
+
+
+async def _chat_once(
+    client: httpx.AsyncClient,
+    project_id: Optional[str],
+    message: str,
+    session_id: Optional[str] = None,
+) -> Tuple[Optional[float], float, Optional[str], Optional[str]]:
+    """One message end to end: (seconds to first token, total seconds, session ID, error)."""
+    started = time.perf_counter()
+    data = {"message": message, "project_id": project_id or "", "session_id": session_id or ""}
+    posted = (await client.post("/chat", data=data)).text
+    stream = _STREAM_ID.search(posted)
+    if not stream:
+        error = _ERROR.search(posted)
+        return None, time.perf_counter() - started, session_id, error.group(1) if error else "no stream"
+    session = _SESSION_ID.search(posted)
+    session_id = session.group(1) if session else session_id
+
+    first_token, event, done = None, None, []
+    async with client.stream("GET", f"/chat/stream/{stream.group(1)}", timeout=None) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - started
+            elif event == "done" and line.startswith("data:"):
+                done.append(line[len("data:"):].removeprefix(" "))
+    error = _ERROR.search("\n".join(done))
+    return first_token, time.perf_counter() - started, session_id, error and error.group(1)
+
+
+async def scenario_chat(
+    client: httpx.AsyncClient,
+    project_id: Optional[str],
+    requests: int,
+    concurrency: int,
+    turns: int,
+) -> dict:
+    """
+    ``requests`` conversations of ``turns`` messages each, ``concurrency``
+    at a time. Follow-up turns reuse the session, so their first-token
+    times show how much of the history Ollama had cached.
+    """
+    gate = asyncio.Semaphore(concurrency)
+    first, follow_up, totals, errors = [], [], [], []
+
+    async def conversation(n: int):
+        async with gate:
+            session_id = None
+            for turn in range(turns):
+                message = f"How does the {n}th request handler use the session cache? (turn {turn})"
+                ttft, total, session_id, error = await _chat_once(client, project_id, message, session_id)
+                if error:
+                    errors.append(error)
+                    return
+                totals.append(total)
+                if ttft is not None:
+                    (first if turn == 0 else follow_up).append(ttft)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(n) for n in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "conversations": requests,
+        "turns": turns,
+        "concurrency": concurrency,
+        "messages_per_second": round(len(totals) / elapsed, 3),
+        "ttft_seconds": summarize(first),
+        "follow_up_ttft_seconds": summarize(follow_up),
+        "total_seconds": summarize(totals),
+        "errors": len(errors),
+        "error_sample": sorted(set(errors))[:5],
+    }
+
+
+def _git_revision() -> Dict[str, object]:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+async def run(args) -> Path:
+    spec = RepoSpec(
+        files=args.files,
+        size_mix=args.size_mix,
+        commits=args.commits,
+        files_per_commit=args.files_per_commit,
+        seed=args.seed,
+    )
+    stub_config = StubConfig(
+        token_rate=args.token_rate,
+        latency_ms=args.latency_ms,
+        prefill_rate=args.prefill_rate,
+        response_tokens=args.response_tokens,
+        load_ms=args.load_ms,
+        parallel=args.parallel,
+    )
+    scenarios = set(args.scenarios.split(","))
+    results = {
+        **_git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="ttlm-bench-") as scratch:
+        scratch = Path(scratch)
+        stub_port, app_port = _free_port(), _free_port()
+        server, stub_task = await _serve_stub(stub_config, stub_port)
+        app = _start_app(
+            app_port,
+            f"http://127.0.0.1:{stub_port}",
+            scratch / "workspace",
+            # Match the app's scheduler to the stub's parallelism
+            {"OLLAMA_MODEL_CONCURRENCY": str(args.parallel)},
+        )
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{app_port}",
+                timeout=httpx.Timeout(30.0, read=None),
+                limits=httpx.Limits(max_connections=args.concurrency * 2 + 4),
+            ) as client:
+                await _wait_ready(client, app)
+                project_id = args.project_id
+                if "index" in scenarios:
+                    repo = generate_repo(scratch / "repo", spec)
+                    logger.info(f"Indexing {spec.files} files")
+                    results["scenarios"]["index"], project_id = await scenario_index(client, repo, spec)
+                if "chat" in scenarios:
+                    logger.info(f"Chatting: {args.chat_requests} conversations, concurrency {args.concurrency}")
+                    results["scenarios"]["chat"] = await scenario_chat(
+                        client, project_id, args.chat_requests, args.concurrency, args.turns
+                    )
+                results["metrics"] = (await client.get("/metrics")).text
+        finally:
+            app.terminate()
+            app.wait(timeout=30)
+            server.should_exit = True
+            await stub_task
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = RESULTS_DIR / f"{stamp}-{results['commit'][:8] or 'unknown'}.json"
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def _numbers(tree: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_numbers(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Path, candidate: Path):
+    """Print each scenario number of two result files side by side."""
+    a = json.loads(baseline.read_text())
+    b = json.loads(candidate.read_text())
+    print(f"baseline  {a['commit'][:8]}{' (dirty)' if a['dirty'] else ''}  {baseline.name}")
+    print(f"candidate {b['commit'][:8]}{' (dirty)' if b['dirty'] else ''}  {candidate.name}")
+    before, after = _numbers(a["scenarios"]), _numbers(b["scenarios"])
+    width = max((len(name) for name in before), default=10)
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+        print(f"{name:<{width}}  {old if old is not None else '-':>12}  {new if new is not None else '-':>12}  {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks against a local app and Ollama stub")
+    commands = parser.add_subparsers(dest="command")
+
+    bench = commands.add_parser("run", help="Run the scenarios and write a results file")
+    bench.add_argument("--scenarios", default="index,chat", help="Comma-separated: index, chat")
+    bench.add_argument("--files", type=int, default=RepoSpec.files)
+    bench.add_argument("--size-mix", default=DEFAULT_SIZE_MIX)
+    bench.add_argument("--commits", type=int, default=RepoSpec.commits)
+    bench.add_argument("--files-per-commit", type=int, default=RepoSpec.files_per_commit)
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("--chat-requests", type=int, default=32, help="Conversations to run")
+    bench.add_argument("--turns", type=int, default=2, help="Messages per conversation")
+    bench.add_argument("--concurrency", type=int, default=8)
+    bench.add_argument("--project-id", help="Chat against an existing project when not indexing")
+    bench.add_argument("--token-rate", type=float, default=StubConfig.token_rate)
+    bench.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    bench.add_argument("--prefill-rate", type=float, default=StubConfig.prefill_rate)
+    bench.add_argument("--response-tokens", type=int, default=StubConfig.response_tokens)
+    bench.add_argument("--load-ms", type=float, default=StubConfig.load_ms)
+    bench.add_argument("--parallel", type=int, default=StubConfig.parallel)
+
+    diff = commands.add_parser("compare", help="Compare two results files")
+    diff.add_argument("baseline", type=Path)
+    diff.add_argument("candidate", type=Path)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+    elif args.command == "run":
+        path = asyncio.run(run(args))
+        print(path)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
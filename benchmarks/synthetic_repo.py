@@ -0,0 +1,186 @@
+import argparse
+import logging
+import os
+import random
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Approximate file sizes in bytes for each size class
+SIZE_CLASSES = {"small": 1_000, "medium": 8_000, "large": 64_000}
+DEFAULT_SIZE_MIX = "small=0.7,medium=0.25,large=0.05"
+# Fixed identity and clock so the same settings always produce the same SHAs
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "Bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+_EPOCH = 1_700_000_000
+
+_WORDS = (
+    "account", "buffer", "cache", "client", "config", "event", "handler", "index",
+    "item", "job", "key", "loader", "message", "node", "order", "parser", "queue",
+    "record", "request", "session", "stream", "task", "token", "user", "value",
+)
+
+
+@dataclass
+class RepoSpec:
+    files: int = 200
+    size_mix: str = DEFAULT_SIZE_MIX
+    # Commits after the initial one; each rewrites a few files
+    commits: int = 50
+    files_per_commit: int = 5
+    seed: int = 0
+
+    def sizes(self) -> List[Tuple[str, float]]:
+        mix = []
+        for entry in self.size_mix.split(","):
+            name, weight = entry.split("=")
+            if name.strip() not in SIZE_CLASSES:
+                raise ValueError(f"Unknown size class {name!r}; expected one of {sorted(SIZE_CLASSES)}")
+            mix.append((name.strip(), float(weight)))
+        return mix
+
+
+def _identifier(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(_WORDS) for _ in range(parts))
+
+
+def _python_file(rng: random.Random, target: int) -> str:
+    """Plausible Python: classes and functions that call each other."""
+    out, size, defined = [f'"""Module {_identifier(rng)}."""\nimport os\n\n'], 0, []
+    while size < target:
+        if rng.random() < 0.3:
+            name = _identifier(rng).title().replace("_", "")
+            methods = []
+            for _ in range(rng.randint(2, 5)):
+                method = _identifier(rng)
+                callee = rng.choice(defined) if defined else "len"
+                methods.append(
+                    f"    def {method}(self, {rng.choice(_WORDS)}):\n"
+                    f"        # Combine with the {rng.choice(_WORDS)} {rng.choice(_WORDS)}\n"
+                    f"        return {callee}(self.{rng.choice(_WORDS)})\n"
+                )
+            block = f"class {name}:\n" + "\n".join(methods) + "\n\n"
+        else:
+            name = _identifier(rng, rng.randint(2, 3))
+            args = ", ".join(sorted({rng.choice(_WORDS) for _ in range(rng.randint(1, 3))}))
+            callee = rng.choice(defined) if defined else "print"
+            body = "".join(
+                f"    {rng.choice(_WORDS)}_{i} = {callee}({args.split(', ')[0]}) + {rng.randint(0, 99)}\n"
+                for i in range(rng.randint(2, 8))
+            )
+            block = f"def {name}({args}):\n{body}    return {args.split(', ')[0]}\n\n\n"
+            defined.append(name)
+        out.append(block)
+        size += len(block)
+    return "".join(out)
+
+
+def _markdown_file(rng: random.Random, target: int) -> str:
+    out, size = [], 0
+    while size < target:
+        block = f"## {_identifier(rng).replace('_', ' ').title()}\n\n" + " ".join(
+            rng.choice(_WORDS) for _ in range(rng.randint(30, 80))
+        ) + ".\n\n"
+        out.append(block)
+        size += len(block)
+    return "".join(out)
+
+
+def _content(rng: random.Random, path: str, target: int) -> str:
+    return _markdown_file(rng, target) if path.endswith(".md") else _python_file(rng, target)
+
+
+def _git(repo: Path, *args: str, env: Dict[str, str] = None, input: bytes = None):
+    subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, input=input,
+        env={**os.environ, **_GIT_ENV, **(env or {})},
+    )
+
+
+def _commit(repo: Path, message: str, step: int):
+    date = f"{_EPOCH + step * 3600} +0000"
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message, env={"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date})
+
+
+def generate_repo(path: Path, spec: RepoSpec) -> Path:
+    """
+    Create a git repository at ``path`` with ``spec.files`` files drawn from
+    the size mix and ``spec.commits`` further commits touching a few files
+    each. The same spec always yields the same history.
+    """
+    rng = random.Random(spec.seed)
+    path = Path(path)
+    if path.exists() and any(path.iterdir()):
+        raise FileExistsError(f"{path} is not empty")
+    path.mkdir(parents=True, exist_ok=True)
+    _git(path, "init", "-q", "-b", "main")
+
+    classes, weights = zip(*spec.sizes())
+    files: Dict[str, int] = {}
+    for n in range(spec.files):
+        directory = f"pkg{n % 10}/{_identifier(rng, 1)}"
+        extension = ".md" if rng.random() < 0.1 else ".py"
+        file_path = f"{directory}/{_identifier(rng)}_{n}{extension}"
+        files[file_path] = SIZE_CLASSES[rng.choices(classes, weights)[0]]
+        target = path / file_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(_content(rng, file_path, files[file_path]))
+    _commit(path, "Initial import", 0)
+
+    paths = sorted(files)
+    for step in range(1, spec.commits + 1):
+        for file_path in rng.sample(paths, min(spec.files_per_commit, len(paths))):
+            (path / file_path).write_text(_content(rng, file_path, files[file_path]))
+        _commit(path, f"Change {step}", step)
+
+    logger.info(
+        f"Generated {path}: {spec.files} files, {spec.commits + 1} commits, "
+        f"{sum(files.values()) / 1e6:.1f} MB"
+    )
+    return path
+
+
+def add_commit(path: Path, files: int = 5, seed: int = 1, step: int = 10_000):
+    """Rewrite ``files`` tracked files in one more commit, for incremental runs."""
+    rng = random.Random(seed)
+    tracked = subprocess.run(
+        ["git", "ls-files"], cwd=path, check=True, capture_output=True, text=True
+    ).stdout.split()
+    for file_path in rng.sample(tracked, min(files, len(tracked))):
+        size = (Path(path) / file_path).stat().st_size
+        (Path(path) / file_path).write_text(_content(rng, file_path, size))
+    _commit(Path(path), f"Change {step}", step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic git repository")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--files", type=int, default=RepoSpec.files)
+    parser.add_argument("--size-mix", default=DEFAULT_SIZE_MIX, help="e.g. small=0.7,medium=0.25,large=0.05")
+    parser.add_argument("--commits", type=int, default=RepoSpec.commits)
+    parser.add_argument("--files-per-commit", type=int, default=RepoSpec.files_per_commit)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    generate_repo(
+        args.path,
+        RepoSpec(
+            files=args.files,
+            size_mix=args.size_mix,
+            commits=args.commits,
+            files_per_commit=args.files_per_commit,
+            seed=args.seed,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
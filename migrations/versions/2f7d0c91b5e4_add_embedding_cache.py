@@ -0,0 +1,41 @@
+"""add content-addressed embedding cache
+
+Revision ID: 2f7d0c91b5e4
+Revises: 9c2e4b7d1a03
+Create Date: 2025-02-04 10:27:13.402981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7d0c91b5e4'
+down_revision: Union[str, None] = '9c2e4b7d1a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Chunks and vectors keyed by git blob SHA, shared by every project and branch
+    op.create_table(
+        'embedding_cache',
+        sa.Column('blob_sha', sa.String(64), nullable=False),
+        sa.Column('model_id', sa.Text(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('blob_sha', 'model_id', 'chunk_index')
+    )
+    op.execute('ALTER TABLE embedding_cache ADD COLUMN embedding vector(384) NOT NULL')
+
+    # Project rows reference the blob they were built from
+    op.add_column('project_embeddings', sa.Column('blob_sha', sa.String(64), nullable=True))
+    op.create_index('ix_project_embeddings_blob_sha', 'project_embeddings', ['blob_sha'])
+
+def downgrade():
+    op.drop_index('ix_project_embeddings_blob_sha', table_name='project_embeddings')
+    op.drop_column('project_embeddings', 'blob_sha')
+    op.drop_table('embedding_cache')
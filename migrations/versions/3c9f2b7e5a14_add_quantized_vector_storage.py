@@ -0,0 +1,92 @@
+"""add per-project quantized vector storage
+
+Revision ID: 3c9f2b7e5a14
+Revises: f81c4a6d3e52
+Create Date: 2025-02-13 16:38:22.509417
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9f2b7e5a14'
+down_revision: Union[str, None] = 'f81c4a6d3e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Storage mode given to existing and new projects: full, halfvec or binary.
+# Existing chunks of a quantized mode are backfilled before the indexes are
+# built.
+VECTOR_STORAGE = os.getenv('VECTOR_STORAGE', 'full')
+VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'hnsw')
+HNSW_M = int(os.getenv('HNSW_M', 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', 64))
+IVFFLAT_LISTS = int(os.getenv('IVFFLAT_LISTS', 1000))
+
+
+def _create_full_index(predicate: str = ''):
+    if VECTOR_INDEX_TYPE == 'ivfflat':
+        op.execute(
+            'CREATE INDEX ix_project_chunks_embedding ON project_chunks '
+            f'USING ivfflat (embedding vector_cosine_ops) WITH (lists = {IVFFLAT_LISTS}) {predicate}'
+        )
+    else:
+        op.execute(
+            'CREATE INDEX ix_project_chunks_embedding ON project_chunks '
+            'USING hnsw (embedding vector_cosine_ops) '
+            f'WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}) {predicate}'
+        )
+
+def upgrade():
+    if VECTOR_STORAGE not in ('full', 'halfvec', 'binary'):
+        raise ValueError(f"VECTOR_STORAGE must be full, halfvec or binary, not {VECTOR_STORAGE!r}")
+
+    op.add_column(
+        'projects',
+        sa.Column('vector_storage', sa.Text(), nullable=False, server_default=VECTOR_STORAGE),
+    )
+    op.create_check_constraint(
+        'ck_projects_vector_storage', 'projects', "vector_storage IN ('full', 'halfvec', 'binary')"
+    )
+
+    # Compact copies of embedding for the ANN index; at most one is set, per
+    # the project's mode. embedding stays the full-precision source used for
+    # re-scoring.
+    op.execute('ALTER TABLE project_chunks ADD COLUMN embedding_half halfvec(384)')
+    op.execute('ALTER TABLE project_chunks ADD COLUMN embedding_bits bit(384)')
+    op.execute("""
+        UPDATE project_chunks c
+        SET embedding_half = CASE WHEN p.vector_storage = 'halfvec' THEN c.embedding::halfvec(384) END,
+            embedding_bits = CASE WHEN p.vector_storage = 'binary' THEN binary_quantize(c.embedding)::bit(384) END
+        FROM projects p
+        WHERE p.id = c.project_id AND p.vector_storage <> 'full'
+    """)
+
+    # NULLs are left out of HNSW indexes, so each covers only its own mode
+    op.execute(
+        'CREATE INDEX ix_project_chunks_embedding_half ON project_chunks '
+        'USING hnsw (embedding_half halfvec_cosine_ops) '
+        f'WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})'
+    )
+    op.execute(
+        'CREATE INDEX ix_project_chunks_embedding_bits ON project_chunks '
+        'USING hnsw (embedding_bits bit_hamming_ops) '
+        f'WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})'
+    )
+    # The full-precision index keeps only the chunks of full-mode projects
+    op.execute('DROP INDEX ix_project_chunks_embedding')
+    _create_full_index('WHERE embedding_half IS NULL AND embedding_bits IS NULL')
+
+def downgrade():
+    op.execute('DROP INDEX ix_project_chunks_embedding')
+    _create_full_index()
+    op.execute('DROP INDEX ix_project_chunks_embedding_bits')
+    op.execute('DROP INDEX ix_project_chunks_embedding_half')
+    op.drop_column('project_chunks', 'embedding_bits')
+    op.drop_column('project_chunks', 'embedding_half')
+    op.drop_constraint('ck_projects_vector_storage', 'projects', type_='check')
+    op.drop_column('projects', 'vector_storage')
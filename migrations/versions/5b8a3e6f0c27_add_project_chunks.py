@@ -0,0 +1,103 @@
+"""add chunk-level vector table with ANN index
+
+Revision ID: 5b8a3e6f0c27
+Revises: 2f7d0c91b5e4
+Create Date: 2025-02-05 14:02:51.774310
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8a3e6f0c27'
+down_revision: Union[str, None] = '2f7d0c91b5e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# hnsw (default) or ivfflat. IVFFlat builds its lists from the rows present at
+# creation time, so it should be rebuilt once a representative amount of data
+# has been indexed.
+VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'hnsw')
+HNSW_M = int(os.getenv('HNSW_M', 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', 64))
+IVFFLAT_LISTS = int(os.getenv('IVFFLAT_LISTS', 1000))
+
+
+def upgrade():
+    op.create_table(
+        'project_chunks',
+        sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=False),
+        sa.Column('file_path', sa.Text(), nullable=False),
+        sa.Column('blob_sha', sa.String(64), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('start_line', sa.Integer(), nullable=False),
+        sa.Column('end_line', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('project_id', 'file_path', 'chunk_index')
+    )
+    op.execute('ALTER TABLE project_chunks ADD COLUMN embedding vector(384) NOT NULL')
+    op.create_index('ix_project_chunks_project_id', 'project_chunks', ['project_id'])
+    op.create_index('ix_project_chunks_blob_sha', 'project_chunks', ['blob_sha'])
+
+    # Cached chunks carry their line ranges too
+    op.add_column('embedding_cache', sa.Column('start_line', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('embedding_cache', sa.Column('end_line', sa.Integer(), nullable=False, server_default='1'))
+
+    # Existing rows were whole-file embeddings: carry them over as chunk 0
+    op.execute("""
+        INSERT INTO project_chunks (
+            project_id, file_path, blob_sha, chunk_index, start_line, end_line, content, embedding
+        )
+        SELECT project_id, file_path, coalesce(blob_sha, ''), 0, 1,
+               greatest(1, array_length(string_to_array(content, E'\\n'), 1)),
+               content, embedding
+        FROM project_embeddings
+        WHERE embedding IS NOT NULL
+    """)
+    op.drop_table('project_embeddings')
+
+    if VECTOR_INDEX_TYPE == 'ivfflat':
+        op.execute(
+            'CREATE INDEX ix_project_chunks_embedding ON project_chunks '
+            f'USING ivfflat (embedding vector_cosine_ops) WITH (lists = {IVFFLAT_LISTS})'
+        )
+    else:
+        op.execute(
+            'CREATE INDEX ix_project_chunks_embedding ON project_chunks '
+            'USING hnsw (embedding vector_cosine_ops) '
+            f'WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})'
+        )
+
+def downgrade():
+    op.create_table(
+        'project_embeddings',
+        sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=False),
+        sa.Column('file_path', sa.Text(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('blob_sha', sa.String(64), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('project_id', 'file_path')
+    )
+    op.execute('ALTER TABLE project_embeddings ADD COLUMN embedding vector(384)')
+    op.create_index('ix_project_embeddings_blob_sha', 'project_embeddings', ['blob_sha'])
+    op.execute("""
+        INSERT INTO project_embeddings (project_id, file_path, blob_sha, content, embedding)
+        SELECT project_id, file_path, blob_sha, content, embedding
+        FROM project_chunks
+        WHERE chunk_index = 0
+    """)
+    op.drop_column('embedding_cache', 'end_line')
+    op.drop_column('embedding_cache', 'start_line')
+    op.drop_table('project_chunks')
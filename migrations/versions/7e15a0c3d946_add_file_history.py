@@ -0,0 +1,38 @@
+"""add file history index
+
+Revision ID: 7e15a0c3d946
+Revises: c41d9e2a7b18
+Create Date: 2025-02-07 11:18:22.930457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e15a0c3d946'
+down_revision: Union[str, None] = 'c41d9e2a7b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'file_history',
+        sa.Column('project_id', sa.UUID(), nullable=False),
+        sa.Column('file_path', sa.Text(), nullable=False),
+        sa.Column('commit_count', sa.Integer(), nullable=False),
+        sa.Column('last_commit', sa.String(64), nullable=False),
+        sa.Column('last_author', sa.Text(), nullable=True),
+        sa.Column('last_modified', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('project_id', 'file_path'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE')
+    )
+    # Commit the history summary was last brought up to
+    op.add_column('projects', sa.Column('history_commit', sa.String(), nullable=True))
+
+def downgrade():
+    op.drop_column('projects', 'history_commit')
+    op.drop_table('file_history')
@@ -0,0 +1,26 @@
+"""add indexed commit to projects
+
+Revision ID: 9c2e4b7d1a03
+Revises: f3586568b9d3
+Create Date: 2025-02-03 18:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e4b7d1a03'
+down_revision: Union[str, None] = 'f3586568b9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Commit the embeddings reflect; NULL means the project was never indexed
+    op.add_column('projects', sa.Column('indexed_commit', sa.String(), nullable=True))
+
+def downgrade():
+    op.drop_column('projects', 'indexed_commit')
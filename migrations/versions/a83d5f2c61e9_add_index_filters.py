@@ -0,0 +1,32 @@
+"""add per-project index filters
+
+Revision ID: a83d5f2c61e9
+Revises: 7e15a0c3d946
+Create Date: 2025-02-08 09:41:05.271836
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d5f2c61e9'
+down_revision: Union[str, None] = '7e15a0c3d946'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Gitignore-style globs; NULL include means every path is a candidate
+    op.add_column('projects', sa.Column('include_globs', postgresql.ARRAY(sa.Text()), nullable=True))
+    op.add_column('projects', sa.Column('exclude_globs', postgresql.ARRAY(sa.Text()), nullable=True))
+    # Per-project override of INDEX_MAX_FILE_SIZE, in bytes
+    op.add_column('projects', sa.Column('max_file_size', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('projects', 'max_file_size')
+    op.drop_column('projects', 'exclude_globs')
+    op.drop_column('projects', 'include_globs')
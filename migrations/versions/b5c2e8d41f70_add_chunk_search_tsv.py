@@ -0,0 +1,37 @@
+"""add full-text search column to project chunks
+
+Revision ID: b5c2e8d41f70
+Revises: a83d5f2c61e9
+Create Date: 2025-02-09 16:27:13.508914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c2e8d41f70'
+down_revision: Union[str, None] = 'a83d5f2c61e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # The 'simple' configuration keeps identifiers as written (no stemming or
+    # stop words). camelCase is split so "parseConfig" also matches "config",
+    # and the path is indexed with a higher weight than the content.
+    op.execute(r"""
+        ALTER TABLE project_chunks ADD COLUMN search_tsv tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', regexp_replace(file_path, '[/._-]+', ' ', 'g')), 'A')
+            || setweight(to_tsvector('simple', content), 'B')
+            || setweight(to_tsvector('simple', regexp_replace(content, '([a-z0-9])([A-Z])', '\1 \2', 'g')), 'C')
+        ) STORED
+    """)
+    op.execute('CREATE INDEX ix_project_chunks_search_tsv ON project_chunks USING gin (search_tsv)')
+
+def downgrade():
+    op.drop_index('ix_project_chunks_search_tsv', table_name='project_chunks')
+    op.drop_column('project_chunks', 'search_tsv')
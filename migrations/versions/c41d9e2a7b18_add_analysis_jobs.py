@@ -0,0 +1,52 @@
+"""add analysis jobs
+
+Revision ID: c41d9e2a7b18
+Revises: 5b8a3e6f0c27
+Create Date: 2025-02-06 09:41:05.263817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9e2a7b18'
+down_revision: Union[str, None] = '5b8a3e6f0c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'analysis_jobs',
+        sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=True),
+        sa.Column('repo_source', sa.Text(), nullable=False),
+        sa.Column('commit_sha', sa.String(64), nullable=True),
+        sa.Column('status', sa.String(16), server_default='queued', nullable=False),
+        sa.Column('stage', sa.String(16), nullable=True),
+        sa.Column('progress', postgresql.JSONB(), server_default=sa.text("'{}'::jsonb"), nullable=False),
+        sa.Column('result', postgresql.JSONB(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE')
+    )
+    # At most one active job per repository and commit; duplicates attach to it
+    op.execute("""
+        CREATE UNIQUE INDEX ux_analysis_jobs_active
+        ON analysis_jobs (repo_source, (coalesce(commit_sha, '')))
+        WHERE status IN ('queued', 'running')
+    """)
+    op.create_index('ix_analysis_jobs_status', 'analysis_jobs', ['status'])
+
+def downgrade():
+    op.drop_index('ix_analysis_jobs_status', table_name='analysis_jobs')
+    op.execute('DROP INDEX ux_analysis_jobs_active')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,51 @@
+"""add symbol index
+
+Revision ID: d29a7c4e8b13
+Revises: b5c2e8d41f70
+Create Date: 2025-02-10 10:05:47.332190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd29a7c4e8b13'
+down_revision: Union[str, None] = 'b5c2e8d41f70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Symbols are keyed by blob SHA like the embedding cache, so a blob is
+    # parsed once no matter how many projects or commits contain it. A row
+    # here marks the blob as extracted even when it defines nothing.
+    op.create_table(
+        'symbol_blobs',
+        sa.Column('blob_sha', sa.String(64), nullable=False),
+        sa.Column('language', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('blob_sha')
+    )
+    op.create_table(
+        'symbols',
+        sa.Column('blob_sha', sa.String(64), nullable=False),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('role', sa.Text(), nullable=False),
+        sa.Column('line', sa.Integer(), nullable=False),
+        sa.Column('container', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['blob_sha'], ['symbol_blobs.blob_sha'], ondelete='CASCADE'),
+        sa.CheckConstraint("role IN ('definition', 'reference')", name='ck_symbols_role')
+    )
+    op.create_index('ix_symbols_blob_sha', 'symbols', ['blob_sha'])
+    op.create_index('ix_symbols_name', 'symbols', ['name', 'role'])
+    op.execute('CREATE INDEX ix_symbols_name_trgm ON symbols USING gin (name gin_trgm_ops)')
+
+def downgrade():
+    op.drop_table('symbols')
+    op.drop_table('symbol_blobs')
@@ -0,0 +1,35 @@
+"""add shared retrieval cache
+
+Revision ID: e6b03f9d27a4
+Revises: d29a7c4e8b13
+Create Date: 2025-02-11 13:48:29.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b03f9d27a4'
+down_revision: Union[str, None] = 'd29a7c4e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Shared tier for query embeddings and retrieval results; keys are
+    # hashes that already include the project commits they depend on.
+    # UNLOGGED since losing it on a crash only costs recomputation.
+    op.execute("""
+        CREATE UNLOGGED TABLE retrieval_cache (
+            key text PRIMARY KEY,
+            value jsonb NOT NULL,
+            expires_at timestamptz NOT NULL
+        )
+    """)
+    op.create_index('ix_retrieval_cache_expires_at', 'retrieval_cache', ['expires_at'])
+
+def downgrade():
+    op.drop_table('retrieval_cache')
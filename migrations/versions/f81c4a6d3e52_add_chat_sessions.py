@@ -0,0 +1,57 @@
+"""add chat sessions and messages
+
+Revision ID: f81c4a6d3e52
+Revises: e6b03f9d27a4
+Create Date: 2025-02-12 10:21:07.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f81c4a6d3e52'
+down_revision: Union[str, None] = 'e6b03f9d27a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'chat_sessions',
+        sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+        sa.Column('project_id', sa.UUID(), nullable=True),
+        sa.Column('model', sa.Text(), nullable=False),
+        # Running summary of the messages up to and including summarized_through
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('summary_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('summarized_through', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='SET NULL'),
+    )
+    op.create_table(
+        'chat_messages',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('session_id', sa.UUID(), nullable=False),
+        sa.Column('role', sa.Text(), nullable=False),
+        # Exactly what was sent to the model, so replaying the history keeps
+        # Ollama's cached prefix valid
+        sa.Column('content', sa.Text(), nullable=False),
+        # What the user typed, without the retrieved context
+        sa.Column('display', sa.Text(), nullable=True),
+        sa.Column('tokens', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['session_id'], ['chat_sessions.id'], ondelete='CASCADE'),
+        sa.CheckConstraint("role IN ('user', 'assistant')", name='ck_chat_messages_role'),
+    )
+    op.create_index('ix_chat_messages_session_id', 'chat_messages', ['session_id', 'id'])
+
+def downgrade():
+    op.drop_index('ix_chat_messages_session_id', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_table('chat_sessions')